@@ -0,0 +1,241 @@
+"""Busca textual nos PDFs importados e nos anexos PDF dos lançamentos.
+
+O texto de cada documento fica em ``TextoIndexado``; o índice é do próprio
+banco (migração 0020): FTS5 no SQLite, tsvector + GIN no Postgres. ``buscar``
+aplica o escopo de acesso do usuário dentro da mesma consulta e devolve os
+resultados já ordenados por relevância, com um trecho destacado.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import re
+from typing import Any, Dict, List, Optional, Set
+
+from django.db import connection
+from django.urls import reverse
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from utils.access import get_clientes_ids_for_parceiro, get_empresas_ids_for_cliente
+
+from .models import Adesao, TextoIndexado
+
+logger = logging.getLogger(__name__)
+
+TABELA_FTS = 'adesao_textoindexado_fts'
+
+# Marcadores do trecho destacado (não aparecem no texto extraído dos PDFs)
+_INICIO, _FIM = '\x02', '\x03'
+_MAX_TERMOS = 16
+
+
+def indexar_documento(documento, texto: Optional[str]) -> None:
+    """Indexa o texto extraído de um ``DocumentoImportado`` (substitui o anterior)."""
+    if not texto:
+        return
+    numero = f' {documento.perdcomp}' if documento.perdcomp else ''
+    TextoIndexado.objects.update_or_create(
+        documento=documento,
+        defaults={
+            'origem': TextoIndexado.ORIGEM_IMPORTACAO,
+            'adesao_id': documento.adesao_id,
+            'titulo': f'{documento.get_tipo_display()}{numero} — {documento.arquivo}'[:255],
+            'conteudo': texto,
+        },
+    )
+
+
+def indexar_anexo(anexo) -> bool:
+    """Extrai (sandbox) e indexa o texto de um anexo PDF; outros formatos saem do índice.
+
+    Retorna se o anexo ficou indexado. Falhas de leitura são registradas no log
+    e não propagadas: a indexação nunca impede o cadastro do anexo.
+    """
+    from utils.pdf_pool import extract_and_parse
+    from utils.pdf_text_store import plain_text
+
+    nome = anexo.arquivo.name or ''
+    if not nome.lower().endswith('.pdf'):
+        TextoIndexado.objects.filter(anexo=anexo).delete()
+        return False
+    try:
+        with anexo.arquivo.open('rb') as arquivo:
+            conteudo = arquivo.read()
+        extraido = extract_and_parse(conteudo, plain_text, hashlib.sha256(conteudo).hexdigest())
+    except Exception:
+        logger.warning('Falha ao extrair texto do anexo %s para a busca', anexo.pk, exc_info=True)
+        return False
+    if not extraido.text:
+        TextoIndexado.objects.filter(anexo=anexo).delete()
+        return False
+    rotulo = anexo.nome_anexo or anexo.descricao or nome.rsplit('/', 1)[-1]
+    TextoIndexado.objects.update_or_create(
+        anexo=anexo,
+        defaults={
+            'origem': TextoIndexado.ORIGEM_ANEXO,
+            'adesao_id': anexo.id_lancamento.id_adesao_id,
+            'titulo': f'Anexo — {rotulo}'[:255],
+            'conteudo': extraido.text,
+        },
+    )
+    return True
+
+
+def indexar_anexos_pendentes(limite: int) -> int:
+    """Indexa até ``limite`` anexos marcados com ``indexacao_pendente`` (rodado pelo ``import_worker``).
+
+    Cada anexo é reservado desmarcando o flag antes da extração: vários workers
+    não pegam o mesmo, e um anexo alterado durante a extração volta a ficar
+    pendente. Falhas não são repetidas aqui (``indexar_documentos`` as refaz).
+    Retorna quantos anexos foram processados.
+    """
+    from lancamentos.models import Anexos
+
+    pendentes = list(
+        Anexos.objects.filter(indexacao_pendente=True).order_by('pk').values_list('pk', flat=True)[:limite]
+    )
+    processados = 0
+    for pk in pendentes:
+        if not Anexos.objects.filter(pk=pk, indexacao_pendente=True).update(indexacao_pendente=False):
+            continue
+        anexo = Anexos.objects.select_related('id_lancamento').filter(pk=pk).first()
+        if anexo is not None:
+            indexar_anexo(anexo)
+            processados += 1
+    return processados
+
+
+def empresas_visiveis(user) -> Optional[Set[int]]:
+    """Empresas (clientes) cujos documentos ``user`` pode ver; ``None`` = todas.
+
+    Mesmas regras da listagem de lançamentos: admin/staff vê tudo; cliente, as
+    empresas diretas e via sócio; parceiro, os clientes vinculados à sua empresa.
+    """
+    if user.is_superuser or user.is_staff:
+        return None
+    if not hasattr(user, 'profile'):
+        return set()
+    profile = user.profile
+    if profile.eh_cliente:
+        return get_empresas_ids_for_cliente(profile)
+    if profile.eh_parceiro:
+        return get_clientes_ids_for_parceiro(profile)
+    return set()
+
+
+def _termos(consulta: str) -> List[List[str]]:
+    # Cada palavra da consulta vira a sequência de seus tokens alfanuméricos:
+    # "12345.67890.123456" -> ["12345", "67890", "123456"] (mesma divisão do índice)
+    termos = []
+    for palavra in consulta.split():
+        tokens = re.findall(r'\w+', palavra)
+        if tokens:
+            termos.append(tokens)
+    return termos[:_MAX_TERMOS]
+
+
+def _consulta_fts5(termos: List[List[str]]) -> str:
+    # Frases entre aspas (sem operadores do usuário), todas obrigatórias, com
+    # prefixo no último token de cada uma ("guia 123" acha "1234567")
+    return ' '.join('"{}"*'.format(' '.join(tokens)) for tokens in termos)
+
+
+def _consulta_tsquery(termos: List[List[str]]) -> str:
+    return ' & '.join(
+        '({})'.format(' <-> '.join(f'{token}:*' if i == len(tokens) - 1 else token for i, token in enumerate(tokens)))
+        for tokens in termos
+    )
+
+
+def _sql_busca(termos: List[List[str]], filtros: List[str], params_filtros: List[Any], limite: int):
+    tabela = TextoIndexado._meta.db_table
+    where = ''.join(f' AND {filtro}' for filtro in filtros)
+    if connection.vendor == 'postgresql':
+        sql = (
+            f"SELECT s.id, s.score, ts_headline('portuguese', t.conteudo, s.q, %s) "
+            f"FROM (SELECT t.id, ts_rank(t.busca, q) AS score, q "
+            f"      FROM {tabela} t, to_tsquery('portuguese', %s) q "
+            f"      WHERE t.busca @@ q{where} ORDER BY score DESC LIMIT %s) s "
+            f"JOIN {tabela} t ON t.id = s.id ORDER BY s.score DESC"
+        )
+        opcoes = f'StartSel={_INICIO}, StopSel={_FIM}, MaxWords=35, MinWords=15, MaxFragments=2'
+        return sql, [opcoes, _consulta_tsquery(termos), *params_filtros, limite]
+    # bm25: menor = mais relevante; o título pesa mais que o corpo
+    sql = (
+        f"SELECT t.id, -bm25({TABELA_FTS}, 4.0, 1.0) AS score, "
+        f"snippet({TABELA_FTS}, 1, %s, %s, '…', 24) "
+        f"FROM {TABELA_FTS} JOIN {tabela} t ON t.id = {TABELA_FTS}.rowid "
+        f"WHERE {TABELA_FTS} MATCH %s{where} "
+        f"ORDER BY bm25({TABELA_FTS}, 4.0, 1.0) LIMIT %s"
+    )
+    return sql, [_INICIO, _FIM, _consulta_fts5(termos), *params_filtros, limite]
+
+
+def _trecho_html(trecho: str) -> str:
+    return mark_safe(escape(trecho).replace(_INICIO, '<mark>').replace(_FIM, '</mark>'))
+
+
+def buscar(consulta: str, user, origem: Optional[str] = None, limite: int = 50) -> List[Dict[str, Any]]:
+    """Documentos visíveis para ``user`` que contêm todos os termos de ``consulta``.
+
+    Resultados em ordem de relevância (``score`` maior = mais relevante), com
+    ``trecho`` (texto puro) e ``trecho_html`` (termos em ``<mark>``).
+    """
+    termos = _termos(consulta or '')
+    if not termos:
+        return []
+    filtros: List[str] = []
+    params: List[Any] = []
+    empresas = empresas_visiveis(user)
+    if empresas is not None:
+        if not empresas:
+            return []
+        escopo_sql, escopo_params = (
+            Adesao.objects.filter(cliente__id_company_vinculada_id__in=sorted(empresas))
+            .values('pk').query.sql_with_params()
+        )
+        filtros.append(f't.adesao_id IN ({escopo_sql})')
+        params.extend(escopo_params)
+    if origem:
+        filtros.append('t.origem = %s')
+        params.append(origem)
+
+    sql, sql_params = _sql_busca(termos, filtros, params, limite)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, sql_params)
+        linhas = cursor.fetchall()
+    if not linhas:
+        return []
+
+    registros = TextoIndexado.objects.defer('conteudo').select_related(
+        'adesao', 'adesao__cliente__id_company_vinculada', 'anexo',
+    ).in_bulk([linha[0] for linha in linhas])
+    resultados = []
+    for pk, score, trecho in linhas:
+        registro = registros.get(pk)
+        if registro is None:
+            continue
+        adesao = registro.adesao
+        empresa = adesao.cliente.id_company_vinculada
+        if registro.anexo_id:
+            url = reverse('lancamentos:detail', kwargs={'pk': registro.anexo.id_lancamento_id})
+        else:
+            url = reverse('adesao:detail', kwargs={'pk': adesao.pk})
+        resultados.append({
+            'id': registro.pk,
+            'origem': registro.origem,
+            'origem_label': registro.get_origem_display(),
+            'titulo': registro.titulo,
+            'score': round(float(score or 0), 6),
+            'trecho': (trecho or '').replace(_INICIO, '').replace(_FIM, ''),
+            'trecho_html': _trecho_html(trecho or ''),
+            'adesao_id': adesao.pk,
+            'perdcomp': adesao.perdcomp,
+            'empresa': (empresa.nome_fantasia or empresa.razao_social) if empresa else None,
+            'documento_id': registro.documento_id,
+            'anexo_id': registro.anexo_id,
+            'url': url,
+        })
+    return resultados
+
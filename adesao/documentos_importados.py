@@ -0,0 +1,99 @@
+"""Impressões digitais (SHA-256) dos PDFs já importados.
+
+A importação que cria ou atualiza uma adesão registra o hash do arquivo em
+``DocumentoImportado``. Um novo envio do mesmo conteúdo é respondido pelo hash
+("já importado como ..."), logo após a leitura do upload e sem abrir o PDF.
+"""
+from __future__ import annotations
+
+from typing import Any, Iterable, Optional
+
+from django.urls import reverse
+from django.utils import timezone
+
+from utils.pdf_parser import PARSER_VERSION
+from utils.pdf_text_store import compress_text, parsed_snapshot
+
+from .busca import indexar_documento
+from .models import DocumentoImportado
+
+_BLOCO_CONSULTA = 500
+
+
+class DocumentoJaImportado(Exception):
+    """O conteúdo enviado já foi importado (``documento``)."""
+
+    code = 'duplicado'
+
+    def __init__(self, documento: DocumentoImportado):
+        self.documento = documento
+        importado_em = timezone.localtime(documento.importado_em).strftime('%d/%m/%Y %H:%M')
+        numero = f' (PER/DCOMP {documento.perdcomp})' if documento.perdcomp else ''
+        super().__init__(
+            f'Documento já importado como {documento.get_tipo_display()}{numero} em {importado_em}.'
+        )
+
+    def detalhes(self) -> dict[str, Any]:
+        """Campos acrescentados à resposta de erro (``error_code`` e o registro anterior)."""
+        documento = self.documento
+        return {
+            'error_code': self.code,
+            'documento': {
+                'tipo': documento.tipo,
+                'tipo_label': documento.get_tipo_display(),
+                'perdcomp': documento.perdcomp,
+                'arquivo': documento.arquivo,
+                'importado_em': documento.importado_em.isoformat(),
+                'adesao_id': documento.adesao_id,
+                'detail_url': reverse('adesao:detail', kwargs={'pk': documento.adesao_id}),
+            },
+        }
+
+
+def documentos_importados(hashes: Iterable[Optional[str]]) -> dict[str, DocumentoImportado]:
+    """Documentos já importados entre ``hashes``, por SHA-256 (uma consulta por bloco)."""
+    hashes = list(dict.fromkeys(h for h in hashes if h))
+    encontrados: dict[str, DocumentoImportado] = {}
+    for i in range(0, len(hashes), _BLOCO_CONSULTA):
+        for documento in DocumentoImportado.objects.filter(sha256__in=hashes[i:i + _BLOCO_CONSULTA]):
+            encontrados[documento.sha256] = documento
+    return encontrados
+
+
+def verificar_duplicado(sha256: Optional[str]) -> None:
+    """Levanta ``DocumentoJaImportado`` se o conteúdo ``sha256`` já foi importado."""
+    if not sha256:
+        return
+    documento = DocumentoImportado.objects.filter(sha256=sha256).first()
+    if documento is not None:
+        raise DocumentoJaImportado(documento)
+
+
+def registrar_documento(sha256: Optional[str], tipo: str, adesao, arquivo: str,
+                        perdcomp: Optional[str] = None, usuario=None, extraido=None) -> None:
+    """Registra o hash de um arquivo importado (mantém o primeiro registro).
+
+    Com ``extraido`` (``ExtractionResult``), guarda também o texto comprimido,
+    os campos obtidos pelo parser e ``PARSER_VERSION``, e indexa o texto para a
+    busca (``adesao.busca``).
+    """
+    if not sha256:
+        return
+    defaults = {
+        'tipo': tipo,
+        'perdcomp': (perdcomp or '')[:50] or None,
+        'adesao': adesao,
+        'arquivo': (arquivo or '')[:255],
+        'usuario': usuario if getattr(usuario, 'is_authenticated', False) else None,
+    }
+    if extraido is not None:
+        defaults.update(
+            texto=compress_text(extraido.text or ''),
+            versao_parser=PARSER_VERSION,
+            dados=parsed_snapshot(extraido.parsed),
+            paginas_lidas=extraido.pages_read,
+            paginas_total=extraido.pages_total,
+        )
+    documento, criado = DocumentoImportado.objects.get_or_create(sha256=sha256, defaults=defaults)
+    if criado and extraido is not None:
+        indexar_documento(documento, extraido.text)
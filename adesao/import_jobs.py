@@ -0,0 +1,184 @@
+"""Fila de importação em lote no banco (sem Redis/Celery).
+
+A view grava os PDFs como ``ImportJobItem`` e responde na hora; o comando
+``manage.py import_worker`` reserva itens com ``SELECT ... FOR UPDATE SKIP
+LOCKED`` (vários workers não pegam o mesmo item), extrai no pool de processos
+e aplica as mesmas validações da importação em lote síncrona.
+"""
+from __future__ import annotations
+
+import hashlib
+import zipfile
+from datetime import timedelta
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from utils.pdf_cache import read_upload
+from utils.pdf_parser import parse_ressarcimento_text
+from utils.pdf_pool import iter_extract_and_parse
+from utils.pdf_zip import ZipEntrySource, is_zip_upload, iter_zip_pdfs
+from utils.stage_timer import StageTimer
+
+from .documentos_importados import documentos_importados
+from .models import ImportJob, ImportJobItem
+
+_BLOCO_INSERCAO = 50
+
+
+def _conteudos(upload) -> Iterator[Tuple[str, Optional[bytes], Optional[str], Optional[str]]]:
+    # (nome, bytes do PDF, sha256, erro) de um upload; .zip rende uma tupla por PDF
+    if not is_zip_upload(upload):
+        upload.seek(0)
+        conteudo = upload.read()
+        yield upload.name, conteudo, hashlib.sha256(conteudo).hexdigest(), None
+        return
+    source, _ = read_upload(upload)
+    try:
+        entries = list(iter_zip_pdfs(source))
+    except zipfile.BadZipFile:
+        yield upload.name, None, None, 'Arquivo ZIP inválido ou corrompido.'
+        return
+    if not entries:
+        yield upload.name, None, None, 'Nenhum PDF encontrado no arquivo ZIP.'
+    for entry in entries:
+        nome = f"{upload.name}/{entry.name}"
+        if entry.error is not None:
+            yield nome, None, None, entry.error
+        elif isinstance(entry.source, ZipEntrySource):
+            yield nome, entry.source.read_bytes(), entry.sha256, None
+        else:
+            yield nome, entry.source, entry.sha256, None
+
+
+def enfileirar(usuario, arquivos: Iterable, criar: bool, job: Optional[ImportJob] = None) -> ImportJob:
+    """Cria (ou completa) um ``ImportJob`` com os uploads informados.
+
+    Arquivos .zip viram um item por PDF; entradas ilegíveis já entram como erro.
+    """
+    agora = timezone.now()
+    with transaction.atomic():
+        if job is None:
+            job = ImportJob.objects.create(usuario=usuario, criar=criar)
+        ordem = job.items.count()
+        itens = []
+        for f in arquivos:
+            for nome, conteudo, sha256, erro in _conteudos(f):
+                item = ImportJobItem(job=job, ordem=ordem, nome_arquivo=nome[:255])
+                if erro is None:
+                    item.conteudo = conteudo
+                    item.sha256 = sha256
+                else:
+                    item.status = ImportJobItem.ERRO
+                    item.resultado = {'file': nome, 'ok': False, 'error': erro}
+                    item.concluido_em = agora
+                itens.append(item)
+                ordem += 1
+                # Grava em blocos: um .zip grande não fica inteiro na memória
+                if len(itens) >= _BLOCO_INSERCAO:
+                    ImportJobItem.objects.bulk_create(itens)
+                    itens = []
+        ImportJobItem.objects.bulk_create(itens)
+        job.atualizar_status()
+    return job
+
+
+def _expirar_itens(agora) -> None:
+    # Itens abandonados por um worker que caiu e já sem tentativas restantes
+    limite = agora - timedelta(seconds=settings.IMPORT_JOB_STALE_SECONDS)
+    abandonados = ImportJobItem.objects.filter(
+        status=ImportJobItem.PROCESSANDO,
+        iniciado_em__lt=limite,
+        tentativas__gte=settings.IMPORT_JOB_MAX_ATTEMPTS,
+    ).select_related('job')
+    for item in abandonados:
+        item.status = ImportJobItem.ERRO
+        item.resultado = {
+            'file': item.nome_arquivo,
+            'ok': False,
+            'error': f'Processamento interrompido após {item.tentativas} tentativa(s).',
+        }
+        item.conteudo = None
+        item.concluido_em = agora
+        item.save(update_fields=['status', 'resultado', 'conteudo', 'concluido_em'])
+        item.job.atualizar_status()
+
+
+def reservar_itens(worker: str, limite: int) -> List[ImportJobItem]:
+    """Reserva até ``limite`` itens pendentes para ``worker`` (ordem de chegada).
+
+    Itens em processamento há mais de ``IMPORT_JOB_STALE_SECONDS`` voltam a ser
+    elegíveis enquanto houver tentativas (``IMPORT_JOB_MAX_ATTEMPTS``).
+    """
+    agora = timezone.now()
+    _expirar_itens(agora)
+    limite_proc = agora - timedelta(seconds=settings.IMPORT_JOB_STALE_SECONDS)
+    elegiveis = Q(status=ImportJobItem.PENDENTE) | Q(
+        status=ImportJobItem.PROCESSANDO,
+        iniciado_em__lt=limite_proc,
+        tentativas__lt=settings.IMPORT_JOB_MAX_ATTEMPTS,
+    )
+    with transaction.atomic():
+        ids = list(
+            ImportJobItem.objects.select_for_update(skip_locked=True)
+            .filter(elegiveis)
+            .order_by('job_id', 'ordem')
+            .values_list('pk', flat=True)[:limite]
+        )
+        if not ids:
+            return []
+        ImportJobItem.objects.filter(pk__in=ids).filter(elegiveis).update(
+            status=ImportJobItem.PROCESSANDO,
+            worker=worker,
+            iniciado_em=agora,
+            tentativas=F('tentativas') + 1,
+        )
+    itens = list(
+        ImportJobItem.objects.select_related('job', 'job__usuario')
+        .filter(pk__in=ids, worker=worker, iniciado_em=agora)
+        .order_by('job_id', 'ordem')
+    )
+    for job in {item.job_id: item.job for item in itens}.values():
+        job.atualizar_status()
+    return itens
+
+
+def processar_itens(itens: List[ImportJobItem]) -> None:
+    """Extrai (pool de processos) e importa os itens reservados, gravando o resultado.
+
+    Itens com conteúdo já importado (``DocumentoImportado``) não são extraídos.
+    CNPJs e PER/DCOMPs de todos os itens são resolvidos de uma vez, após a extração.
+    """
+    from .views import _historico_do_usuario, _importar_item_lote, _item_lote_duplicado, _resolver_referencias
+
+    duplicados = documentos_importados(item.sha256 for item in itens)
+    extraidos = list(iter_extract_and_parse(
+        [
+            bytes(item.conteudo) if item.conteudo is not None and item.sha256 not in duplicados else None
+            for item in itens
+        ],
+        parse_ressarcimento_text,
+        hashes=[item.sha256 for item in itens],
+    ))
+    referencias = _resolver_referencias([extraido.parsed for extraido in extraidos])
+    for item, extraido in zip(itens, extraidos):
+        timer = StageTimer()
+        timer.bytes = len(item.conteudo) if item.conteudo is not None else None
+        if item.sha256 in duplicados:
+            res = _item_lote_duplicado(item.job.usuario, item.nome_arquivo, duplicados[item.sha256], timer)
+        else:
+            # Sem requisição no worker: o histórico fica com o dono do lote
+            with _historico_do_usuario(item.job.usuario):
+                res = _importar_item_lote(
+                    item.job.usuario, item.nome_arquivo, item.sha256, extraido, item.job.criar, referencias, timer
+                )
+        item.resultado = res
+        item.status = ImportJobItem.CONCLUIDO if res.get('ok') else ImportJobItem.ERRO
+        item.conteudo = None
+        item.concluido_em = timezone.now()
+        item.save(update_fields=['resultado', 'status', 'conteudo', 'concluido_em'])
+    for job in {item.job_id: item.job for item in itens}.values():
+        job.atualizar_status()
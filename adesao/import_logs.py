@@ -0,0 +1,200 @@
+"""Logs de importação de PDFs.
+
+Cada importação grava uma linha em ``ImportLog`` (consultada pela tela de logs,
+com paginação e filtros no banco) e envia o JSON completo, em segundo plano,
+para segmentos JSON Lines em ``MEDIA_ROOT/import_logs`` (arquivo de auditoria;
+ver ``utils.jsonl_sink``). Os arquivos ``.json`` avulsos de antes da tabela são
+carregados com ``manage.py importar_logs_json``.
+"""
+from __future__ import annotations
+
+import datetime
+import json
+import os
+from typing import Any, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from utils.jsonl_sink import JsonLinesSink
+from utils.stage_timer import StageTimer
+
+from .models import ImportLog
+
+# Contextos que só atualizam registros existentes / que sempre criam
+_CONTEXTOS_ATUALIZACAO = ('recibo_pedido_credito', 'declaracao_compensacao', 'credito_em_conta')
+_CONTEXTOS_CRIACAO = ('pedido_credito',)
+
+# Logs sem ``context`` (PER/DCOMP avulso e em lote), pelo prefixo do arquivo
+_CONTEXTO_POR_PREFIXO = {
+    'import': 'perdcomp',
+    'batch': 'perdcomp_lote',
+}
+
+CONTEXTO_LABELS = {
+    'perdcomp': 'PER/DCOMP',
+    'perdcomp_lote': 'PER/DCOMP (lote)',
+    'pedido_credito': 'Pedido de crédito',
+    'recibo_pedido_credito': 'Recibo de pedido de crédito',
+    'declaracao_compensacao': 'Declaração de compensação',
+    'credito_em_conta': 'Crédito em conta',
+    'documento': 'Documento não identificado',
+}
+
+
+def logs_dir() -> str:
+    return os.path.join(getattr(settings, 'MEDIA_ROOT', ''), 'import_logs')
+
+
+def _texto(valor: Any, limite: int) -> Optional[str]:
+    if valor in (None, ''):
+        return None
+    return str(valor)[:limite]
+
+
+def _numero(valor: Any, tipo=float):
+    try:
+        return tipo(valor) if valor is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def montar_log(data: dict[str, Any], prefixo: str = '') -> ImportLog:
+    """``ImportLog`` (não salvo) a partir do payload de log de uma importação."""
+    result = data.get('result') or {}
+    parsed = data.get('parsed') or {}
+    contexto = data.get('context') or _CONTEXTO_POR_PREFIXO.get(prefixo, '')
+
+    # Logs antigos nem sempre trazem created/updated: inferidos pelo contexto
+    criado = result.get('created')
+    atualizado = result.get('updated')
+    if criado is None and atualizado is None and result.get('ok'):
+        if contexto in _CONTEXTOS_ATUALIZACAO:
+            criado, atualizado = False, True
+        elif contexto in _CONTEXTOS_CRIACAO:
+            criado, atualizado = True, False
+
+    timings = data.get('timings') if isinstance(data.get('timings'), dict) else {}
+    return ImportLog(
+        username=_texto(data.get('user'), 150),
+        contexto=contexto[:40],
+        arquivo=str(data.get('filename') or '')[:255],
+        sha256=_texto(data.get('sha256'), 64),
+        perdcomp=_texto(parsed.get('perdcomp') if isinstance(parsed, dict) else None, 50),
+        cnpj=_texto(parsed.get('cnpj') if isinstance(parsed, dict) else None, 20),
+        ok=result.get('ok'),
+        criado=criado,
+        atualizado=atualizado,
+        status_code=data.get('status_code') if isinstance(data.get('status_code'), int) else None,
+        erro=_texto(result.get('error'), 10000),
+        detail_url=_texto(result.get('detail_url'), 255),
+        dados=data,
+        upload_ms=_numero(timings.get('upload_ms')),
+        extract_ms=_numero(timings.get('extract_ms')),
+        parse_ms=_numero(timings.get('parse_ms')),
+        db_ms=_numero(timings.get('db_ms')),
+        total_ms=_numero(timings.get('total_ms')),
+        paginas=_numero(timings.get('pages'), int),
+        tamanho_bytes=_numero(timings.get('bytes'), int),
+    )
+
+
+_sink: Optional[JsonLinesSink] = None
+
+
+def _log_sink() -> JsonLinesSink:
+    global _sink
+    if _sink is None:
+        _sink = JsonLinesSink(
+            logs_dir(),
+            'import_logs',
+            max_bytes=settings.IMPORT_LOG_SEGMENT_BYTES,
+            queue_size=settings.IMPORT_LOG_QUEUE_SIZE,
+        )
+    return _sink
+
+
+def gravar_log_importacao(prefixo: str, data: dict[str, Any], usuario=None,
+                          timer: Optional[StageTimer] = None) -> None:
+    """Registra o log de uma importação; falhas não interrompem a importação.
+
+    Só a linha em ``ImportLog`` é gravada durante a requisição; o JSON vai para
+    a fila do ``JsonLinesSink``. Com ``timer``, o tempo desde a extração conta
+    como etapa ``db`` (validações e gravações) e os tempos entram em ``timings``.
+    """
+    agora = timezone.now()
+    if timer is not None:
+        timer.lap('db')
+        data = {**data, 'timings': timer.as_dict()}
+    try:
+        linha = json.dumps(
+            {**data, 'log': prefixo, 'registrado_em': agora.isoformat()},
+            ensure_ascii=False, separators=(',', ':'), default=str,
+        )
+    except Exception:
+        return
+    _log_sink().submit(linha)
+
+    try:
+        log = montar_log(json.loads(linha), prefixo)
+        log.usuario = usuario if getattr(usuario, 'is_authenticated', False) else None
+        log.registrado_em = agora
+        # Savepoint: um erro aqui não pode invalidar a transação de quem chamou
+        with transaction.atomic():
+            log.save()
+    except Exception:
+        pass
+
+
+def registrado_em_arquivo(path: str, data: dict[str, Any]) -> datetime.datetime:
+    """Data do log de um arquivo antigo: campo ``ts`` ou, na falta dele, o mtime."""
+    try:
+        quando = datetime.datetime.fromisoformat(str(data.get('ts')))
+    except ValueError:
+        return datetime.datetime.fromtimestamp(os.path.getmtime(path), tz=datetime.timezone.utc)
+    return quando if timezone.is_aware(quando) else timezone.make_aware(quando)
+
+
+_METRICAS = ('upload_ms', 'extract_ms', 'parse_ms', 'db_ms', 'total_ms')
+_METRICAS_MAX_REGISTROS = 50000
+
+
+def _percentil(ordenados: list[float], p: float) -> float:
+    # Nearest-rank
+    indice = max(0, min(len(ordenados) - 1, int(-(-p * len(ordenados) // 100)) - 1))
+    return round(ordenados[indice], 1)
+
+
+def metricas_por_contexto(desde: datetime.datetime) -> dict[str, Any]:
+    """p50/p95/p99 de cada etapa, por tipo de documento, dos logs desde ``desde``.
+
+    Considera no máximo os ``_METRICAS_MAX_REGISTROS`` logs mais recentes; logs
+    sem tempos (anteriores à medição) são ignorados.
+    """
+    linhas = (
+        ImportLog.objects.filter(registrado_em__gte=desde, total_ms__isnull=False)
+        .order_by('-registrado_em')
+        .values_list('contexto', 'paginas', 'tamanho_bytes', *_METRICAS)[:_METRICAS_MAX_REGISTROS]
+    )
+    por_contexto: dict[str, dict[str, list]] = {}
+    for contexto, paginas, tamanho, *tempos in linhas:
+        valores = por_contexto.setdefault(contexto, {m: [] for m in ('paginas', 'bytes', *_METRICAS)})
+        for nome, valor in zip(('paginas', 'bytes', *_METRICAS), (paginas, tamanho, *tempos)):
+            if valor is not None:
+                valores[nome].append(valor)
+
+    resultado = {}
+    for contexto, valores in sorted(por_contexto.items()):
+        item: dict[str, Any] = {
+            'label': CONTEXTO_LABELS.get(contexto, contexto or 'Outros'),
+            'count': len(valores['total_ms']),
+        }
+        for nome, lista in valores.items():
+            if not lista:
+                item[nome] = None
+                continue
+            lista.sort()
+            item[nome] = {f'p{p}': _percentil(lista, p) for p in (50, 95, 99)}
+        resultado[contexto] = item
+    return resultado
@@ -0,0 +1,164 @@
+import json
+import os
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+import pdf
+from utils import pdf_parser
+from utils.pdf_corpus import DOCUMENT_KINDS, compare_fields, generate_corpus, render_pdf, text_line_accuracy
+
+
+def _json_default(valor):
+    return str(valor)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark dos parsers de PDF sobre um corpus sintético (utils/pdf_corpus): "
+        "documentos/s e acurácia por campo de cada parse_* e, com --pdf, de "
+        "pdf.extract_text sobre PDFs gerados. Use antes/depois de mexer nas regex."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--docs", type=int, default=100, help="Documentos por tipo (padrão: 100)")
+        parser.add_argument("--debitos", type=int, default=20, help="Blocos de débito por declaração (padrão: 20)")
+        parser.add_argument("--ruido", type=int, default=40, help="Linhas de texto irrelevante por documento (padrão: 40)")
+        parser.add_argument("--seed", type=int, default=0, help="Semente inicial do corpus (padrão: 0)")
+        parser.add_argument("--repeat", type=int, default=3, help="Repetições da medição; vale o melhor tempo (padrão: 3)")
+        parser.add_argument(
+            "--tipo",
+            action="append",
+            choices=sorted(DOCUMENT_KINDS),
+            default=None,
+            help="Somente este tipo de documento (pode repetir)",
+        )
+        parser.add_argument(
+            "--sem-ruido-layout",
+            action="store_true",
+            help="Layout limpo: rótulos 'Campo: valor', página única, sem cabeçalho/rodapé",
+        )
+        parser.add_argument(
+            "--pdf",
+            action="store_true",
+            help="Gera também os PDFs e mede pdf.extract_text e os parsers sobre o texto extraído",
+        )
+        parser.add_argument("--salvar", default=None, help="Grava o corpus (.txt, .json e, com --pdf, .pdf) neste diretório")
+        parser.add_argument(
+            "--minimo",
+            type=float,
+            default=None,
+            help="Falha (código de saída 1) se algum campo ficar abaixo desta acurácia, em %% (ex.: 100)",
+        )
+        parser.add_argument("--detalhado", action="store_true", help="Lista os documentos com campos errados")
+
+    def handle(self, *args, **options):
+        repeat = max(1, options["repeat"])
+        corpus = list(generate_corpus(
+            options["tipo"],
+            per_kind=max(1, options["docs"]),
+            seed=options["seed"],
+            debitos=options["debitos"],
+            noise_lines=options["ruido"],
+            layout_noise=not options["sem_ruido_layout"],
+        ))
+        por_tipo = defaultdict(list)
+        for documento in corpus:
+            por_tipo[documento.kind].append(documento)
+        self.stdout.write(
+            f"Corpus: {len(corpus)} documento(s) ({options['docs']} por tipo), "
+            f"{options['debitos']} débitos por declaração, seed {options['seed']}"
+        )
+
+        pdfs = {}
+        if options["pdf"]:
+            pdfs = {id(documento): render_pdf(documento.pages) for documento in corpus}
+        if options["salvar"]:
+            self._salvar(options["salvar"], corpus, pdfs)
+
+        taxas = []
+        self.stdout.write(f"\n{'tipo':14s} {'parser':36s} {'ms/doc':>8s} {'docs/s':>9s} {'campos ok':>10s}")
+        for tipo, documentos in por_tipo.items():
+            textos = [documento.text for documento in documentos]
+            for nome in DOCUMENT_KINDS[tipo]:
+                func = getattr(pdf_parser, nome)
+                tempo = self._medir(func, textos, repeat)
+                acertos = self._acuracia(func, documentos, textos, options["detalhado"])
+                taxas.extend(self._linhas_acuracia(tipo, nome, tempo, len(textos), acertos))
+
+        if pdfs:
+            self.stdout.write(f"\n{'tipo':14s} {'extract_text':36s} {'ms/doc':>8s} {'docs/s':>9s} {'linhas ok':>10s}")
+            for tipo, documentos in por_tipo.items():
+                binarios = [pdfs[id(documento)] for documento in documentos]
+                tempo = self._medir(pdf.extract_text, binarios, repeat)
+                extraidos = [pdf.extract_text(binario) for binario in binarios]
+                fidelidade = sum(
+                    text_line_accuracy(documento.text, texto) for documento, texto in zip(documentos, extraidos)
+                ) / len(documentos)
+                self.stdout.write(
+                    f"{tipo:14s} {'pdf.extract_text':36s} {tempo / len(binarios) * 1000:8.3f} "
+                    f"{len(binarios) / tempo if tempo else float('inf'):9.0f} {fidelidade:10.1%}"
+                )
+                # Ponta a ponta: parser sobre o texto que o pypdf devolveu
+                func = getattr(pdf_parser, DOCUMENT_KINDS[tipo][0])
+                acertos = self._acuracia(func, documentos, extraidos, options["detalhado"])
+                taxas.extend(self._linhas_acuracia(tipo, f"{func.__name__} (PDF)", None, len(binarios), acertos))
+
+        if options["minimo"] is not None:
+            abaixo = [linha for linha in taxas if linha[3] * 100 < options["minimo"]]
+            if abaixo:
+                for tipo, nome, campo, taxa in abaixo:
+                    self.stderr.write(f"  {tipo}/{nome}: {campo} {taxa:.1%}")
+                raise CommandError(f"{len(abaixo)} campo(s) abaixo de {options['minimo']}% de acurácia")
+            self.stdout.write(self.style.SUCCESS(f"\nTodos os campos com acurácia >= {options['minimo']}%"))
+
+    def _medir(self, func, entradas, repeat):
+        melhor = None
+        for _ in range(repeat):
+            inicio = time.perf_counter()
+            for entrada in entradas:
+                func(entrada)
+            decorrido = time.perf_counter() - inicio
+            melhor = decorrido if melhor is None else min(melhor, decorrido)
+        return melhor
+
+    def _acuracia(self, func, documentos, textos, detalhado):
+        acertos = {}
+        for documento, texto in zip(documentos, textos):
+            resultado = compare_fields(documento.expected, func(texto))
+            for campo, ok in resultado.items():
+                acertos[campo] = acertos.get(campo, 0) + ok
+            errados = [campo for campo, ok in resultado.items() if not ok]
+            if detalhado and errados:
+                self.stdout.write(f"  {documento.kind} seed={documento.seed} {func.__name__}: {', '.join(errados)}")
+        return acertos
+
+    def _linhas_acuracia(self, tipo, nome, tempo, total, acertos):
+        campos_ok = sum(1 for quantidade in acertos.values() if quantidade == total)
+        tempo_txt = (
+            f"{tempo / total * 1000:8.3f} {total / tempo if tempo else float('inf'):9.0f}"
+            if tempo is not None else f"{'':8s} {'':9s}"
+        )
+        estilo = self.style.SUCCESS if campos_ok == len(acertos) else self.style.WARNING
+        self.stdout.write(estilo(f"{tipo:14s} {nome:36s} {tempo_txt} {campos_ok:>5d}/{len(acertos):<4d}"))
+        linhas = []
+        for campo, quantidade in acertos.items():
+            taxa = quantidade / total
+            linhas.append((tipo, nome, campo, taxa))
+            if quantidade < total:
+                self.stdout.write(f"{'':15s}  {campo:34s} {taxa:8.1%} ({total - quantidade} erro(s))")
+        return linhas
+
+    def _salvar(self, destino, corpus, pdfs):
+        os.makedirs(destino, exist_ok=True)
+        for documento in corpus:
+            base = os.path.join(destino, f"{documento.kind}_{documento.seed:05d}")
+            with open(f"{base}.txt", "w", encoding="utf-8") as fh:
+                fh.write(documento.text)
+            with open(f"{base}.json", "w", encoding="utf-8") as fh:
+                json.dump(documento.expected, fh, ensure_ascii=False, indent=2, default=_json_default)
+            if id(documento) in pdfs:
+                with open(f"{base}.pdf", "wb") as fh:
+                    fh.write(pdfs[id(documento)])
+        self.stdout.write(f"Corpus gravado em {destino}")
@@ -0,0 +1,64 @@
+import os
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+
+from adesao.busca import indexar_anexos_pendentes
+from adesao.import_jobs import processar_itens, reservar_itens
+from utils.pdf_pool import get_pool_size
+
+
+class Command(BaseCommand):
+    help = (
+        "Processa a fila de importação de PDFs em lote (ImportJob) e, sem itens na fila, "
+        "indexa para a busca os anexos enviados ou alterados. "
+        "Vários workers podem rodar em paralelo: cada item é reservado com lock de linha."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--lote",
+            type=int,
+            default=0,
+            help="Itens reservados por rodada (padrão: PDF_EXTRACTION_WORKERS ou nº de CPUs)",
+        )
+        parser.add_argument(
+            "--intervalo",
+            type=float,
+            default=2.0,
+            help="Segundos de espera quando a fila está vazia (padrão: 2)",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Encerra quando a fila estiver vazia em vez de aguardar novos itens",
+        )
+
+    def handle(self, *args, **options):
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        lote = options["lote"] or get_pool_size(os.cpu_count() or 1)
+        intervalo = options["intervalo"]
+        self.stdout.write(f"[import_worker] {worker} iniciado (lote={lote})")
+
+        while True:
+            close_old_connections()
+            try:
+                itens = reservar_itens(worker, lote)
+                if itens:
+                    processar_itens(itens)
+                    self.stdout.write(f"[import_worker] {len(itens)} arquivo(s) processado(s)")
+                else:
+                    anexos = indexar_anexos_pendentes(lote)
+                    if anexos:
+                        self.stdout.write(f"[import_worker] {anexos} anexo(s) indexado(s)")
+            except DatabaseError as exc:
+                # Banco indisponível/migrações pendentes: tenta de novo na próxima rodada
+                self.stderr.write(f"[import_worker] erro de banco: {exc}")
+                itens = anexos = []
+            if not itens and not anexos:
+                if options["once"]:
+                    break
+                time.sleep(intervalo)
+        self.stdout.write(self.style.SUCCESS("[import_worker] fila vazia, encerrando"))
@@ -0,0 +1,78 @@
+import json
+import os
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from adesao.import_logs import logs_dir, montar_log, registrado_em_arquivo
+from adesao.models import ImportLog
+
+# <prefixo>_<AAAAMMDD>_<HHMMSS>[_<micro>]_<arquivo>.json
+_NOME_LOG = re.compile(r"^(?P<prefixo>[a-z_]+?)_\d{8}_\d{6}")
+
+
+class Command(BaseCommand):
+    help = (
+        "Carrega na tabela ImportLog os logs de importação gravados em JSON "
+        "(MEDIA_ROOT/import_logs). Arquivos já carregados são ignorados, então "
+        "o comando pode ser executado novamente com segurança."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--diretorio",
+            default=None,
+            help="Diretório dos logs (padrão: MEDIA_ROOT/import_logs)",
+        )
+        parser.add_argument(
+            "--bloco",
+            type=int,
+            default=500,
+            help="Registros por inserção no banco (padrão: 500)",
+        )
+
+    def handle(self, *args, **options):
+        diretorio = options["diretorio"] or logs_dir()
+        if not os.path.isdir(diretorio):
+            raise CommandError(f"Diretório não encontrado: {diretorio}")
+        bloco = max(1, options["bloco"])
+
+        nomes = sorted(nome for nome in os.listdir(diretorio) if nome.endswith(".json"))
+        existentes = set(
+            ImportLog.objects.filter(arquivo_log__isnull=False).values_list("arquivo_log", flat=True)
+        )
+        pendentes = [nome for nome in nomes if nome not in existentes]
+        self.stdout.write(f"{len(nomes)} arquivo(s) em {diretorio}; {len(pendentes)} a carregar")
+
+        usuarios = dict(get_user_model().objects.values_list("username", "pk"))
+        carregados = invalidos = 0
+        logs = []
+        for nome in pendentes:
+            caminho = os.path.join(diretorio, nome)
+            try:
+                with open(caminho, encoding="utf-8") as fh:
+                    data = json.load(fh)
+                if not isinstance(data, dict):
+                    raise ValueError("conteúdo não é um objeto JSON")
+                m = _NOME_LOG.match(nome)
+                log = montar_log(data, m.group("prefixo") if m else "")
+                log.usuario_id = usuarios.get(log.username)
+                log.arquivo_log = nome[:255]
+                log.registrado_em = registrado_em_arquivo(caminho, data)
+            except (OSError, ValueError) as exc:
+                invalidos += 1
+                self.stdout.write(self.style.WARNING(f"  ignorado {nome}: {exc}"))
+                continue
+            logs.append(log)
+            if len(logs) >= bloco:
+                ImportLog.objects.bulk_create(logs, ignore_conflicts=True)
+                carregados += len(logs)
+                logs = []
+                self.stdout.write(f"  {carregados} carregado(s)")
+        if logs:
+            ImportLog.objects.bulk_create(logs, ignore_conflicts=True)
+            carregados += len(logs)
+
+        estilo = self.style.SUCCESS if not invalidos else self.style.WARNING
+        self.stdout.write(estilo(f"Concluído: {carregados} carregado(s), {invalidos} ignorado(s)."))
@@ -0,0 +1,181 @@
+import hashlib
+import os
+import time
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+
+from adesao.documentos_importados import documentos_importados
+from adesao.views import importar_documento_extraido
+from utils.pdf_classifier import DOCUMENT_LABELS, parse_documento
+from utils.pdf_pool import iter_extract_and_parse
+
+
+class Checkpoint:
+    """Conteúdos já importados, por SHA-256 (arquivo texto, só acréscimos).
+
+    Cada linha: ``sha256<TAB>ok|erro<TAB>caminho``; vale a última linha de cada
+    hash. Gravado a cada arquivo, então uma execução interrompida retoma de onde
+    parou. Por ser por conteúdo, cópias do mesmo PDF também são puladas.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.status = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as fh:
+                for linha in fh:
+                    partes = linha.rstrip("\n").split("\t")
+                    if len(partes) >= 2:
+                        self.status[partes[0]] = partes[1]
+        self._fh = open(path, "a", encoding="utf-8")
+
+    def concluido(self, sha256, refazer_erros=False):
+        status = self.status.get(sha256)
+        return status == "ok" or (status == "erro" and not refazer_erros)
+
+    def registrar(self, sha256, ok, caminho):
+        status = "ok" if ok else "erro"
+        self._fh.write(f"{sha256}\t{status}\t{caminho}\n")
+        self._fh.flush()
+        self.status[sha256] = status
+
+    def close(self):
+        self._fh.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa todos os PDFs de um diretório (recursivo), identificando o tipo de cada "
+        "documento e aplicando as mesmas validações das telas de importação. A extração "
+        "roda no pool de processos; um checkpoint por SHA-256 permite retomar execuções "
+        "interrompidas sem refazer arquivos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("diretorio", help="Diretório com os PDFs (subpastas incluídas)")
+        parser.add_argument(
+            "--criar",
+            action="store_true",
+            help="Cria as adesões de PER/DCOMP (padrão: apenas extrai e valida esse tipo)",
+        )
+        parser.add_argument("--usuario", default=None, help="Username registrado nos logs de importação")
+        parser.add_argument(
+            "--checkpoint",
+            default=".importar_pdfs.checkpoint",
+            help="Arquivo de checkpoint (padrão: .importar_pdfs.checkpoint no diretório atual)",
+        )
+        parser.add_argument(
+            "--refazer-erros",
+            action="store_true",
+            help="Reprocessa arquivos que terminaram com erro em execuções anteriores",
+        )
+        parser.add_argument(
+            "--bloco",
+            type=int,
+            default=500,
+            help="Arquivos por bloco de extração/progresso (padrão: 500)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=0,
+            help="Processos de extração (padrão: PDF_EXTRACTION_WORKERS ou nº de CPUs)",
+        )
+
+    def handle(self, *args, **options):
+        raiz = os.path.abspath(options["diretorio"])
+        if not os.path.isdir(raiz):
+            raise CommandError(f"Diretório não encontrado: {raiz}")
+
+        usuario = self._usuario(options["usuario"])
+
+        caminhos = sorted(
+            os.path.join(pasta, nome)
+            for pasta, _subpastas, nomes in os.walk(raiz)
+            for nome in nomes
+            if nome.lower().endswith(".pdf")
+        )
+        total = len(caminhos)
+        self.stdout.write(f"{total} PDF(s) em {raiz}")
+
+        checkpoint = Checkpoint(options["checkpoint"])
+        bloco = max(1, options["bloco"])
+        resumo = Counter()
+        por_tipo = Counter()
+        vistos = set()
+        inicio = time.perf_counter()
+        try:
+            for i in range(0, total, bloco):
+                pendentes = []
+                for caminho in caminhos[i:i + bloco]:
+                    try:
+                        with open(caminho, "rb") as fh:
+                            sha256 = hashlib.file_digest(fh, "sha256").hexdigest()
+                    except OSError as exc:
+                        resumo["erro"] += 1
+                        self.stdout.write(self.style.WARNING(f"  ERRO  {os.path.relpath(caminho, raiz)}: {exc}"))
+                        continue
+                    if sha256 in vistos or checkpoint.concluido(sha256, options["refazer_erros"]):
+                        resumo["pulados"] += 1
+                        continue
+                    vistos.add(sha256)
+                    pendentes.append((caminho, sha256))
+
+                # Conteúdos já importados antes (pelas telas ou por outra execução)
+                importados = documentos_importados(sha256 for _, sha256 in pendentes)
+                if importados:
+                    resumo["importados"] += sum(1 for _, sha256 in pendentes if sha256 in importados)
+                    pendentes = [(caminho, sha256) for caminho, sha256 in pendentes if sha256 not in importados]
+
+                extraidos = iter_extract_and_parse(
+                    [caminho for caminho, _ in pendentes],
+                    parse_documento,
+                    max_workers=options["workers"] or None,
+                    hashes=[sha256 for _, sha256 in pendentes],
+                )
+                for (caminho, sha256), extraido in zip(pendentes, extraidos):
+                    relativo = os.path.relpath(caminho, raiz)
+                    res = importar_documento_extraido(usuario, options["criar"], relativo, (caminho, sha256), extraido)
+                    ok = bool(res.get("ok"))
+                    checkpoint.registrar(sha256, ok, relativo)
+                    resumo["ok" if ok else "erro"] += 1
+                    por_tipo[res.get("tipo_documento")] += 1
+                    if not ok:
+                        self.stdout.write(self.style.WARNING(f"  ERRO  {relativo}: {res.get('error')}"))
+                    elif options["verbosity"] >= 2:
+                        self.stdout.write(f"  OK    {relativo} ({res.get('tipo_documento_label')})")
+
+                self.stdout.write(self._progresso(min(i + bloco, total), total, resumo, inicio))
+        finally:
+            checkpoint.close()
+
+        self.stdout.write("Resumo por tipo de documento:")
+        for tipo, quantidade in por_tipo.most_common():
+            self.stdout.write(f"  {DOCUMENT_LABELS.get(tipo, 'Não reconhecido')}: {quantidade}")
+        estilo = self.style.SUCCESS if not resumo["erro"] else self.style.WARNING
+        self.stdout.write(estilo(
+            f"Concluído: {resumo['ok']} ok, {resumo['erro']} com erro, "
+            f"{resumo['pulados']} pulado(s) (já no checkpoint ou conteúdo repetido), "
+            f"{resumo['importados']} já importado(s) antes."
+        ))
+
+    def _usuario(self, username):
+        if not username:
+            return AnonymousUser()
+        try:
+            return get_user_model().objects.get(username=username)
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"Usuário '{username}' não encontrado.")
+
+    @staticmethod
+    def _progresso(vistos, total, resumo, inicio):
+        decorrido = time.perf_counter() - inicio
+        processados = resumo["ok"] + resumo["erro"]
+        taxa = processados / decorrido if decorrido else 0.0
+        return (
+            f"[{vistos}/{total}] {processados} processado(s), {resumo['pulados']} pulado(s) "
+            f"em {decorrido:.1f}s ({taxa:.1f} docs/s)"
+        )
@@ -0,0 +1,56 @@
+import zipfile
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from adesao.views import _iter_importar_lote
+from utils.pdf_zip import iter_zip_pdfs
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa os PDFs PER/DCOMP de arquivos .zip (ex.: pacotes do e-CAC), com as "
+        "mesmas validações da importação em lote. As entradas são lidas uma a uma, "
+        "sem extrair o .zip para o disco."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("arquivos", nargs="+", help="Caminho(s) do(s) arquivo(s) .zip")
+        parser.add_argument(
+            "--criar",
+            action="store_true",
+            help="Cria as adesões (padrão: apenas extrai e valida)",
+        )
+        parser.add_argument(
+            "--usuario",
+            default=None,
+            help="Username registrado nos logs de importação",
+        )
+
+    def handle(self, *args, **options):
+        user = None
+        if options["usuario"]:
+            try:
+                user = get_user_model().objects.get(username=options["usuario"])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"Usuário '{options['usuario']}' não encontrado.")
+
+        total = ok = criados = 0
+        for caminho in options["arquivos"]:
+            try:
+                entries = list(iter_zip_pdfs(caminho))
+            except (OSError, zipfile.BadZipFile) as exc:
+                raise CommandError(f"Não foi possível abrir {caminho}: {exc}")
+            self.stdout.write(f"{caminho}: {len(entries)} PDF(s)")
+            for res in _iter_importar_lote(user, entries, options["criar"]):
+                total += 1
+                if res.get("ok"):
+                    ok += 1
+                    criados += bool(res.get("created"))
+                    detalhe = f"criada adesão #{res['id']}" if res.get("created") else "dados extraídos"
+                    self.stdout.write(f"  OK    {res['file']} ({detalhe})")
+                else:
+                    self.stdout.write(self.style.WARNING(f"  ERRO  {res['file']}: {res.get('error')}"))
+
+        resumo = f"{total} PDF(s): {ok} ok, {total - ok} com erro, {criados} adesão(ões) criada(s)."
+        self.stdout.write(self.style.SUCCESS(resumo) if ok == total else self.style.WARNING(resumo))
@@ -0,0 +1,66 @@
+import time
+import zlib
+
+from django.core.management.base import BaseCommand
+
+from adesao.busca import indexar_anexo, indexar_documento
+from adesao.models import DocumentoImportado
+from lancamentos.models import Anexos
+from utils.pdf_text_store import decompress_text
+
+
+class Command(BaseCommand):
+    help = (
+        "Preenche o índice da busca textual: PDFs importados (a partir do texto "
+        "gravado na importação) e anexos PDF de lançamentos (extraídos no sandbox). "
+        "Por padrão, só os documentos ainda não indexados."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--refazer",
+            action="store_true",
+            help="Reindexa também os documentos já indexados",
+        )
+        parser.add_argument(
+            "--bloco",
+            type=int,
+            default=200,
+            help="Documentos lidos do banco por vez (padrão: 200)",
+        )
+
+    def handle(self, *args, **options):
+        bloco = max(1, options["bloco"])
+        inicio = time.perf_counter()
+
+        documentos = DocumentoImportado.objects.filter(texto__isnull=False).order_by("pk")
+        anexos = Anexos.objects.filter(arquivo__iendswith=".pdf").select_related("id_lancamento").order_by("pk")
+        if not options["refazer"]:
+            documentos = documentos.filter(texto_indexado__isnull=True)
+            anexos = anexos.filter(texto_indexado__isnull=True)
+
+        total_documentos = falhas = 0
+        for documento in documentos.iterator(chunk_size=bloco):
+            try:
+                texto = decompress_text(documento.texto)
+            except (zlib.error, UnicodeDecodeError) as exc:
+                falhas += 1
+                self.stdout.write(self.style.ERROR(f"  ERRO  {documento.arquivo} [{documento.sha256[:12]}]: {exc}"))
+                continue
+            indexar_documento(documento, texto)
+            total_documentos += 1
+
+        total_anexos = sem_texto = 0
+        for anexo in anexos.iterator(chunk_size=bloco):
+            if indexar_anexo(anexo):
+                total_anexos += 1
+            else:
+                sem_texto += 1
+                self.stdout.write(self.style.WARNING(f"  Sem texto: anexo {anexo.pk} ({anexo.arquivo.name})"))
+
+        decorrido = time.perf_counter() - inicio
+        estilo = self.style.WARNING if falhas or sem_texto else self.style.SUCCESS
+        self.stdout.write(estilo(
+            f"Concluído em {decorrido:.1f}s: {total_documentos} PDF(s) importado(s) e "
+            f"{total_anexos} anexo(s) indexado(s); {falhas} com texto ilegível, {sem_texto} anexo(s) sem texto."
+        ))
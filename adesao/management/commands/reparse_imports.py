@@ -0,0 +1,129 @@
+import datetime
+import multiprocessing
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from adesao.models import DocumentoImportado
+from utils.pdf_classifier import DOCUMENT_LABELS
+from utils.pdf_parser import PARSER_VERSION
+from utils.pdf_pool import get_pool_size
+from utils.pdf_text_store import diff_snapshots, reparse
+
+
+class Command(BaseCommand):
+    help = (
+        "Refaz o parsing dos documentos importados a partir do texto gravado na "
+        "importação (sem ler os PDFs) com os parsers atuais, em paralelo, e lista os "
+        "campos que mudaram em relação ao que foi extraído na época. Não altera o banco."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            default=None,
+            help="Somente documentos importados a partir desta data (AAAA-MM-DD)",
+        )
+        parser.add_argument(
+            "--tipo",
+            choices=sorted(DOCUMENT_LABELS),
+            default=None,
+            help="Somente documentos deste tipo",
+        )
+        parser.add_argument(
+            "--desatualizados",
+            action="store_true",
+            help=f"Somente documentos extraídos com versão de parser anterior à atual ({PARSER_VERSION})",
+        )
+        parser.add_argument(
+            "--bloco",
+            type=int,
+            default=500,
+            help="Documentos lidos do banco por vez (padrão: 500)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=0,
+            help="Processos de parsing (padrão: PDF_EXTRACTION_WORKERS ou nº de CPUs)",
+        )
+
+    def handle(self, *args, **options):
+        qs = DocumentoImportado.objects.filter(texto__isnull=False).order_by("importado_em", "pk")
+        if options["since"]:
+            try:
+                desde = datetime.date.fromisoformat(options["since"])
+            except ValueError:
+                raise CommandError(f"Data inválida em --since: {options['since']} (use AAAA-MM-DD)")
+            qs = qs.filter(importado_em__date__gte=desde)
+        if options["tipo"]:
+            qs = qs.filter(tipo=options["tipo"])
+        if options["desatualizados"]:
+            qs = qs.filter(versao_parser__lt=PARSER_VERSION)
+
+        total = qs.count()
+        self.stdout.write(f"{total} documento(s) a reprocessar (parser versão {PARSER_VERSION})")
+        if not total:
+            return
+        bloco = max(1, options["bloco"])
+        workers = options["workers"] or get_pool_size(total)
+
+        resumo = Counter()
+        por_campo = Counter()
+        inicio = time.perf_counter()
+        campos = ("pk", "sha256", "tipo", "arquivo", "versao_parser", "dados", "texto", "paginas_lidas", "paginas_total")
+        # 'spawn' pelo mesmo motivo de utils.pdf_pool; o parsing é só regex sobre o texto
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            documentos = []
+            for documento in qs.only(*campos).iterator(chunk_size=bloco):
+                documentos.append(documento)
+                if len(documentos) >= bloco:
+                    self._comparar(executor, documentos, workers, resumo, por_campo)
+                    documentos = []
+            if documentos:
+                self._comparar(executor, documentos, workers, resumo, por_campo)
+
+        decorrido = time.perf_counter() - inicio
+        if por_campo:
+            self.stdout.write("Campos alterados:")
+            for campo, quantidade in por_campo.most_common():
+                self.stdout.write(f"  {campo}: {quantidade}")
+        estilo = self.style.WARNING if resumo["alterados"] or resumo["erro"] else self.style.SUCCESS
+        self.stdout.write(estilo(
+            f"Concluído em {decorrido:.1f}s: {resumo['iguais']} sem alteração, {resumo['alterados']} com "
+            f"campos diferentes, {resumo['erro']} com erro ({resumo['parciais']} com texto parcial)."
+        ))
+
+    def _comparar(self, executor, documentos, workers, resumo, por_campo):
+        chunksize = max(1, len(documentos) // (workers * 4))
+        resultados = executor.map(
+            reparse,
+            [documento.tipo for documento in documentos],
+            [bytes(documento.texto) for documento in documentos],
+            chunksize=chunksize,
+        )
+        for documento, (novo, erro) in zip(documentos, resultados):
+            rotulo = f"{documento.arquivo} [{documento.sha256[:12]}] ({documento.get_tipo_display()}, v{documento.versao_parser})"
+            parcial = (
+                documento.paginas_total is not None
+                and documento.paginas_lidas is not None
+                and documento.paginas_lidas < documento.paginas_total
+            )
+            resumo["parciais"] += parcial
+            if erro is not None:
+                resumo["erro"] += 1
+                self.stdout.write(self.style.ERROR(f"  ERRO  {rotulo}: {erro}"))
+                continue
+            diferencas = diff_snapshots(documento.dados, novo)
+            if not diferencas:
+                resumo["iguais"] += 1
+                continue
+            resumo["alterados"] += 1
+            por_campo.update(diferencas.keys())
+            aviso = f" — texto parcial ({documento.paginas_lidas}/{documento.paginas_total} páginas)" if parcial else ""
+            self.stdout.write(self.style.WARNING(f"  DIFF  {rotulo}{aviso}"))
+            for campo, (antes, depois) in diferencas.items():
+                self.stdout.write(f"          {campo}: {antes!r} -> {depois!r}")
+
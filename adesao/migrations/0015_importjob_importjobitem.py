@@ -0,0 +1,55 @@
+# Generated by Django 5.2.4 on 2026-10-17 17:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adesao', '0014_alter_adesao_metodo_credito_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('criar', models.BooleanField(default=False, help_text='Se desmarcado, apenas extrai os dados (pré-visualização)', verbose_name='Criar adesões')),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('processando', 'Processando'), ('concluido', 'Concluído')], default='pendente', max_length=20, verbose_name='Status')),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('concluido_em', models.DateTimeField(blank=True, null=True)),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='import_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Importação em lote',
+                'verbose_name_plural': 'Importações em lote',
+                'ordering': ['-criado_em'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ImportJobItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ordem', models.PositiveIntegerField(verbose_name='Ordem')),
+                ('nome_arquivo', models.CharField(max_length=255, verbose_name='Arquivo')),
+                ('conteudo', models.BinaryField(blank=True, null=True)),
+                ('sha256', models.CharField(blank=True, max_length=64, null=True)),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('processando', 'Processando'), ('concluido', 'Concluído'), ('erro', 'Erro')], default='pendente', max_length=20, verbose_name='Status')),
+                ('resultado', models.JSONField(blank=True, null=True, verbose_name='Resultado')),
+                ('worker', models.CharField(blank=True, max_length=120, null=True)),
+                ('tentativas', models.PositiveSmallIntegerField(default=0)),
+                ('iniciado_em', models.DateTimeField(blank=True, null=True)),
+                ('concluido_em', models.DateTimeField(blank=True, null=True)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='adesao.importjob', verbose_name='Importação')),
+            ],
+            options={
+                'verbose_name': 'Arquivo da importação',
+                'verbose_name_plural': 'Arquivos da importação',
+                'ordering': ['job', 'ordem'],
+                'indexes': [models.Index(fields=['status', 'iniciado_em'], name='adesao_impo_status_98d53c_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.4 on 2026-10-17 17:53
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adesao', '0015_importjob_importjobitem'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('username', models.CharField(blank=True, max_length=150, null=True, verbose_name='Usuário')),
+                ('contexto', models.CharField(blank=True, default='', max_length=40, verbose_name='Contexto')),
+                ('arquivo', models.CharField(max_length=255, verbose_name='Arquivo')),
+                ('sha256', models.CharField(blank=True, max_length=64, null=True)),
+                ('perdcomp', models.CharField(blank=True, max_length=50, null=True, verbose_name='PER/DCOMP')),
+                ('cnpj', models.CharField(blank=True, max_length=20, null=True, verbose_name='CNPJ')),
+                ('ok', models.BooleanField(null=True, verbose_name='Sucesso')),
+                ('criado', models.BooleanField(null=True, verbose_name='Criado')),
+                ('atualizado', models.BooleanField(null=True, verbose_name='Atualizado')),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('erro', models.TextField(blank=True, null=True, verbose_name='Erro')),
+                ('detail_url', models.CharField(blank=True, max_length=255, null=True)),
+                ('dados', models.JSONField(default=dict, verbose_name='Dados')),
+                ('arquivo_log', models.CharField(blank=True, max_length=255, null=True, unique=True)),
+                ('registrado_em', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Quando')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='import_logs', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Log de importação',
+                'verbose_name_plural': 'Logs de importação',
+                'ordering': ['-registrado_em', '-pk'],
+                'indexes': [models.Index(fields=['-registrado_em'], name='adesao_impo_registr_73f99a_idx'), models.Index(fields=['contexto', '-registrado_em'], name='adesao_impo_context_fcd555_idx'), models.Index(fields=['ok', '-registrado_em'], name='adesao_impo_ok_495de4_idx'), models.Index(fields=['username', '-registrado_em'], name='adesao_impo_usernam_d8d87c_idx'), models.Index(fields=['perdcomp'], name='adesao_impo_perdcom_9119cf_idx'), models.Index(fields=['cnpj'], name='adesao_impo_cnpj_50382c_idx')],
+            },
+        ),
+    ]
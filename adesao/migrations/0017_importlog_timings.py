@@ -0,0 +1,48 @@
+# Generated by Django 5.2.4 on 2026-10-17 17:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adesao', '0016_importlog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importlog',
+            name='db_ms',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='importlog',
+            name='extract_ms',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='importlog',
+            name='paginas',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Páginas lidas'),
+        ),
+        migrations.AddField(
+            model_name='importlog',
+            name='parse_ms',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='importlog',
+            name='tamanho_bytes',
+            field=models.PositiveBigIntegerField(blank=True, null=True, verbose_name='Tamanho (bytes)'),
+        ),
+        migrations.AddField(
+            model_name='importlog',
+            name='total_ms',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='importlog',
+            name='upload_ms',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
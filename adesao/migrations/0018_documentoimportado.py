@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:07
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adesao', '0017_importlog_timings'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentoImportado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True, verbose_name='SHA-256')),
+                ('tipo', models.CharField(choices=[('perdcomp', 'PER/DCOMP'), ('pedido_credito', 'Pedido de Crédito'), ('declaracao_compensacao', 'Declaração de Compensação'), ('recibo_pedido_credito', 'Recibo de Pedido de Crédito'), ('credito_em_conta', 'Notificação de Crédito em Conta')], max_length=40, verbose_name='Tipo de documento')),
+                ('perdcomp', models.CharField(blank=True, max_length=50, null=True, verbose_name='PER/DCOMP')),
+                ('arquivo', models.CharField(max_length=255, verbose_name='Arquivo')),
+                ('importado_em', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Importado em')),
+                ('adesao', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='documentos_importados', to='adesao.adesao', verbose_name='Adesão')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='documentos_importados', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Documento importado',
+                'verbose_name_plural': 'Documentos importados',
+                'ordering': ['-importado_em'],
+            },
+        ),
+    ]
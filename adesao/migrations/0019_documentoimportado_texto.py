@@ -0,0 +1,44 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adesao', '0018_documentoimportado'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentoimportado',
+            name='dados',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Campos extraídos'),
+        ),
+        migrations.AddField(
+            model_name='documentoimportado',
+            name='paginas_lidas',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Páginas lidas'),
+        ),
+        migrations.AddField(
+            model_name='documentoimportado',
+            name='paginas_total',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Páginas'),
+        ),
+        migrations.AddField(
+            model_name='documentoimportado',
+            name='texto',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='documentoimportado',
+            name='versao_parser',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Versão do parser'),
+        ),
+        migrations.AddIndex(
+            model_name='documentoimportado',
+            index=models.Index(fields=['importado_em'], name='adesao_docu_importa_43654f_idx'),
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Índice de busca textual, conforme o banco (ver adesao.busca). No SQLite, uma
+# tabela FTS5 de conteúdo externo sincronizada por triggers; no Postgres, uma
+# coluna tsvector gerada (pontuação vira espaço, para que números como CNPJ e
+# PER/DCOMP sejam separados igual à consulta) com índice GIN.
+SQLITE_FORWARD = [
+    """CREATE VIRTUAL TABLE adesao_textoindexado_fts USING fts5(
+        titulo, conteudo, content='adesao_textoindexado', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER adesao_textoindexado_fts_ai AFTER INSERT ON adesao_textoindexado BEGIN
+        INSERT INTO adesao_textoindexado_fts(rowid, titulo, conteudo) VALUES (new.id, new.titulo, new.conteudo);
+    END""",
+    """CREATE TRIGGER adesao_textoindexado_fts_ad AFTER DELETE ON adesao_textoindexado BEGIN
+        INSERT INTO adesao_textoindexado_fts(adesao_textoindexado_fts, rowid, titulo, conteudo)
+        VALUES ('delete', old.id, old.titulo, old.conteudo);
+    END""",
+    """CREATE TRIGGER adesao_textoindexado_fts_au AFTER UPDATE ON adesao_textoindexado BEGIN
+        INSERT INTO adesao_textoindexado_fts(adesao_textoindexado_fts, rowid, titulo, conteudo)
+        VALUES ('delete', old.id, old.titulo, old.conteudo);
+        INSERT INTO adesao_textoindexado_fts(rowid, titulo, conteudo) VALUES (new.id, new.titulo, new.conteudo);
+    END""",
+]
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS adesao_textoindexado_fts_au",
+    "DROP TRIGGER IF EXISTS adesao_textoindexado_fts_ad",
+    "DROP TRIGGER IF EXISTS adesao_textoindexado_fts_ai",
+    "DROP TABLE IF EXISTS adesao_textoindexado_fts",
+]
+POSTGRES_FORWARD = [
+    """ALTER TABLE adesao_textoindexado ADD COLUMN busca tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('portuguese', regexp_replace(titulo, '[^[:alnum:]]+', ' ', 'g')), 'A')
+        || setweight(to_tsvector('portuguese', regexp_replace(conteudo, '[^[:alnum:]]+', ' ', 'g')), 'B')
+    ) STORED""",
+    "CREATE INDEX adesao_textoindexado_busca_gin ON adesao_textoindexado USING gin (busca)",
+]
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS adesao_textoindexado_busca_gin",
+    "ALTER TABLE adesao_textoindexado DROP COLUMN IF EXISTS busca",
+]
+
+
+def _executar(schema_editor, por_banco):
+    for sql in por_banco.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def criar_indice_busca(apps, schema_editor):
+    _executar(schema_editor, {'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD})
+
+
+def remover_indice_busca(apps, schema_editor):
+    _executar(schema_editor, {'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRES_REVERSE})
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adesao', '0019_documentoimportado_texto'),
+        ('lancamentos', '0015_alter_lancamentos_unique_together'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TextoIndexado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('origem', models.CharField(choices=[('importacao', 'PDF importado'), ('anexo', 'Anexo de lançamento')], max_length=20, verbose_name='Origem')),
+                ('titulo', models.CharField(max_length=255, verbose_name='Título')),
+                ('conteudo', models.TextField(verbose_name='Conteúdo')),
+                ('indexado_em', models.DateTimeField(auto_now=True, verbose_name='Indexado em')),
+                ('adesao', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='textos_indexados', to='adesao.adesao', verbose_name='Adesão')),
+                ('anexo', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='texto_indexado', to='lancamentos.anexos', verbose_name='Anexo')),
+                ('documento', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='texto_indexado', to='adesao.documentoimportado', verbose_name='Documento importado')),
+            ],
+            options={
+                'verbose_name': 'Texto indexado',
+                'verbose_name_plural': 'Textos indexados',
+            },
+        ),
+        migrations.RunPython(criar_indice_busca, remover_indice_busca),
+    ]
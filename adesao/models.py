@@ -1,6 +1,9 @@
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 from clientes_parceiros.models import ClientesParceiros
 from simple_history.models import HistoricalRecords
+from utils.pdf_classifier import DOCUMENT_LABELS
 
 class Adesao(models.Model):
    
@@ -246,3 +249,306 @@ class Adesao(models.Model):
         verbose_name = 'Adesão'
         verbose_name_plural = 'Adesões'
     
+
+
+class ImportJob(models.Model):
+    """Lote de PDFs PER/DCOMP importado em segundo plano (``manage.py import_worker``)."""
+
+    PENDENTE = 'pendente'
+    PROCESSANDO = 'processando'
+    CONCLUIDO = 'concluido'
+
+    status_options = [
+        (PENDENTE, 'Pendente'),
+        (PROCESSANDO, 'Processando'),
+        (CONCLUIDO, 'Concluído'),
+    ]
+
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='import_jobs',
+        verbose_name='Usuário'
+    )
+
+    criar = models.BooleanField(
+        default=False,
+        verbose_name='Criar adesões',
+        help_text='Se desmarcado, apenas extrai os dados (pré-visualização)'
+    )
+
+    status = models.CharField(
+        max_length=20,
+        choices=status_options,
+        verbose_name='Status',
+        default=PENDENTE
+    )
+
+    criado_em = models.DateTimeField(auto_now_add=True)
+    concluido_em = models.DateTimeField(blank=True, null=True)
+
+    def atualizar_status(self):
+        """Recalcula ``status``/``concluido_em`` a partir da situação dos itens."""
+        em_aberto = self.items.filter(status__in=(ImportJobItem.PENDENTE, ImportJobItem.PROCESSANDO))
+        if not em_aberto.exists():
+            status, concluido_em = self.CONCLUIDO, self.concluido_em or timezone.now()
+        elif self.items.exclude(status=ImportJobItem.PENDENTE).exists():
+            status, concluido_em = self.PROCESSANDO, None
+        else:
+            status, concluido_em = self.PENDENTE, None
+        if (status, concluido_em) != (self.status, self.concluido_em):
+            self.status, self.concluido_em = status, concluido_em
+            self.save(update_fields=['status', 'concluido_em'])
+
+    def __str__(self):
+        return f"Importação #{self.pk} ({self.get_status_display()})"
+
+    class Meta:
+        verbose_name = 'Importação em lote'
+        verbose_name_plural = 'Importações em lote'
+        ordering = ['-criado_em']
+
+
+class ImportJobItem(models.Model):
+    """Arquivo de um ``ImportJob``; o PDF fica no banco até ser processado."""
+
+    PENDENTE = 'pendente'
+    PROCESSANDO = 'processando'
+    CONCLUIDO = 'concluido'
+    ERRO = 'erro'
+
+    status_options = [
+        (PENDENTE, 'Pendente'),
+        (PROCESSANDO, 'Processando'),
+        (CONCLUIDO, 'Concluído'),
+        (ERRO, 'Erro'),
+    ]
+
+    job = models.ForeignKey(
+        ImportJob,
+        on_delete=models.CASCADE,
+        related_name='items',
+        verbose_name='Importação'
+    )
+
+    ordem = models.PositiveIntegerField(verbose_name='Ordem')
+
+    nome_arquivo = models.CharField(max_length=255, verbose_name='Arquivo')
+
+    # Conteúdo do PDF (limpo após o processamento). No banco, e não em
+    # MEDIA_ROOT, para não ficar exposto pelo Nginx e dispensar volume
+    # compartilhado entre web e worker.
+    conteudo = models.BinaryField(blank=True, null=True, editable=False)
+
+    sha256 = models.CharField(max_length=64, blank=True, null=True)
+
+    status = models.CharField(
+        max_length=20,
+        choices=status_options,
+        verbose_name='Status',
+        default=PENDENTE
+    )
+
+    resultado = models.JSONField(blank=True, null=True, verbose_name='Resultado')
+
+    worker = models.CharField(max_length=120, blank=True, null=True)
+    tentativas = models.PositiveSmallIntegerField(default=0)
+    iniciado_em = models.DateTimeField(blank=True, null=True)
+    concluido_em = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.nome_arquivo} ({self.get_status_display()})"
+
+    class Meta:
+        verbose_name = 'Arquivo da importação'
+        verbose_name_plural = 'Arquivos da importação'
+        ordering = ['job', 'ordem']
+        indexes = [
+            models.Index(fields=['status', 'iniciado_em']),
+        ]
+
+
+class ImportLog(models.Model):
+    """Log de uma importação de PDF (um por arquivo), consultado na tela de logs.
+
+    ``dados`` guarda o payload completo do log; as demais colunas são extraídas
+    dele para filtros e ordenação sem ler o JSON.
+    """
+
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='import_logs',
+        verbose_name='Usuário'
+    )
+
+    # Username como registrado no log (mantido se o usuário for removido)
+    username = models.CharField(max_length=150, blank=True, null=True, verbose_name='Usuário')
+
+    contexto = models.CharField(max_length=40, blank=True, default='', verbose_name='Contexto')
+
+    arquivo = models.CharField(max_length=255, verbose_name='Arquivo')
+
+    sha256 = models.CharField(max_length=64, blank=True, null=True)
+
+    perdcomp = models.CharField(max_length=50, blank=True, null=True, verbose_name='PER/DCOMP')
+
+    cnpj = models.CharField(max_length=20, blank=True, null=True, verbose_name='CNPJ')
+
+    ok = models.BooleanField(null=True, verbose_name='Sucesso')
+    criado = models.BooleanField(null=True, verbose_name='Criado')
+    atualizado = models.BooleanField(null=True, verbose_name='Atualizado')
+
+    status_code = models.PositiveSmallIntegerField(blank=True, null=True)
+
+    erro = models.TextField(blank=True, null=True, verbose_name='Erro')
+
+    detail_url = models.CharField(max_length=255, blank=True, null=True)
+
+    dados = models.JSONField(default=dict, verbose_name='Dados')
+
+    # Tempo por etapa da importação, em ms (ver utils.stage_timer)
+    upload_ms = models.FloatField(blank=True, null=True)
+    extract_ms = models.FloatField(blank=True, null=True)
+    parse_ms = models.FloatField(blank=True, null=True)
+    db_ms = models.FloatField(blank=True, null=True)
+    total_ms = models.FloatField(blank=True, null=True)
+    paginas = models.PositiveIntegerField(blank=True, null=True, verbose_name='Páginas lidas')
+    tamanho_bytes = models.PositiveBigIntegerField(blank=True, null=True, verbose_name='Tamanho (bytes)')
+
+    # Nome do arquivo .json avulso (logs anteriores aos segmentos JSON Lines)
+    # de onde o registro foi carregado; evita duplicá-lo ao repetir a carga
+    arquivo_log = models.CharField(max_length=255, blank=True, null=True, unique=True)
+
+    registrado_em = models.DateTimeField(default=timezone.now, verbose_name='Quando')
+
+    def __str__(self):
+        return f"{self.arquivo} ({self.registrado_em:%d/%m/%Y %H:%M:%S})"
+
+    class Meta:
+        verbose_name = 'Log de importação'
+        verbose_name_plural = 'Logs de importação'
+        ordering = ['-registrado_em', '-pk']
+        indexes = [
+            models.Index(fields=['-registrado_em']),
+            models.Index(fields=['contexto', '-registrado_em']),
+            models.Index(fields=['ok', '-registrado_em']),
+            models.Index(fields=['username', '-registrado_em']),
+            models.Index(fields=['perdcomp']),
+            models.Index(fields=['cnpj']),
+        ]
+
+
+class DocumentoImportado(models.Model):
+    """PDF já importado, identificado pelo SHA-256 do conteúdo.
+
+    Registrado quando a importação cria ou atualiza uma adesão; um novo envio
+    do mesmo arquivo é recusado pelo hash, antes da extração do PDF. Removido
+    junto com a adesão (o documento pode então ser importado de novo).
+    """
+
+    sha256 = models.CharField(max_length=64, unique=True, verbose_name='SHA-256')
+
+    tipo = models.CharField(max_length=40, choices=list(DOCUMENT_LABELS.items()), verbose_name='Tipo de documento')
+
+    # Número do próprio documento (ex.: PER/DCOMP da declaração de compensação)
+    perdcomp = models.CharField(max_length=50, blank=True, null=True, verbose_name='PER/DCOMP')
+
+    adesao = models.ForeignKey(
+        Adesao,
+        on_delete=models.CASCADE,
+        related_name='documentos_importados',
+        verbose_name='Adesão'
+    )
+
+    arquivo = models.CharField(max_length=255, verbose_name='Arquivo')
+
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='documentos_importados',
+        verbose_name='Usuário'
+    )
+
+    importado_em = models.DateTimeField(default=timezone.now, verbose_name='Importado em')
+
+    # Texto extraído (zlib, ver utils.pdf_text_store) e campos obtidos dele na
+    # importação, com a versão dos parsers: permite refazer o parsing
+    # (``manage.py reparse_imports``) sem o PDF original
+    texto = models.BinaryField(blank=True, null=True, editable=False)
+    versao_parser = models.PositiveIntegerField(blank=True, null=True, verbose_name='Versão do parser')
+    dados = models.JSONField(default=dict, blank=True, verbose_name='Campos extraídos')
+    paginas_lidas = models.PositiveIntegerField(blank=True, null=True, verbose_name='Páginas lidas')
+    paginas_total = models.PositiveIntegerField(blank=True, null=True, verbose_name='Páginas')
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} {self.perdcomp or self.arquivo}"
+
+    class Meta:
+        verbose_name = 'Documento importado'
+        verbose_name_plural = 'Documentos importados'
+        ordering = ['-importado_em']
+        indexes = [
+            models.Index(fields=['importado_em']),
+        ]
+
+
+class TextoIndexado(models.Model):
+    """Texto de um documento para a busca textual (``adesao.busca``).
+
+    Um registro por PDF importado (``documento``) ou anexo PDF de lançamento
+    (``anexo``). O índice é criado pela migração conforme o banco: tabela FTS5
+    ``adesao_textoindexado_fts`` (mantida por triggers) no SQLite, coluna
+    gerada ``busca`` (tsvector) com índice GIN no Postgres.
+    """
+
+    ORIGEM_IMPORTACAO = 'importacao'
+    ORIGEM_ANEXO = 'anexo'
+    ORIGENS = [
+        (ORIGEM_IMPORTACAO, 'PDF importado'),
+        (ORIGEM_ANEXO, 'Anexo de lançamento'),
+    ]
+
+    origem = models.CharField(max_length=20, choices=ORIGENS, verbose_name='Origem')
+
+    adesao = models.ForeignKey(
+        Adesao,
+        on_delete=models.CASCADE,
+        related_name='textos_indexados',
+        verbose_name='Adesão'
+    )
+
+    documento = models.OneToOneField(
+        DocumentoImportado,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='texto_indexado',
+        verbose_name='Documento importado'
+    )
+
+    anexo = models.OneToOneField(
+        'lancamentos.Anexos',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='texto_indexado',
+        verbose_name='Anexo'
+    )
+
+    titulo = models.CharField(max_length=255, verbose_name='Título')
+    conteudo = models.TextField(verbose_name='Conteúdo')
+    indexado_em = models.DateTimeField(auto_now=True, verbose_name='Indexado em')
+
+    def __str__(self):
+        return self.titulo
+
+    class Meta:
+        verbose_name = 'Texto indexado'
+        verbose_name_plural = 'Textos indexados'
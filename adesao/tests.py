@@ -0,0 +1,375 @@
+import hashlib
+import io
+import os
+import tempfile
+import zipfile
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import UserProfile
+from clientes_parceiros.models import ClientesParceiros
+from empresas.models import Empresa
+from utils.pdf_cache import PDFTextCache
+from utils.pdf_classifier import DOC_DECLARACAO_COMPENSACAO, DOC_PEDIDO_CREDITO
+from utils.pdf_corpus import generate_document, render_pdf
+
+from .busca import buscar, indexar_documento
+from .documentos_importados import registrar_documento
+from .import_jobs import enfileirar, processar_itens, reservar_itens
+from .models import Adesao, DocumentoImportado, ImportJob, ImportJobItem
+
+User = get_user_model()
+
+
+def criar_cliente(cnpj, tipo_parceria='cliente', base=None):
+    """Vínculo com a empresa do CNPJ informado (cria a empresa)."""
+    empresa = Empresa.objects.create(cnpj=cnpj, razao_social=f'Empresa {cnpj}')
+    return ClientesParceiros.objects.create(
+        id_company_base=base or empresa, id_company_vinculada=empresa,
+        nome_referencia='Cliente Teste', tipo_parceria=tipo_parceria,
+    )
+
+
+def upload_do_corpus(tipo, semente, nome=None):
+    """(documento sintético, upload com o PDF dele)."""
+    doc = generate_document(tipo, semente)
+    return doc, SimpleUploadedFile(nome or f'{tipo}_{semente}.pdf', render_pdf(doc.pages), 'application/pdf')
+
+
+@override_settings(PDF_EXTRACTION_SANDBOX=False)
+class ImportacaoTestCase(TestCase):
+    """Extração no próprio processo, sem cache de texto nem logs JSON em disco."""
+
+    def setUp(self):
+        for alvo, valor in (
+            ('utils.pdf_cache._cache', PDFTextCache('')),
+            ('adesao.import_logs._sink', mock.Mock()),
+        ):
+            patcher = mock.patch(alvo, valor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.usuario = User.objects.create_user('importador', password='senha')
+
+
+class FilaImportacaoTests(ImportacaoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.docs, self.uploads = [], []
+        # Declarações vinculadas a pedido: criam a adesão e os débitos do PDF
+        for semente in range(3):
+            doc, upload = upload_do_corpus('declaracao', semente)
+            criar_cliente(doc.expected['cnpj'])
+            self.docs.append(doc)
+            self.uploads.append(upload)
+
+    def _abandonar(self, item, tentativas=None):
+        # Como se o worker tivesse caído logo depois de reservar o item
+        campos = {'iniciado_em': timezone.now() - timedelta(seconds=settings.IMPORT_JOB_STALE_SECONDS + 60)}
+        if tentativas is not None:
+            campos['tentativas'] = tentativas
+        ImportJobItem.objects.filter(pk=item.pk).update(**campos)
+
+    def test_enfileirar_reservar_e_processar(self):
+        job = enfileirar(self.usuario, self.uploads, criar=True)
+
+        self.assertEqual(job.status, ImportJob.PENDENTE)
+        self.assertEqual(
+            list(job.items.order_by('ordem').values_list('nome_arquivo', 'status')),
+            [(upload.name, ImportJobItem.PENDENTE) for upload in self.uploads],
+        )
+
+        itens = reservar_itens('w1', 10)
+
+        self.assertEqual([item.ordem for item in itens], [0, 1, 2])
+        self.assertTrue(all(item.status == ImportJobItem.PROCESSANDO and item.tentativas == 1 for item in itens))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.PROCESSANDO)
+
+        processar_itens(itens)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.CONCLUIDO)
+        self.assertIsNotNone(job.concluido_em)
+        for item, doc in zip(job.items.order_by('ordem'), self.docs):
+            self.assertEqual(item.status, ImportJobItem.CONCLUIDO)
+            self.assertTrue(item.resultado['created'])
+            self.assertIsNone(item.conteudo)
+            adesao = Adesao.objects.get(pk=item.resultado['id'])
+            self.assertEqual(adesao.perdcomp, doc.expected['perdcomp'])
+            self.assertEqual(adesao.lancamentos.count(), len(doc.expected['debitos']))
+            self.assertEqual(adesao.historico.first().history_user, self.usuario)
+
+    def test_job_concluido_so_com_todos_os_itens(self):
+        job = enfileirar(self.usuario, self.uploads, criar=False)
+
+        processar_itens(reservar_itens('w1', 2))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.PROCESSANDO)
+        self.assertIsNone(job.concluido_em)
+        self.assertFalse(Adesao.objects.exists())  # criar=False: só pré-visualização
+
+        processar_itens(reservar_itens('w1', 2))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.CONCLUIDO)
+        self.assertEqual(
+            sorted(item.resultado['fields']['perdcomp'] for item in job.items.all()),
+            sorted(doc.expected['perdcomp'] for doc in self.docs),
+        )
+
+    def test_workers_nao_reservam_o_mesmo_item(self):
+        enfileirar(self.usuario, self.uploads, criar=False)
+
+        w1 = reservar_itens('w1', 2)
+        w2 = reservar_itens('w2', 2)
+
+        self.assertEqual(len(w1), 2)
+        self.assertEqual(len(w2), 1)
+        self.assertFalse({item.pk for item in w1} & {item.pk for item in w2})
+        self.assertEqual(reservar_itens('w3', 2), [])
+        self.assertEqual(
+            dict(ImportJobItem.objects.values_list('pk', 'worker')),
+            {**{item.pk: 'w1' for item in w1}, **{item.pk: 'w2' for item in w2}},
+        )
+
+    def test_zip_vira_um_item_por_pdf(self):
+        pdfs = {f'{i}.pdf': render_pdf(doc.pages) for i, doc in enumerate(self.docs)}
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr('__MACOSX/._0.pdf', b'metadados')
+            zf.writestr('leia-me.txt', b'texto')
+            for nome, dados in pdfs.items():
+                zf.writestr(nome, dados)
+
+        job = enfileirar(self.usuario, [SimpleUploadedFile('lote.zip', buf.getvalue())], criar=False)
+
+        self.assertEqual(
+            list(job.items.order_by('ordem').values_list('nome_arquivo', 'sha256', 'status')),
+            [(f'lote.zip/{nome}', hashlib.sha256(dados).hexdigest(), ImportJobItem.PENDENTE)
+             for nome, dados in pdfs.items()],
+        )
+        processar_itens(reservar_itens('w1', 10))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.CONCLUIDO)
+        self.assertTrue(all(item.resultado['ok'] for item in job.items.all()))
+
+    def test_zip_invalido_entra_como_erro(self):
+        job = enfileirar(self.usuario, [SimpleUploadedFile('ruim.zip', b'PK\x03\x04 corrompido')], criar=False)
+
+        [item] = job.items.all()
+        self.assertEqual(item.status, ImportJobItem.ERRO)
+        self.assertEqual(item.resultado['error'], 'Arquivo ZIP inválido ou corrompido.')
+        self.assertEqual(job.status, ImportJob.CONCLUIDO)
+        self.assertEqual(reservar_itens('w1', 10), [])
+
+    def test_item_abandonado_volta_para_a_fila(self):
+        enfileirar(self.usuario, self.uploads[:1], criar=False)
+        [item] = reservar_itens('w1', 10)
+        self.assertEqual(reservar_itens('w2', 10), [])  # ainda dentro do prazo
+
+        self._abandonar(item)
+        [retomado] = reservar_itens('w2', 10)
+
+        self.assertEqual(retomado.pk, item.pk)
+        self.assertEqual(retomado.worker, 'w2')
+        self.assertEqual(retomado.tentativas, 2)
+        processar_itens([retomado])
+        retomado.refresh_from_db()
+        self.assertEqual(retomado.status, ImportJobItem.CONCLUIDO)
+
+    def test_item_abandonado_sem_tentativas_expira(self):
+        job = enfileirar(self.usuario, self.uploads[:2], criar=False)
+        primeiro, segundo = reservar_itens('w1', 10)
+        processar_itens([segundo])
+
+        self._abandonar(primeiro, tentativas=settings.IMPORT_JOB_MAX_ATTEMPTS)
+
+        self.assertEqual(reservar_itens('w2', 10), [])
+        primeiro.refresh_from_db()
+        self.assertEqual(primeiro.status, ImportJobItem.ERRO)
+        self.assertFalse(primeiro.resultado['ok'])
+        self.assertIn(f'{settings.IMPORT_JOB_MAX_ATTEMPTS} tentativa(s)', primeiro.resultado['error'])
+        self.assertIsNone(primeiro.conteudo)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.CONCLUIDO)
+
+
+class BuscaTests(TestCase):
+    """Escopo de acesso da busca igual ao da listagem de lançamentos."""
+
+    def setUp(self):
+        self.vinculos = [criar_cliente(cnpj) for cnpj in ('11222333000181', '22333444000172', '33444555000163')]
+        self.adesoes = []
+        for i, vinculo in enumerate(self.vinculos):
+            adesao = Adesao.objects.create(
+                cliente=vinculo, data_inicio=timezone.now().date(), perdcomp=f'PERDCOMP-{i}', saldo=100.0,
+            )
+            self._indexar(adesao, f'Declaração de compensação da empresa{i} com débito de IRPJ')
+            self.adesoes.append(adesao)
+
+    def _indexar(self, adesao, texto):
+        documento, _ = DocumentoImportado.objects.get_or_create(
+            adesao=adesao,
+            defaults={'sha256': f'{adesao.pk:064x}', 'tipo': DOC_DECLARACAO_COMPENSACAO, 'arquivo': 'doc.pdf'},
+        )
+        indexar_documento(documento, texto)
+
+    def _usuario(self, nome, **perfil):
+        usuario = User.objects.create_user(nome, password='senha')
+        empresas = perfil.pop('empresas', ())
+        if perfil or empresas:
+            UserProfile.objects.create(user=usuario, **perfil).empresas.set(empresas)
+        return usuario
+
+    def _adesoes_encontradas(self, usuario, consulta='compensação IRPJ'):
+        return sorted(resultado['adesao_id'] for resultado in buscar(consulta, usuario))
+
+    def test_cliente_ve_so_as_proprias_empresas(self):
+        cliente = self._usuario('cliente', empresas=[self.vinculos[0].id_company_vinculada])
+
+        self.assertEqual(self._adesoes_encontradas(cliente), [self.adesoes[0].pk])
+        self.assertEqual(self._adesoes_encontradas(cliente, 'empresa1'), [])
+
+    def test_parceiro_ve_os_clientes_vinculados(self):
+        parceira = criar_cliente('44555666000154', tipo_parceria='parceiro').id_company_vinculada
+        ClientesParceiros.objects.create(
+            id_company_base=parceira, id_company_vinculada=self.vinculos[1].id_company_vinculada,
+            nome_referencia='Cliente do parceiro',
+        )
+        parceiro = self._usuario('parceiro', empresa_parceira=parceira)
+
+        self.assertEqual(self._adesoes_encontradas(parceiro), [self.adesoes[1].pk])
+
+    def test_staff_ve_tudo(self):
+        staff = User.objects.create_user('staff', password='senha', is_staff=True)
+
+        self.assertEqual(self._adesoes_encontradas(staff), sorted(a.pk for a in self.adesoes))
+
+    def test_usuario_sem_perfil_nao_ve_nada(self):
+        self.assertEqual(buscar('compensação', self._usuario('sem_perfil')), [])
+
+    def test_operadores_da_consulta_sao_neutralizados(self):
+        staff = User.objects.create_user('staff', password='senha', is_staff=True)
+
+        for consulta in ('NEAR(', '*', '"drop', 'IRPJ OR', 'empresa0 NOT'):
+            with self.subTest(consulta=consulta):
+                buscar(consulta, staff)  # sem erro de sintaxe do FTS
+        self.assertEqual(self._adesoes_encontradas(staff, 'empresa0 AND'), [])
+
+    def test_reindexar_substitui_o_texto_anterior(self):
+        staff = User.objects.create_user('staff', password='senha', is_staff=True)
+
+        self._indexar(self.adesoes[0], 'Pedido de restituição de CSLL')
+
+        self.assertEqual(self._adesoes_encontradas(staff, 'empresa0'), [])
+        self.assertEqual(self._adesoes_encontradas(staff, 'restituição CSLL'), [self.adesoes[0].pk])
+        self.assertEqual(self._adesoes_encontradas(staff), [a.pk for a in self.adesoes[1:]])
+
+
+class DocumentoDuplicadoTests(ImportacaoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.doc, self.upload = upload_do_corpus('declaracao', 0)
+        criar_cliente(self.doc.expected['cnpj'])
+        self.client.force_login(self.usuario)
+
+    def _enviar(self, nome='declaracao.pdf'):
+        self.upload.seek(0)
+        arquivo = SimpleUploadedFile(nome, self.upload.read(), 'application/pdf')
+        return self.client.post(reverse('adesao:importar_pdf'), {'pdf': arquivo, 'criar': '1'})
+
+    def test_reenvio_respondido_pelo_hash_sem_extrair(self):
+        primeira = self._enviar()
+        self.assertEqual(primeira.status_code, 200)
+        documento = DocumentoImportado.objects.get()
+
+        with mock.patch('adesao.views.extract_and_parse') as extrair:
+            resposta = self._enviar('copia.pdf')
+
+        extrair.assert_not_called()
+        self.assertEqual(resposta.status_code, 409)
+        payload = resposta.json()
+        self.assertFalse(payload['ok'])
+        self.assertEqual(payload['error_code'], 'duplicado')
+        self.assertEqual(payload['documento']['adesao_id'], documento.adesao_id)
+        self.assertEqual(payload['documento']['arquivo'], 'declaracao.pdf')
+        self.assertEqual(payload['documento']['perdcomp'], self.doc.expected['perdcomp'])
+        self.assertEqual(Adesao.objects.count(), 1)
+
+    def test_registrar_documento_mantem_o_primeiro_registro(self):
+        self._enviar()
+        documento = DocumentoImportado.objects.get()
+        outra = Adesao.objects.create(
+            cliente=documento.adesao.cliente, data_inicio=timezone.now().date(), perdcomp='OUTRO', saldo=1.0,
+        )
+
+        registrar_documento(documento.sha256, DOC_DECLARACAO_COMPENSACAO, outra, 'outro.pdf', 'OUTRO', self.usuario)
+
+        self.assertEqual(DocumentoImportado.objects.count(), 1)
+        atual = DocumentoImportado.objects.get()
+        self.assertEqual(
+            (atual.adesao_id, atual.arquivo, atual.perdcomp, atual.importado_em),
+            (documento.adesao_id, 'declaracao.pdf', documento.perdcomp, documento.importado_em),
+        )
+
+
+class ImportacaoPorTipoTests(ImportacaoTestCase):
+    """Mesmo fluxo por tipo na tela de importação universal e no comando ``importar_pdfs``."""
+
+    def setUp(self):
+        super().setUp()
+        self.docs = [generate_document(tipo, 0) for tipo in ('ressarcimento', 'restituicao')]
+        for doc in self.docs:
+            criar_cliente(doc.expected['cnpj'])
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def _adesoes(self):
+        return sorted(Adesao.objects.values_list('perdcomp', flat=True))
+
+    def test_importacao_universal(self):
+        self.client.force_login(self.usuario)
+        pdf = SimpleUploadedFile('pedido.pdf', render_pdf(self.docs[0].pages), 'application/pdf')
+
+        resposta = self.client.post(reverse('adesao:importar_documento'), {'pdf': pdf, 'criar': '1'})
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.json()['tipo_documento'], DOC_PEDIDO_CREDITO)
+        self.assertEqual(self._adesoes(), [self.docs[0].expected['perdcomp']])
+
+    def test_comando_importar_pdfs(self):
+        pasta = os.path.join(self.dir.name, 'pdfs')
+        os.makedirs(os.path.join(pasta, 'sub'))
+        for i, doc in enumerate(self.docs):
+            with open(os.path.join(pasta, 'sub' if i else '', f'{i}.pdf'), 'wb') as fh:
+                fh.write(render_pdf(doc.pages))
+        with open(os.path.join(pasta, 'outro.pdf'), 'wb') as fh:
+            fh.write(render_pdf(['Documento sem relação com a Receita']))
+        checkpoint = os.path.join(self.dir.name, 'checkpoint')
+
+        def importar():
+            saida = io.StringIO()
+            call_command(
+                'importar_pdfs', pasta, criar=True, usuario=self.usuario.username, checkpoint=checkpoint,
+                stdout=saida,
+            )
+            return saida.getvalue()
+
+        saida = importar()
+
+        self.assertIn('Concluído: 2 ok, 1 com erro', saida)
+        self.assertEqual(self._adesoes(), sorted(doc.expected['perdcomp'] for doc in self.docs))
+        for adesao in Adesao.objects.all():
+            self.assertEqual(adesao.historico.first().history_user, self.usuario)
+            self.assertEqual(adesao.documentos_importados.get().usuario, self.usuario)
+
+        self.assertIn('Concluído: 0 ok, 0 com erro, 3 pulado(s)', importar())
@@ -12,17 +12,25 @@ urlpatterns = [
     path('historico/<int:pk>/', views.adesao_history_json, name='history_json'),
     path('importar-pdf/', views.importar_pdf_perdcomp, name='importar_pdf'),
     path('importar-pdf-lote/', views.importar_pdf_perdcomp_lote, name='importar_pdf_lote'),
+    path('importar-pdf-lote/stream/', views.importar_pdf_perdcomp_lote_stream, name='importar_pdf_lote_stream'),
+    path('importar-pdf-lote/jobs/', views.importar_pdf_lote_job, name='importar_pdf_lote_job'),
+    path('importar-pdf-lote/jobs/<int:pk>/', views.importar_pdf_lote_status, name='importar_pdf_lote_status'),
+    path('importar-documento/', views.importar_documento, name='importar_documento'),
+    path('importar-documentos-lote/', views.importar_documentos_lote, name='importar_documentos_lote'),
     path('importar-pedido-credito/', views.importar_pedido_credito, name='importar_pedido_credito'),
     path('importar-recibo/', views.importar_recibo_pedido_credito, name='importar_recibo'),
     path('importar-declaracao-compensacao/', views.importar_declaracao_compensacao, name='importar_declaracao_compensacao'),
     path('importar-notificacao-credito/', views.importar_notificacao_credito_conta, name='importar_credito_conta'),
     path('importar-lote/', views.importar_lote_page, name='importar_lote_page'),
     path('importar-logs/', views.importacao_logs_page, name='importacao_logs_page'),
+    path('importar-logs/metricas/', views.importacao_metricas, name='importacao_metricas'),
+    path('busca/', views.busca_documentos_page, name='busca_documentos'),
 
     ## API endpoint for listing adesoes 
     path('api/v1/listar-adesao/', views.AdesaoListAPI.as_view(), name='api-adesao-list'),
     path('api/v1/criar-adesao/', views.AdesaoCreateAPI.as_view(), name='api-adesao-create'),
     path('api/v1/listar-adesao/<int:pk>/', views.AdesaoDetailAPI.as_view(), name='api-adesao-detail'),
+    path('api/v1/buscar-documentos/', views.BuscaDocumentosAPI.as_view(), name='api-busca-documentos'),
 
     # ...existing code...
 ]
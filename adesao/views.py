@@ -3,20 +3,31 @@ from django.views.generic import ListView, CreateView, UpdateView, DeleteView, D
 from django.urls import reverse, reverse_lazy
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
-from .models import Adesao
+from .models import Adesao, ImportJob, ImportJobItem, ImportLog, TextoIndexado
+from .busca import buscar
+from .documentos_importados import DocumentoJaImportado, documentos_importados, registrar_documento, verificar_duplicado
+from .import_jobs import enfileirar
+from .import_logs import CONTEXTO_LABELS, gravar_log_importacao, metricas_por_contexto
 from lancamentos.models import Lancamentos
+from lancamentos.services import criar_lancamentos_em_lote
 from django.db import transaction
 from django.http import HttpResponseRedirect
 from django.db.models import Sum
-from django.http import JsonResponse, Http404
+from django.http import JsonResponse, Http404, StreamingHttpResponse
 from django.utils.dateformat import format as date_format
 from django.utils.timezone import localtime
 from django.views.decorators.http import require_GET
 from django.contrib.auth.decorators import login_required
 from .forms import AdesaoForm
 from django.views.decorators.http import require_POST
+import dataclasses
 import re
-from typing import Any
+import time
+import zipfile
+from contextlib import contextmanager
+from itertools import islice
+from types import SimpleNamespace
+from typing import Any, Iterable, Iterator
 from django.views.decorators.csrf import csrf_exempt, ensure_csrf_cookie, csrf_protect
 from django.core.files.uploadedfile import UploadedFile
 from django.utils import timezone
@@ -27,10 +38,25 @@ from utils.pdf_parser import (
     parse_declaracao_compensacao_text,
     parse_pedido_credito_text
 )
-from pdf import extract_text
+from utils.pdf_cache import read_upload
+from utils.pdf_classifier import (
+    DOC_CREDITO_CONTA,
+    DOC_DECLARACAO_COMPENSACAO,
+    DOC_PEDIDO_CREDITO,
+    DOC_PERDCOMP,
+    DOC_RECIBO,
+    DOCUMENT_LABELS,
+    parse_documento,
+    sniff_document_type,
+)
+from utils.pdf_pool import ExtractionResult, extract_and_parse, extract_and_parse_many, iter_extract_and_parse
+from utils.pdf_sandbox import ExtractionLimitError
+from utils.pdf_zip import PDFEntry, is_zip_upload, iter_zip_pdfs
+from utils.stage_timer import StageTimer, source_size
 from clientes_parceiros.models import ClientesParceiros
+from simple_history.models import HistoricalRecords
 from .permissions import AdesaoPermissionMixin, AdesaoClienteViewOnlyMixin, AdminRequiredMixin
-from datetime import datetime
+from datetime import datetime, timedelta
 
 # Adicionando imports do DRF
 from rest_framework.views import APIView
@@ -383,6 +409,56 @@ class AdesaoDetailAPI(APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+def _extrair(upload, parser, extraido=None, timer: StageTimer | None = None):
+    """Lê o upload e extrai/parseia o PDF, retornando ``(sha256, extraido)``.
+
+    ``upload`` é o arquivo enviado ou, quando quem chama já fez a leitura (a
+    importação universal, a em lote e o comando ``importar_pdfs``), o par
+    ``(fonte, sha256)`` de ``read_upload``; nesse caso a verificação de arquivo
+    já importado (``DocumentoJaImportado``) também é feita por elas. Com
+    ``extraido`` (extração no pool) a extração não é repetida. Os tempos de
+    cada etapa vão para ``timer``.
+    """
+    timer = timer or StageTimer()
+    novo_upload = not isinstance(upload, tuple)
+    if novo_upload:
+        upload = read_upload(upload)
+        timer.lap('upload')
+    pdf_source, content_hash = upload
+    if novo_upload:
+        # Reenvio de um arquivo já importado: responde pelo hash, sem abrir o PDF
+        verificar_duplicado(content_hash)
+    if timer.bytes is None:
+        timer.bytes = source_size(pdf_source)
+    if extraido is None:
+        try:
+            extraido = extract_and_parse(pdf_source, parser, content_hash)
+        except ExtractionLimitError:
+            timer.lap('extract')
+            raise
+    timer.record_extraction(extraido)
+    if extraido.error_code is not None:
+        raise ExtractionLimitError(extraido.error_code, extraido.error)
+    if extraido.error is not None:
+        raise ValueError(extraido.error)
+    return content_hash, extraido
+
+
+def _erro_processamento(exc: Exception) -> tuple[int, dict[str, Any]]:
+    """Status e payload de erro de uma importação que falhou com ``exc``.
+
+    PDFs que estouram um limite do sandbox de extração (tempo, memória, CPU)
+    recebem 422 com ``error_code``; arquivos já importados, 409 com o registro
+    anterior. Demais falhas seguem como erro interno.
+    """
+    if isinstance(exc, DocumentoJaImportado):
+        return 409, {'ok': False, 'error': str(exc), **exc.detalhes()}
+    payload = {'ok': False, 'error': f'Erro ao processar PDF: {str(exc)}'}
+    if isinstance(exc, ExtractionLimitError):
+        return 422, {**payload, 'error_code': exc.code}
+    return 500, payload
+
+
 @login_required
 @csrf_protect
 @require_POST
@@ -393,25 +469,28 @@ def importar_pdf_perdcomp(request):
     pdf_file: UploadedFile | None = request.FILES.get('pdf')
     if not pdf_file:
         return JsonResponse({'ok': False, 'error': 'Arquivo PDF não enviado (campo "pdf").'}, status=400)
+    criar = str(request.POST.get('criar', '0')).lower() in ('1', 'true', 'on', 'yes')
+    payload, status_code = _importar_perdcomp(request.user, criar, pdf_file.name, pdf_file)
+    return JsonResponse(payload, status=status_code)
+
 
-    # Armazena temporário em memória/arquivo
-    import tempfile
-    import os
+def _importar_perdcomp(usuario, criar: bool, nome: str, upload, extraido=None, timer=None) -> tuple[dict[str, Any], int]:
+    """Importa um PER/DCOMP (ver ``importar_pdf_perdcomp``)."""
+    timer = timer or StageTimer()
     log_data = {
-        'user': getattr(request.user, 'username', None),
-        'filename': pdf_file.name,
+        'user': getattr(usuario, 'username', None),
+        'filename': nome,
         'ts': timezone.now().isoformat(),
     }
     status_code = 200
     response_payload = None
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
-            for chunk in pdf_file.chunks():
-                tmp.write(chunk)
-            tmp_path = tmp.name
+        content_hash, extraido = _extrair(upload, parse_ressarcimento_text, extraido, timer)
+        log_data['sha256'] = content_hash
 
-        txt = extract_text(tmp_path) or ''
-        parsed = parse_ressarcimento_text(txt)
+        txt = extraido.text
+        parsed = extraido.parsed
+        log_data['pages'] = extraido.pages_log()
 
         log_data['extracted_present'] = bool(txt)
         log_data['parsed'] = parsed.as_dict()
@@ -446,7 +525,6 @@ def importar_pdf_perdcomp(request):
             response_payload = {'ok': False, 'error': f'PERDCOMP {parsed.perdcomp} já cadastrado.'}
 
         if status_code == 200:
-            criar = str(request.POST.get('criar', '0')).lower() in ('1','true','on','yes')
             metodo_credito_val = (parsed.metodo_credito or '').strip()
             metodo_credito_lower = metodo_credito_val.lower()
             comp_vinc = any(
@@ -510,6 +588,10 @@ def importar_pdf_perdcomp(request):
                                 periodo_apuracao_debito=(d.get('periodo_apuracao_debito') or None),
                                 aprovado=True,
                             )
+                        registrar_documento(
+                            content_hash, DOC_PERDCOMP, ad, nome, parsed.perdcomp, usuario,
+                            extraido=extraido,
+                        )
                     response_payload = {
                         'ok': True,
                         'created': True,
@@ -548,35 +630,16 @@ def importar_pdf_perdcomp(request):
                     }
                 }
     except Exception as e:
-        status_code = 500
-        response_payload = {'ok': False, 'error': f'Erro ao processar PDF: {str(e)}'}
+        status_code, response_payload = _erro_processamento(e)
     finally:
         # Attach result metadata for logging purposes
         final_payload = response_payload or {'ok': False, 'error': 'Falha ao processar PDF.'}
         log_data['result'] = final_payload
         log_data['status_code'] = status_code
         
-        # Audit log simples por arquivo
-        try:
-            from django.conf import settings
-            import json
-            logs_dir = os.path.join(getattr(settings, 'MEDIA_ROOT', ''), 'import_logs')
-            os.makedirs(logs_dir, exist_ok=True)
-            safe_name = os.path.basename(pdf_file.name).replace(' ', '_')
-            log_path = os.path.join(logs_dir, f"import_{timezone.now().strftime('%Y%m%d_%H%M%S')}_{safe_name}.json")
-            import json
-            json_payload = json.dumps(log_data, ensure_ascii=False, indent=2)
-            with open(log_path, 'w', encoding='utf-8') as f:
-                f.write(json_payload)
-        except Exception:
-            pass
-        try:
-            if 'tmp_path' in locals() and os.path.exists(tmp_path):
-                os.remove(tmp_path)
-        except Exception:
-            pass
+        gravar_log_importacao('import', log_data, usuario, timer)
 
-    return JsonResponse(final_payload, status=status_code)
+    return final_payload, status_code
 
 
 @login_required
@@ -586,27 +649,28 @@ def importar_recibo_pedido_credito(request):
     pdf_file: UploadedFile | None = request.FILES.get('pdf')
     if not pdf_file:
         return JsonResponse({'ok': False, 'error': 'Arquivo PDF não enviado (campo "pdf").'}, status=400)
+    payload, status_code = _importar_recibo(request.user, True, pdf_file.name, pdf_file)
+    return JsonResponse(payload, status=status_code)
 
-    import tempfile
-    import os
-    from django.conf import settings
+
+def _importar_recibo(usuario, criar: bool, nome: str, upload, extraido=None, timer=None) -> tuple[dict[str, Any], int]:
+    """Importa um recibo de pedido de crédito (ver ``importar_recibo_pedido_credito``)."""
+    timer = timer or StageTimer()
     status_code = 200
     response_payload: dict[str, Any] | None = None
     log_data: dict[str, Any] = {
-        'user': getattr(request.user, 'username', None),
-        'filename': pdf_file.name,
+        'user': getattr(usuario, 'username', None),
+        'filename': nome,
         'ts': timezone.now().isoformat(),
         'context': 'recibo_pedido_credito',
     }
 
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
-            for chunk in pdf_file.chunks():
-                tmp.write(chunk)
-            tmp_path = tmp.name
+        content_hash, extraido = _extrair(upload, parse_recibo_pedido_credito_text, extraido, timer)
+        log_data['sha256'] = content_hash
 
-        txt = extract_text(tmp_path) or ''
-        parsed = parse_recibo_pedido_credito_text(txt)
+        parsed = extraido.parsed
+        log_data['pages'] = extraido.pages_log()
         log_data['parsed'] = parsed.as_dict()
 
         numero_documento = (parsed.numero_documento or '').strip()
@@ -643,7 +707,12 @@ def importar_recibo_pedido_credito(request):
 
             adesao.status = 'protocolado'
             fields_to_update.append('status')
-            adesao.save(update_fields=fields_to_update)
+            with transaction.atomic():
+                adesao.save(update_fields=fields_to_update)
+                registrar_documento(
+                    content_hash, DOC_RECIBO, adesao, nome, numero_documento, usuario,
+                    extraido=extraido,
+                )
 
             response_payload = {
                 'ok': True,
@@ -658,31 +727,13 @@ def importar_recibo_pedido_credito(request):
             }
 
     except Exception as e:
-        status_code = 500
-        response_payload = {'ok': False, 'error': f'Erro ao processar PDF: {str(e)}'}
+        status_code, response_payload = _erro_processamento(e)
     finally:
-        try:
-            log_data['status_code'] = status_code
-            log_data['result'] = response_payload
-            logs_dir = os.path.join(getattr(settings, 'MEDIA_ROOT', ''), 'import_logs')
-            os.makedirs(logs_dir, exist_ok=True)
-            safe_name = os.path.basename(pdf_file.name).replace(' ', '_')
-            log_path = os.path.join(
-                logs_dir,
-                f"recibo_{timezone.now().strftime('%Y%m%d_%H%M%S')}_{safe_name}.json"
-            )
-            import json
-            with open(log_path, 'w', encoding='utf-8') as fh:
-                fh.write(json.dumps(log_data, ensure_ascii=False, indent=2))
-        except Exception:
-            pass
-        try:
-            if 'tmp_path' in locals() and os.path.exists(tmp_path):
-                os.remove(tmp_path)
-        except Exception:
-            pass
+        log_data['status_code'] = status_code
+        log_data['result'] = response_payload
+        gravar_log_importacao('recibo', log_data, usuario, timer)
 
-    return JsonResponse(response_payload or {'ok': False, 'error': 'Falha desconhecida.'}, status=status_code)
+    return response_payload or {'ok': False, 'error': 'Falha desconhecida.'}, status_code
 
 
 @login_required
@@ -692,31 +743,31 @@ def importar_declaracao_compensacao(request):
     pdf_file: UploadedFile | None = request.FILES.get('pdf')
     if not pdf_file:
         return JsonResponse({'ok': False, 'error': 'Arquivo PDF não enviado (campo "pdf").'}, status=400)
+    payload, status_code = _importar_declaracao_compensacao(request.user, True, pdf_file.name, pdf_file)
+    return JsonResponse(payload, status=status_code)
+
 
-    import tempfile
-    import os
-    from django.conf import settings
+def _importar_declaracao_compensacao(usuario, criar: bool, nome: str, upload, extraido=None, timer=None) -> tuple[dict[str, Any], int]:
+    """Importa uma declaração de compensação (ver ``importar_declaracao_compensacao``)."""
+    timer = timer or StageTimer()
 
     status_code = 200
     response_payload: dict[str, Any] | None = None
     log_data: dict[str, Any] = {
-        'user': getattr(request.user, 'username', None),
-        'filename': pdf_file.name,
+        'user': getattr(usuario, 'username', None),
+        'filename': nome,
         'ts': timezone.now().isoformat(),
         'context': 'declaracao_compensacao',
     }
 
-    tmp_path = None
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
-            for chunk in pdf_file.chunks():
-                tmp.write(chunk)
-            tmp_path = tmp.name
-
-        txt = extract_text(tmp_path) or ''
-        
         # Usar parser específico para Declaração de Compensação
-        parsed = parse_declaracao_compensacao_text(txt)
+        content_hash, extraido = _extrair(upload, parse_declaracao_compensacao_text, extraido, timer)
+        log_data['sha256'] = content_hash
+
+        txt = extraido.text
+        parsed = extraido.parsed
+        log_data['pages'] = extraido.pages_log()
         log_data['parsed'] = parsed.as_dict()
 
         # Debug: capturar snippet do CNPJ para análise
@@ -755,67 +806,73 @@ def importar_declaracao_compensacao(request):
             log_data['perdcomp_declaracao'] = doc_perdcomp
             log_data['perdcomp_inicial'] = perdcomp_inicial
             from django.utils import timezone as dj_tz
-            from django.core.exceptions import ValidationError
 
             created_items: list[dict[str, Any]] = []
-            skipped_items: list[dict[str, Any]] = []
+            skipped_items: list[tuple[int, dict[str, Any]]] = []
             error_items: list[dict[str, Any]] = []
 
-            with transaction.atomic():
-                for idx, debito in enumerate(debitos_extraidos, start=1):
-                    item_code = (debito.get('item') or '').strip()
-                    if not item_code:
-                        item_code = f"{idx:03d}"
-
-                    valor_decimal = debito.get('valor')
-                    if valor_decimal is None:
-                        skipped_items.append({'item': item_code, 'reason': 'Valor do débito não identificado no PDF.'})
-                        continue
+            novos: list[Lancamentos] = []
+            ordem_novos: list[int] = []
+            valores_por_item: dict[str, Any] = {}
+            agora = dj_tz.now()
+            for idx, debito in enumerate(debitos_extraidos, start=1):
+                item_code = (debito.get('item') or '').strip()
+                if not item_code:
+                    item_code = f"{idx:03d}"
+
+                valor_decimal = debito.get('valor')
+                if valor_decimal is None:
+                    skipped_items.append((idx, {'item': item_code, 'reason': 'Valor do débito não identificado no PDF.'}))
+                    continue
 
-                    try:
-                        valor_float = float(valor_decimal)
-                    except (TypeError, ValueError):
-                        skipped_items.append({'item': item_code, 'reason': f'Valor inválido ({valor_decimal}).'})
-                        continue
+                try:
+                    valor_float = float(valor_decimal)
+                except (TypeError, ValueError):
+                    skipped_items.append((idx, {'item': item_code, 'reason': f'Valor inválido ({valor_decimal}).'}))
+                    continue
 
-                    if Lancamentos.objects.filter(
-                        id_adesao=adesao,
-                        perdcomp_declaracao=doc_perdcomp,
-                        item=item_code,
-                    ).exists():
-                        skipped_items.append({'item': item_code, 'reason': 'Débito já importado anteriormente para esta declaração.'})
-                        continue
+                valores_por_item.setdefault(item_code, valor_decimal)
+                ordem_novos.append(idx)
+                novos.append(Lancamentos(
+                    id_adesao=adesao,
+                    data_lancamento=agora,
+                    valor=valor_float,
+                    sinal='-',
+                    tipo='Gerado',
+                    descricao=(
+                        f'Débito importado da Declaração de Compensação {doc_perdcomp}'
+                        if doc_perdcomp else 'Débito importado da Declaração de Compensação'
+                    ),
+                    metodo='Declaração de Compensação',
+                    codigo_receita_denominacao=debito.get('codigo_receita_denominacao') or None,
+                    periodo_apuracao_debito=debito.get('periodo_apuracao_debito') or None,
+                    aprovado=True,
+                    perdcomp_inicial=perdcomp_inicial,
+                    perdcomp_declaracao=doc_perdcomp,
+                    item=item_code,
+                ))
 
-                    try:
-                        lanc = Lancamentos.objects.create(
-                            id_adesao=adesao,
-                            data_lancamento=dj_tz.now(),
-                            valor=valor_float,
-                            sinal='-',
-                            tipo='Gerado',
-                            descricao=(
-                                f'Débito importado da Declaração de Compensação {doc_perdcomp}'
-                                if doc_perdcomp else 'Débito importado da Declaração de Compensação'
-                            ),
-                            metodo='Declaração de Compensação',
-                            codigo_receita_denominacao=debito.get('codigo_receita_denominacao') or None,
-                            periodo_apuracao_debito=debito.get('periodo_apuracao_debito') or None,
-                            aprovado=True,
-                            perdcomp_inicial=perdcomp_inicial,
-                            perdcomp_declaracao=doc_perdcomp,
-                            item=item_code,
-                        )
-                    except ValidationError as exc:
-                        error_items.append({'item': item_code, 'reason': '; '.join(exc.messages)})
-                        continue
-
-                    created_items.append({
-                        'item': item_code,
-                        'valor': format(valor_decimal, 'f'),
-                        'lancamento_id': lanc.pk,
-                    })
+            with transaction.atomic():
+                # Inserção em lote: itens já importados são verificados em uma única
+                # consulta e o saldo da adesão é gravado uma vez
+                criados, ignorados = criar_lancamentos_em_lote(
+                    adesao, novos, usuario=usuario if usuario.is_authenticated else None
+                )
+                adesao.refresh_from_db(fields=['saldo_atual'])
+                registrar_documento(
+                    content_hash, DOC_DECLARACAO_COMPENSACAO, adesao, nome, doc_perdcomp, usuario,
+                    extraido=extraido,
+                )
 
-            adesao.refresh_from_db(fields=['saldo_atual'])
+            ordem = {id(lanc): idx for lanc, idx in zip(novos, ordem_novos)}
+            for lanc in ignorados:
+                skipped_items.append((ordem[id(lanc)], {'item': lanc.item, 'reason': 'Débito já importado anteriormente para esta declaração.'}))
+            for lanc in criados:
+                created_items.append({
+                    'item': lanc.item,
+                    'valor': format(valores_por_item[lanc.item], 'f'),
+                    'lancamento_id': lanc.pk,
+                })
 
             response_payload = {
                 'ok': True,
@@ -827,39 +884,20 @@ def importar_declaracao_compensacao(request):
                 'skipped_count': len(skipped_items),
                 'error_count': len(error_items),
                 'created_items': created_items,
-                'skipped_items': skipped_items,
+                'skipped_items': [item for _, item in sorted(skipped_items, key=lambda par: par[0])],
                 'error_items': error_items,
                 'detail_url': reverse('adesao:detail', kwargs={'pk': adesao.pk}),
                 'saldo_atual': adesao.saldo_atual,
             }
 
     except Exception as e:
-        status_code = 500
-        response_payload = {'ok': False, 'error': f'Erro ao processar PDF: {str(e)}'}
+        status_code, response_payload = _erro_processamento(e)
     finally:
-        try:
-            log_data['status_code'] = status_code
-            log_data['result'] = response_payload
-            from django.conf import settings
-            import json
-            logs_dir = os.path.join(getattr(settings, 'MEDIA_ROOT', ''), 'import_logs')
-            os.makedirs(logs_dir, exist_ok=True)
-            safe_name = os.path.basename(pdf_file.name).replace(' ', '_')
-            log_path = os.path.join(
-                logs_dir,
-                f"compensacao_{timezone.now().strftime('%Y%m%d_%H%M%S')}_{safe_name}.json"
-            )
-            with open(log_path, 'w', encoding='utf-8') as fh:
-                fh.write(json.dumps(log_data, ensure_ascii=False, indent=2))
-        except Exception:
-            pass
-        try:
-            if tmp_path and os.path.exists(tmp_path):
-                os.remove(tmp_path)
-        except Exception:
-            pass
+        log_data['status_code'] = status_code
+        log_data['result'] = response_payload
+        gravar_log_importacao('compensacao', log_data, usuario, timer)
 
-    return JsonResponse(response_payload or {'ok': False, 'error': 'Falha desconhecida.'}, status=status_code)
+    return response_payload or {'ok': False, 'error': 'Falha desconhecida.'}, status_code
 
 
 @login_required
@@ -874,29 +912,30 @@ def importar_pedido_credito(request):
     pdf_file: UploadedFile | None = request.FILES.get('pdf')
     if not pdf_file:
         return JsonResponse({'ok': False, 'error': 'Arquivo PDF não enviado (campo "pdf").'}, status=400)
+    payload, status_code = _importar_pedido_credito(request.user, True, pdf_file.name, pdf_file)
+    return JsonResponse(payload, status=status_code)
+
 
-    import tempfile
-    import os
-    from django.conf import settings
+def _importar_pedido_credito(usuario, criar: bool, nome: str, upload, extraido=None, timer=None) -> tuple[dict[str, Any], int]:
+    """Importa um pedido de crédito (ver ``importar_pedido_credito``)."""
+    timer = timer or StageTimer()
 
     status_code = 200
     response_payload: dict[str, Any] | None = None
     log_data: dict[str, Any] = {
-        'user': getattr(request.user, 'username', None),
-        'filename': pdf_file.name,
+        'user': getattr(usuario, 'username', None),
+        'filename': nome,
         'ts': timezone.now().isoformat(),
         'context': 'pedido_credito',
     }
 
-    tmp_path = None
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
-            for chunk in pdf_file.chunks():
-                tmp.write(chunk)
-            tmp_path = tmp.name
+        content_hash, extraido = _extrair(upload, parse_pedido_credito_text, extraido, timer)
+        log_data['sha256'] = content_hash
 
-        txt = extract_text(tmp_path) or ''
-        parsed = parse_pedido_credito_text(txt)
+        txt = extraido.text
+        parsed = extraido.parsed
+        log_data['pages'] = extraido.pages_log()
         
         log_data['extracted_present'] = bool(txt)
         log_data['parsed'] = parsed.as_dict()
@@ -982,6 +1021,10 @@ def importar_pedido_credito(request):
                             pass
 
                 adesao.save()
+                registrar_documento(
+                    content_hash, DOC_PEDIDO_CREDITO, adesao, nome, perdcomp, usuario,
+                    extraido=extraido,
+                )
 
                 emp = cliente.id_company_vinculada
                 cliente_label = f"{emp.nome_fantasia or emp.razao_social} ({cliente.nome_referencia})"
@@ -999,31 +1042,13 @@ def importar_pedido_credito(request):
                 }
 
     except Exception as e:
-        status_code = 500
-        response_payload = {'ok': False, 'error': f'Erro ao processar PDF: {str(e)}'}
+        status_code, response_payload = _erro_processamento(e)
     finally:
-        try:
-            log_data['status_code'] = status_code
-            log_data['result'] = response_payload
-            logs_dir = os.path.join(getattr(settings, 'MEDIA_ROOT', ''), 'import_logs')
-            os.makedirs(logs_dir, exist_ok=True)
-            safe_name = os.path.basename(pdf_file.name).replace(' ', '_')
-            log_path = os.path.join(
-                logs_dir,
-                f"pedido_credito_{timezone.now().strftime('%Y%m%d_%H%M%S')}_{safe_name}.json"
-            )
-            import json
-            with open(log_path, 'w', encoding='utf-8') as fh:
-                fh.write(json.dumps(log_data, ensure_ascii=False, indent=2))
-        except Exception:
-            pass
-        try:
-            if tmp_path and os.path.exists(tmp_path):
-                os.remove(tmp_path)
-        except Exception:
-            pass
+        log_data['status_code'] = status_code
+        log_data['result'] = response_payload
+        gravar_log_importacao('pedido_credito', log_data, usuario, timer)
 
-    return JsonResponse(response_payload or {'ok': False, 'error': 'Falha desconhecida.'}, status=status_code)
+    return response_payload or {'ok': False, 'error': 'Falha desconhecida.'}, status_code
 
 
 @login_required
@@ -1033,28 +1058,29 @@ def importar_notificacao_credito_conta(request):
     pdf_file: UploadedFile | None = request.FILES.get('pdf')
     if not pdf_file:
         return JsonResponse({'ok': False, 'error': 'Arquivo PDF não enviado (campo "pdf").'}, status=400)
+    payload, status_code = _importar_credito_conta(request.user, True, pdf_file.name, pdf_file)
+    return JsonResponse(payload, status=status_code)
+
 
-    import tempfile
-    import os
-    from django.conf import settings
+def _importar_credito_conta(usuario, criar: bool, nome: str, upload, extraido=None, timer=None) -> tuple[dict[str, Any], int]:
+    """Importa uma notificação de crédito em conta (ver ``importar_notificacao_credito_conta``)."""
+    timer = timer or StageTimer()
 
     status_code = 200
     response_payload: dict[str, Any] | None = None
     log_data: dict[str, Any] = {
-        'user': getattr(request.user, 'username', None),
-        'filename': pdf_file.name,
+        'user': getattr(usuario, 'username', None),
+        'filename': nome,
         'ts': timezone.now().isoformat(),
         'context': 'credito_em_conta',
     }
 
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
-            for chunk in pdf_file.chunks():
-                tmp.write(chunk)
-            tmp_path = tmp.name
+        content_hash, extraido = _extrair(upload, parse_credito_em_conta_text, extraido, timer)
+        log_data['sha256'] = content_hash
 
-        txt = extract_text(tmp_path) or ''
-        parsed = parse_credito_em_conta_text(txt)
+        parsed = extraido.parsed
+        log_data['pages'] = extraido.pages_log()
         log_data['parsed'] = parsed.as_dict()
 
         perdcomp = (parsed.perdcomp or '').strip()
@@ -1112,34 +1138,39 @@ def importar_notificacao_credito_conta(request):
             if timezone.is_naive(credit_datetime):
                 credit_datetime = timezone.make_aware(credit_datetime, timezone.get_current_timezone())
 
-            lancamento = Lancamentos.objects.create(
-                id_adesao=adesao,
-                data_lancamento=credit_datetime,
-                valor=valor_float,
-                sinal='+',
-                tipo='Gerado',
-                descricao='Crédito em conta importado automaticamente.',
-                metodo='Crédito em conta',
-                data_credito=data_credito,
-                valor_credito_em_conta=valor_float,
-                aprovado=True,
-                observacao_aprovacao='Importação automática via notificação de crédito em conta.'
-            )
+            with transaction.atomic():
+                lancamento = Lancamentos.objects.create(
+                    id_adesao=adesao,
+                    data_lancamento=credit_datetime,
+                    valor=valor_float,
+                    sinal='+',
+                    tipo='Gerado',
+                    descricao='Crédito em conta importado automaticamente.',
+                    metodo='Crédito em conta',
+                    data_credito=data_credito,
+                    valor_credito_em_conta=valor_float,
+                    aprovado=True,
+                    observacao_aprovacao='Importação automática via notificação de crédito em conta.'
+                )
 
-            adesao.refresh_from_db(fields=['saldo_atual'])
-
-            fields_to_update: list[str] = []
-            if adesao.data_credito_em_conta != data_credito:
-                adesao.data_credito_em_conta = data_credito
-                fields_to_update.append('data_credito_em_conta')
-            if adesao.valor_credito_em_conta != valor_float:
-                adesao.valor_credito_em_conta = valor_float
-                fields_to_update.append('valor_credito_em_conta')
-            if adesao.status != 'protocolado':
-                adesao.status = 'protocolado'
-                fields_to_update.append('status')
-            if fields_to_update:
-                adesao.save(update_fields=fields_to_update)
+                adesao.refresh_from_db(fields=['saldo_atual'])
+
+                fields_to_update: list[str] = []
+                if adesao.data_credito_em_conta != data_credito:
+                    adesao.data_credito_em_conta = data_credito
+                    fields_to_update.append('data_credito_em_conta')
+                if adesao.valor_credito_em_conta != valor_float:
+                    adesao.valor_credito_em_conta = valor_float
+                    fields_to_update.append('valor_credito_em_conta')
+                if adesao.status != 'protocolado':
+                    adesao.status = 'protocolado'
+                    fields_to_update.append('status')
+                if fields_to_update:
+                    adesao.save(update_fields=fields_to_update)
+                registrar_documento(
+                    content_hash, DOC_CREDITO_CONTA, adesao, nome, adesao.perdcomp, usuario,
+                    extraido=extraido,
+                )
 
             response_payload = {
                 'ok': True,
@@ -1154,38 +1185,365 @@ def importar_notificacao_credito_conta(request):
             }
 
     except Exception as e:
-        status_code = 500
-        response_payload = {'ok': False, 'error': f'Erro ao processar PDF: {str(e)}'}
+        status_code, response_payload = _erro_processamento(e)
     finally:
+        log_data['status_code'] = status_code
+        log_data['result'] = response_payload
+        gravar_log_importacao('credito_conta', log_data, usuario, timer)
+
+    return response_payload or {'ok': False, 'error': 'Falha desconhecida.'}, status_code
+
+
+_BLOCO_REFERENCIAS = 500
+_BLOCO_REFERENCIAS_STREAM = 25
+
+
+@dataclasses.dataclass
+class _ReferenciasLote:
+    """Clientes (por CNPJ) e PER/DCOMPs já cadastrados de um bloco do lote."""
+    clientes: dict[str, list[ClientesParceiros]]
+    perdcomps: set[str]
+
+
+def _resolver_referencias(parseds) -> _ReferenciasLote:
+    """Resolve os CNPJs e PER/DCOMPs de vários arquivos com uma consulta ``__in`` cada."""
+    cnpjs = {p.cnpj for p in parseds if p is not None and p.cnpj}
+    perdcomps = {p.perdcomp for p in parseds if p is not None and p.perdcomp}
+    clientes: dict[str, list[ClientesParceiros]] = {}
+    if cnpjs:
+        qs = ClientesParceiros.objects.select_related('id_company_vinculada').filter(
+            id_company_vinculada__cnpj__in=cnpjs
+        )
+        for cliente in qs:
+            clientes.setdefault(cliente.id_company_vinculada.cnpj, []).append(cliente)
+    existentes: set[str] = set()
+    if perdcomps:
+        existentes = set(Adesao.objects.filter(perdcomp__in=perdcomps).values_list('perdcomp', flat=True))
+    return _ReferenciasLote(clientes, existentes)
+
+
+@contextmanager
+def _historico_do_usuario(user):
+    """Registra ``user`` como autor do histórico (simple_history) dentro do bloco.
+
+    O ``HistoryRequestMiddleware`` só expõe a requisição enquanto a view roda:
+    respostas em streaming continuam gravando depois que ele retornou, e o
+    ``import_worker`` e os comandos não têm requisição. Sem isso, o histórico
+    das adesões e lançamentos criados ficaria sem usuário.
+    """
+    anterior = getattr(HistoricalRecords.context, 'request', None)
+    HistoricalRecords.context.request = SimpleNamespace(user=user)
+    try:
+        yield
+    finally:
+        if anterior is None:
+            try:
+                del HistoricalRecords.context.request
+            except AttributeError:
+                pass
+        else:
+            HistoricalRecords.context.request = anterior
+
+
+def _importar_item_lote(
+    user,
+    filename: str,
+    content_hash: str | None,
+    extraido,
+    criar: bool,
+    referencias: _ReferenciasLote | None = None,
+    timer: StageTimer | None = None,
+) -> dict[str, Any]:
+    """Validações e criação no banco de um arquivo do lote PER/DCOMP já extraído.
+
+    Usado pela view de lote e pelo ``import_worker`` (fila de importação);
+    grava o log do arquivo e retorna o resultado no formato de ``results``.
+    ``referencias`` vem de ``_resolver_referencias`` para o bloco inteiro (sem
+    consultas por arquivo); PER/DCOMPs criados aqui são acrescentados a ela.
+    """
+    timer = timer or StageTimer()
+    timer.record_extraction(extraido)
+    context_log = {
+        'user': getattr(user, 'username', None),
+        'filename': filename,
+        'sha256': content_hash,
+    }
+    try:
+        if extraido.error is not None:
+            res = {'file': filename, 'ok': False, 'error': f'Erro inesperado: {extraido.error}'}
+            if extraido.error_code is not None:
+                res['error_code'] = extraido.error_code
+            context_log['result'] = res
+            gravar_log_importacao('batch', context_log, user, timer)
+            return res
+
+        txt = extraido.text
+        parsed = extraido.parsed
+        context_log['extracted_present'] = bool(txt)
+        context_log['pages'] = extraido.pages_log()
+        context_log['parsed'] = parsed.as_dict()
+        if referencias is None:
+            referencias = _resolver_referencias([parsed])
+
+        # Validar CNPJ
+        cnpj = parsed.cnpj or ''
+        if not cnpj:
+            msg = 'CNPJ não identificado no PDF.'
+            res = {'file': filename, 'ok': False, 'error': msg}
+            context_log['result'] = res
+            gravar_log_importacao('batch', context_log, user, timer)
+            return res
+        clientes = referencias.clientes.get(cnpj, [])
+        if len(clientes) != 1:
+            if clientes:
+                msg = f'Mais de um cliente com CNPJ {cnpj}.'
+            else:
+                msg = f'Cliente com CNPJ {cnpj} não encontrado.'
+            res = {'file': filename, 'ok': False, 'error': msg}
+            context_log['result'] = res
+            gravar_log_importacao('batch', context_log, user, timer)
+            return res
+        cliente = clientes[0]
+
+        # Validar PERDCOMP
+        if not parsed.perdcomp:
+            msg = 'PERDCOMP não identificado no PDF.'
+            res = {'file': filename, 'ok': False, 'error': msg}
+            context_log['result'] = res
+            gravar_log_importacao('batch', context_log, user, timer)
+            return res
+        if parsed.perdcomp in referencias.perdcomps:
+            msg = f'PERDCOMP {parsed.perdcomp} já cadastrado.'
+            res = {'file': filename, 'ok': False, 'error': msg}
+            context_log['result'] = res
+            gravar_log_importacao('batch', context_log, user, timer)
+            return res
+
+        # Apenas extrair (sem criar)
+        if not criar:
+            emp = cliente.id_company_vinculada
+            cliente_label = f"{emp.nome_fantasia or emp.razao_social} ({cliente.nome_referencia})"
+            res = {
+                'file': filename,
+                'ok': True,
+                'created': False,
+                'fields': {
+                    'cliente': cliente.id,
+                    'cliente_label': cliente_label,
+                    'perdcomp': parsed.perdcomp,
+                    'metodo_credito': parsed.metodo_credito,
+                    'data_inicio': parsed.data_criacao,
+                    'saldo': str(parsed.valor_pedido) if parsed.valor_pedido is not None else None,
+                    'valor_total_origem': str(getattr(parsed, 'valor_total_origem', None)) if getattr(parsed, 'valor_total_origem', None) is not None else None,
+                    'valor_original_credito_inicial': str(getattr(parsed, 'valor_original_credito_inicial', None)) if getattr(parsed, 'valor_original_credito_inicial', None) is not None else None,
+                    'ano': parsed.ano,
+                    'trimestre': parsed.trimestre,
+                    'tipo_credito': parsed.tipo_credito,
+                    'data_arrecadacao': parsed.data_arrecadacao,
+                    'periodo_apuracao_credito': parsed.periodo_apuracao_credito,
+                    'codigo_receita': parsed.codigo_receita,
+                    'debitos': [
+                        {
+                            'codigo_receita_denominacao': d.get('codigo_receita_denominacao'),
+                            'periodo_apuracao_debito': d.get('periodo_apuracao_debito'),
+                            'valor': str(d.get('valor')) if d.get('valor') is not None else None,
+                        }
+                        for d in (parsed.debitos or [])
+                    ],
+                }
+            }
+            context_log['result'] = res
+            gravar_log_importacao('batch', context_log, user, timer)
+            return res
+
+        # Criar registro(s)
+        comp_vinc = parsed.metodo_credito in (
+            'Compensação vinculada a um pedido de ressarcimento',
+            'Compensação vinculada a um pedido de restituição',
+        )
+        def _conv_date(dmy: str) -> str | None:
+            m = re.match(r"(\d{2})/(\d{2})/(\d{4})", dmy or '')
+            return f"{m.group(3)}-{m.group(2)}-{m.group(1)}" if m else None
+
+        if comp_vinc:
+            # Saldo base: usar "Valor Original do Crédito Inicial" quando disponível;
+            # fallback para valor do pedido e, por fim, soma dos débitos
+            from decimal import Decimal
+            soma_debitos = Decimal('0')
+            for d in (parsed.debitos or []):
+                v = d.get('valor')
+                if v is not None:
+                    try:
+                        soma_debitos += Decimal(str(v))
+                    except Exception:
+                        pass
+            saldo_base = getattr(parsed, 'valor_original_credito_inicial', None)
+            if saldo_base is None:
+                saldo_base = parsed.valor_pedido if parsed.valor_pedido is not None else soma_debitos
+            try:
+                with transaction.atomic():
+                    ad = Adesao.objects.create(
+                        cliente=cliente,
+                        perdcomp=parsed.perdcomp or '',
+                        metodo_credito=parsed.metodo_credito,
+                        data_inicio=_conv_date(parsed.data_criacao) or timezone.now().date(),
+                        saldo=float(saldo_base or 0),
+                        ano=parsed.ano or None,
+                        trimestre=parsed.trimestre or None,
+                        tipo_credito=(parsed.tipo_credito or '')[:200] or None,
+                        periodo_apuracao_credito=parsed.periodo_apuracao_credito or None,
+                        codigo_receita=(parsed.codigo_receita or '')[:100] or None,
+                    )
+                    from django.utils import timezone as dj_tz
+                    for d in (parsed.debitos or []):
+                        val = d.get('valor')
+                        if val is None:
+                            continue
+                        Lancamentos.objects.create(
+                            id_adesao=ad,
+                            data_lancamento=dj_tz.now(),
+                            valor=float(val),
+                            sinal='-',
+                            tipo='Gerado',
+                            descricao='Débito vinculado (importado do PDF) - Declaração de Compensação',
+                            metodo=parsed.metodo_credito,
+                            codigo_receita_denominacao=(d.get('codigo_receita_denominacao') or None),
+                            periodo_apuracao_debito=(d.get('periodo_apuracao_debito') or None),
+                            aprovado=True,
+                        )
+                    registrar_documento(content_hash, DOC_PERDCOMP, ad, filename, ad.perdcomp, user, extraido=extraido)
+                referencias.perdcomps.add(ad.perdcomp)
+                detail_url = reverse('adesao:detail', kwargs={'pk': ad.pk})
+                res = {'file': filename, 'ok': True, 'created': True, 'id': ad.pk, 'detail_url': detail_url}
+            except Exception as e:
+                res = {'file': filename, 'ok': False, 'error': f'Falha ao criar adesão e débitos: {e}'}
+            context_log['result'] = res
+            gravar_log_importacao('batch', context_log, user, timer)
+            return res
+        else:
+            # Fluxo padrão (Pedido de ressarcimento/restituição): usa o Form para validações
+            form_data = {
+                'cliente': str(cliente.id),
+                'perdcomp': parsed.perdcomp or '',
+                'metodo_credito': parsed.metodo_credito or '',
+                'data_inicio': _conv_date(parsed.data_criacao) or '',
+                'saldo': str(parsed.valor_pedido) if parsed.valor_pedido is not None else '',
+                'ano': parsed.ano or '',
+                'trimestre': parsed.trimestre or '',
+                'tipo_credito': (parsed.tipo_credito or '')[:200],
+                'data_arrecadacao': _conv_date(parsed.data_arrecadacao) or '',
+                'periodo_apuracao_credito': parsed.periodo_apuracao_credito or '',
+                'codigo_receita': (parsed.codigo_receita or '')[:100],
+            }
+            form = AdesaoForm(data=form_data)
+            if not form.is_valid():
+                errs = {k: [str(e) for e in v] for k, v in form.errors.items()}
+                res = {'file': filename, 'ok': False, 'error': 'Falha na validação.', 'errors': errs}
+                context_log['result'] = res
+                gravar_log_importacao('batch', context_log, user, timer)
+                return res
+            with transaction.atomic():
+                obj = form.save()
+                registrar_documento(content_hash, DOC_PERDCOMP, obj, filename, obj.perdcomp, user, extraido=extraido)
+            referencias.perdcomps.add(obj.perdcomp)
+            detail_url = reverse('adesao:detail', kwargs={'pk': obj.pk})
+            res = {'file': filename, 'ok': True, 'created': True, 'id': obj.pk, 'detail_url': detail_url}
+            context_log['result'] = res
+            gravar_log_importacao('batch', context_log, user, timer)
+            return res
+    except Exception as e:
+        res = {'file': filename, 'ok': False, 'error': f'Erro inesperado: {e}'}
+        context_log['result'] = res
+        gravar_log_importacao('batch', context_log, user, timer)
+        return res
+
+
+def _ler_uploads(files) -> Iterator[PDFEntry]:
+    """Arquivos do lote prontos para extração, um ``PDFEntry`` por PDF.
+
+    Os uploads são lidos à medida que as entradas são consumidas (o lote pega
+    um bloco por vez), não todos de uma vez. Arquivos .zip são expandidos em
+    uma entrada por PDF (nome ``zip/entrada``), lidas uma a uma e sem extrair
+    para o disco (ver ``utils.pdf_zip``). Falhas de leitura viram fonte
+    ``None``/``error`` (erro no resultado do arquivo).
+    """
+    for f in files:
         try:
-            log_data['status_code'] = status_code
-            log_data['result'] = response_payload
-            logs_dir = os.path.join(getattr(settings, 'MEDIA_ROOT', ''), 'import_logs')
-            os.makedirs(logs_dir, exist_ok=True)
-            safe_name = os.path.basename(pdf_file.name).replace(' ', '_')
-            log_path = os.path.join(
-                logs_dir,
-                f"credito_conta_{timezone.now().strftime('%Y%m%d_%H%M%S')}_{safe_name}.json"
-            )
-            import json
-            with open(log_path, 'w', encoding='utf-8') as fh:
-                fh.write(json.dumps(log_data, ensure_ascii=False, indent=2))
-        except Exception:
-            pass
-        try:
-            if 'tmp_path' in locals() and os.path.exists(tmp_path):
-                os.remove(tmp_path)
+            pdf_source, content_hash = read_upload(f)
+            if not is_zip_upload(f):
+                yield PDFEntry(f.name, pdf_source, content_hash)
+                continue
+            vazio = True
+            for entry in iter_zip_pdfs(pdf_source):
+                vazio = False
+                yield entry._replace(name=f"{f.name}/{entry.name}")
+            if vazio:
+                yield PDFEntry(f.name, None, None, 'Nenhum PDF encontrado no arquivo ZIP.')
+        except zipfile.BadZipFile:
+            yield PDFEntry(f.name, None, None, 'Arquivo ZIP inválido ou corrompido.')
         except Exception:
-            pass
+            yield PDFEntry(f.name, None, None)
+
+
+def _item_lote_duplicado(user, filename: str, documento, timer: StageTimer | None = None) -> dict[str, Any]:
+    """Resultado (e log) de um arquivo do lote já importado antes (``DocumentoImportado``)."""
+    erro = DocumentoJaImportado(documento)
+    res = {'file': filename, 'ok': False, 'error': str(erro), **erro.detalhes()}
+    context_log = {
+        'user': getattr(user, 'username', None),
+        'filename': filename,
+        'sha256': documento.sha256,
+        'result': res,
+    }
+    gravar_log_importacao('batch', context_log, user, timer)
+    return res
+
 
-    return JsonResponse(response_payload or {'ok': False, 'error': 'Falha desconhecida.'}, status=status_code)
+def _iter_importar_lote(user, entries: Iterable[PDFEntry], criar: bool, bloco: int = _BLOCO_REFERENCIAS):
+    """Extrai (pool de processos, ordem preservada) e importa cada entrada do lote.
+
+    As entradas são consumidas em blocos de até ``bloco`` arquivos (com
+    ``_ler_uploads``, só o bloco atual fica lido em memória). Em cada bloco,
+    arquivos já importados (mesmo SHA-256 em ``DocumentoImportado``) são
+    respondidos sem extração; os demais passam por duas fases: primeiro
+    extração e parsing; depois uma consulta para os CNPJs e outra para os
+    PER/DCOMPs de todo o bloco (``_resolver_referencias``), e as validações
+    usam esses mapas. O histórico das gravações é atribuído a ``user``.
+    """
+    entries = iter(entries)
+    while True:
+        lidas = list(islice(entries, bloco))
+        if not lidas:
+            return
+        duplicados = documentos_importados(entry.sha256 for entry in lidas)
+        extraidos = iter_extract_and_parse(
+            [None if entry.sha256 in duplicados else entry.source for entry in lidas],
+            parse_ressarcimento_text,
+            hashes=[entry.sha256 for entry in lidas],
+        )
+        pendentes = [
+            (entry, ExtractionResult(error=entry.error) if entry.error is not None else extraido)
+            for entry, extraido in zip(lidas, extraidos)
+        ]
+        referencias = _resolver_referencias([extraido.parsed for _, extraido in pendentes])
+        for entry, extraido in pendentes:
+            timer = StageTimer()
+            timer.bytes = source_size(entry.source)
+            if entry.sha256 in duplicados:
+                yield _item_lote_duplicado(user, entry.name, duplicados[entry.sha256], timer)
+                continue
+            # Fora do yield: entre um arquivo e outro a resposta em streaming
+            # devolve o controle ao servidor
+            with _historico_do_usuario(user):
+                res = _importar_item_lote(user, entry.name, entry.sha256, extraido, criar, referencias, timer)
+            yield res
 
 
 @login_required
 @require_POST
 def importar_pdf_perdcomp_lote(request):
     """Importação em lote de PDFs PERDCOMP.
-    Campo de arquivos: 'pdfs' (múltiplos). Se 'criar' for truthy, criará as Adesões automaticamente.
+    Campo de arquivos: 'pdfs' (múltiplos; aceita também .zip com PDFs). Se 'criar' for truthy, criará as Adesões automaticamente.
     Retorna JSON com a lista de resultados por arquivo (ok/error, mensagens e link quando criado).
     """
     if not (request.user.is_superuser or request.user.is_staff or request.user.has_perm('adesao.add_adesao')):
@@ -1195,221 +1553,315 @@ def importar_pdf_perdcomp_lote(request):
     if not files:
         return JsonResponse({'ok': False, 'error': 'Nenhum arquivo PDF enviado.'}, status=400)
 
-    import tempfile, os, datetime, re
-    from django.conf import settings
-    from django.urls import reverse
-    results = []
+    # Etapa 1: conteúdo de cada upload (arquivo temporário do Django ou memória), lido
+    # um bloco por vez durante a etapa 2; arquivos .zip viram uma entrada por PDF
+    entries = _ler_uploads(files)
 
-    def write_log(base_filename: str, payload: dict):
-        try:
-            logs_dir = os.path.join(getattr(settings, 'MEDIA_ROOT', ''), 'import_logs')
-            os.makedirs(logs_dir, exist_ok=True)
-            ts = datetime.datetime.now().strftime('%Y%m%d_%H%M%S_%f')
-            safe_name = os.path.basename(base_filename).replace(' ', '_')
-            path = os.path.join(logs_dir, f"batch_{ts}_{safe_name}.json")
-            import json
-            json_payload = json.dumps(payload, ensure_ascii=False, indent=2)
-            with open(path, 'w', encoding='utf-8') as f:
-                f.write(json_payload)
-        except Exception:
-            pass
+    # Etapa 2: extração + parsing em paralelo (pool de processos), preservando a ordem;
+    # arquivos já extraídos antes (mesmo SHA-256) vêm direto do cache.
+    # Etapa 3: validações e criação no banco, na ordem original dos arquivos
+    results = list(_iter_importar_lote(request.user, entries, criar))
 
-    for f in files:
-        context_log = {
-            'user': getattr(request.user, 'username', None),
-            'filename': f.name,
-        }
-        tmp_path = None
+    return JsonResponse({'ok': True, 'results': results})
+
+
+@login_required
+@require_POST
+def importar_pdf_perdcomp_lote_stream(request):
+    """Variante em streaming de ``importar_pdf_perdcomp_lote`` (mesmos campos).
+
+    Em vez de um único JSON no fim, envia uma linha NDJSON por arquivo assim que
+    ele termina (resultado + ``index``) e uma linha final ``{"done": true, ...}``
+    com os totais. Com ``Accept: text/event-stream`` responde em SSE (eventos
+    ``result`` e ``done``). Os resultados não são acumulados em memória.
+    """
+    if not (request.user.is_superuser or request.user.is_staff or request.user.has_perm('adesao.add_adesao')):
+        return JsonResponse({'ok': False, 'error': 'Permissão negada para importar adesões.'}, status=403)
+    files = request.FILES.getlist('pdfs') or request.FILES.getlist('pdf')
+    criar = str(request.POST.get('criar', '0')).lower() in ('1', 'true', 'on', 'yes')
+    if not files:
+        return JsonResponse({'ok': False, 'error': 'Nenhum arquivo PDF enviado.'}, status=400)
+
+    import json
+    sse = 'text/event-stream' in request.headers.get('Accept', '')
+    entries = _ler_uploads(files)
+    user = request.user
+
+    def _linha(evento: str, payload: dict) -> str:
+        data = json.dumps(payload, ensure_ascii=False)
+        return f"event: {evento}\ndata: {data}\n\n" if sse else data + "\n"
+
+    def _resultados():
+        total = ok = criados = 0
+        # Blocos menores: o primeiro resultado não espera a extração de um bloco grande
+        lote = _iter_importar_lote(user, entries, criar, bloco=_BLOCO_REFERENCIAS_STREAM)
+        for index, res in enumerate(lote):
+            total += 1
+            ok += bool(res.get('ok'))
+            criados += bool(res.get('created'))
+            yield _linha('result', {'index': index, **res})
+        yield _linha('done', {'done': True, 'total': total, 'ok': ok, 'erros': total - ok, 'criados': criados})
+
+    response = StreamingHttpResponse(
+        _resultados(),
+        content_type='text/event-stream; charset=utf-8' if sse else 'application/x-ndjson; charset=utf-8',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Nginx repassa cada linha sem bufferizar
+    return response
+
+
+@login_required
+@require_POST
+def importar_pdf_lote_job(request):
+    """Enfileira um lote de PDFs PERDCOMP para o ``import_worker``.
+
+    Mesmos campos de ``importar_pdf_perdcomp_lote`` ('pdfs', 'criar'). Para
+    lotes grandes, envie em partes: as requisições seguintes informam 'job'
+    (id retornado pela primeira) e acrescentam arquivos ao mesmo lote.
+    Responde 202 com o id e a URL de acompanhamento (``importar_pdf_lote_status``).
+    """
+    if not (request.user.is_superuser or request.user.is_staff or request.user.has_perm('adesao.add_adesao')):
+        return JsonResponse({'ok': False, 'error': 'Permissão negada para importar adesões.'}, status=403)
+    files = request.FILES.getlist('pdfs') or request.FILES.getlist('pdf')
+    criar = str(request.POST.get('criar', '0')).lower() in ('1', 'true', 'on', 'yes')
+    if not files:
+        return JsonResponse({'ok': False, 'error': 'Nenhum arquivo PDF enviado.'}, status=400)
+
+    job = None
+    job_id = request.POST.get('job')
+    if job_id:
+        job = ImportJob.objects.filter(pk=job_id, usuario=request.user).first()
+        if job is None:
+            return JsonResponse({'ok': False, 'error': 'Importação não encontrada.'}, status=404)
+    job = enfileirar(request.user, files, criar, job=job)
+    return JsonResponse({
+        'ok': True,
+        'job': job.pk,
+        'total': job.items.count(),
+        'status_url': reverse('adesao:importar_pdf_lote_status', kwargs={'pk': job.pk}),
+    }, status=202)
+
+
+@login_required
+@require_GET
+def importar_pdf_lote_status(request, pk):
+    """Progresso de um lote enfileirado: situação do job e de cada arquivo.
+
+    ``resultado`` de cada item segue o formato de ``results`` da importação em
+    lote síncrona. Com ``?apos=<ordem>`` só itens posteriores são listados.
+    """
+    job = get_object_or_404(ImportJob, pk=pk)
+    if job.usuario_id != request.user.pk and not (request.user.is_superuser or request.user.is_staff):
+        raise Http404
+    items = job.items.defer('conteudo')
+    apos = request.GET.get('apos')
+    if apos not in (None, ''):
         try:
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
-                for chunk in f.chunks():
-                    tmp.write(chunk)
-                tmp_path = tmp.name
-
-            txt = extract_text(tmp_path) or ''
-            parsed = parse_ressarcimento_text(txt)
-            context_log['extracted_present'] = bool(txt)
-            context_log['parsed'] = parsed.as_dict()
-
-            # Validar CNPJ
-            cnpj = parsed.cnpj or ''
-            if not cnpj:
-                msg = 'CNPJ não identificado no PDF.'
-                res = {'file': f.name, 'ok': False, 'error': msg}
-                results.append(res)
-                context_log['result'] = res
-                write_log(f.name, context_log)
-                continue
-            try:
-                cliente = ClientesParceiros.objects.select_related('id_company_vinculada').get(
-                    id_company_vinculada__cnpj=cnpj
-                )
-            except ClientesParceiros.DoesNotExist:
-                msg = f'Cliente com CNPJ {cnpj} não encontrado.'
-                res = {'file': f.name, 'ok': False, 'error': msg}
-                results.append(res)
-                context_log['result'] = res
-                write_log(f.name, context_log)
-                continue
+            items = items.filter(ordem__gt=int(apos))
+        except ValueError:
+            return JsonResponse({'ok': False, 'error': "Parâmetro 'apos' inválido."}, status=400)
+    total = job.items.count()
+    finalizados = job.items.filter(status__in=(ImportJobItem.CONCLUIDO, ImportJobItem.ERRO)).count()
+    return JsonResponse({
+        'ok': True,
+        'job': {
+            'id': job.pk,
+            'status': job.status,
+            'criar': job.criar,
+            'total': total,
+            'processados': finalizados,
+            'criado_em': job.criado_em.isoformat(),
+            'concluido_em': job.concluido_em.isoformat() if job.concluido_em else None,
+        },
+        'items': [
+            {
+                'ordem': item.ordem,
+                'file': item.nome_arquivo,
+                'status': item.status,
+                'resultado': item.resultado,
+            }
+            for item in items
+        ],
+    })
 
-            # Validar PERDCOMP
-            if not parsed.perdcomp:
-                msg = 'PERDCOMP não identificado no PDF.'
-                res = {'file': f.name, 'ok': False, 'error': msg}
-                results.append(res)
-                context_log['result'] = res
-                write_log(f.name, context_log)
-                continue
-            if Adesao.objects.filter(perdcomp=parsed.perdcomp).exists():
-                msg = f'PERDCOMP {parsed.perdcomp} já cadastrado.'
-                res = {'file': f.name, 'ok': False, 'error': msg}
-                results.append(res)
-                context_log['result'] = res
-                write_log(f.name, context_log)
-                continue
 
-            # Apenas extrair (sem criar)
-            if not criar:
-                emp = cliente.id_company_vinculada
-                cliente_label = f"{emp.nome_fantasia or emp.razao_social} ({cliente.nome_referencia})"
-                res = {
-                    'file': f.name,
-                    'ok': True,
-                    'created': False,
-                    'fields': {
-                        'cliente': cliente.id,
-                        'cliente_label': cliente_label,
-                        'perdcomp': parsed.perdcomp,
-                        'metodo_credito': parsed.metodo_credito,
-                        'data_inicio': parsed.data_criacao,
-                        'saldo': str(parsed.valor_pedido) if parsed.valor_pedido is not None else None,
-                        'valor_total_origem': str(getattr(parsed, 'valor_total_origem', None)) if getattr(parsed, 'valor_total_origem', None) is not None else None,
-                        'valor_original_credito_inicial': str(getattr(parsed, 'valor_original_credito_inicial', None)) if getattr(parsed, 'valor_original_credito_inicial', None) is not None else None,
-                        'ano': parsed.ano,
-                        'trimestre': parsed.trimestre,
-                        'tipo_credito': parsed.tipo_credito,
-                        'data_arrecadacao': parsed.data_arrecadacao,
-                        'periodo_apuracao_credito': parsed.periodo_apuracao_credito,
-                        'codigo_receita': parsed.codigo_receita,
-                        'debitos': [
-                            {
-                                'codigo_receita_denominacao': d.get('codigo_receita_denominacao'),
-                                'periodo_apuracao_debito': d.get('periodo_apuracao_debito'),
-                                'valor': str(d.get('valor')) if d.get('valor') is not None else None,
-                            }
-                            for d in (parsed.debitos or [])
-                        ],
-                    }
-                }
-                results.append(res)
-                context_log['result'] = res
-                write_log(f.name, context_log)
-                continue
+# Importação universal: o tipo do documento é identificado pelo cabeçalho.
+# Todos recebem ``(usuario, criar, nome, upload, extraido, timer)``; ``criar``
+# só vale para o PER/DCOMP (os demais tipos sempre gravam).
+_IMPORT_HANDLERS = {
+    DOC_PERDCOMP: _importar_perdcomp,
+    DOC_PEDIDO_CREDITO: _importar_pedido_credito,
+    DOC_DECLARACAO_COMPENSACAO: _importar_declaracao_compensacao,
+    DOC_RECIBO: _importar_recibo,
+    DOC_CREDITO_CONTA: _importar_credito_conta,
+}
+
+
+def _importacao_sem_tipo(usuario, nome: str, content_hash: str | None,
+                         error: str, status_code: int,
+                         timer: StageTimer | None = None, **extra: Any) -> tuple[dict[str, Any], int]:
+    """Resposta (e log) para arquivos que não chegam a um fluxo de importação.
+
+    ``extra`` (ex.: ``error_code``) é acrescentado à resposta.
+    """
+    response_payload: dict[str, Any] = {'ok': False, 'error': error, **extra}
+    log_data: dict[str, Any] = {
+        'user': getattr(usuario, 'username', None),
+        'filename': nome,
+        'ts': timezone.now().isoformat(),
+        'context': 'documento',
+        'sha256': content_hash,
+        'status_code': status_code,
+        'result': response_payload,
+    }
+    gravar_log_importacao('documento', log_data, usuario, timer)
+    return response_payload, status_code
+
+
+_TIPO_NAO_RECONHECIDO = (
+    'Tipo de documento não reconhecido. Envie um PER/DCOMP, pedido de crédito, '
+    'declaração de compensação, recibo ou notificação de crédito em conta.'
+)
+
+
+@login_required
+@csrf_protect
+@require_POST
+def importar_documento(request):
+    """Importa qualquer PDF suportado, identificando o tipo pela primeira página.
+
+    O arquivo segue o mesmo fluxo da view específica do tipo encontrado
+    (PER/DCOMP, pedido de crédito, declaração de compensação, recibo ou
+    crédito em conta). A resposta inclui ``tipo_documento``.
+    """
+    pdf_file: UploadedFile | None = request.FILES.get('pdf')
+    if not pdf_file:
+        return JsonResponse({'ok': False, 'error': 'Arquivo PDF não enviado (campo "pdf").'}, status=400)
 
-            # Criar registro(s)
-            comp_vinc = parsed.metodo_credito in (
-                'Compensação vinculada a um pedido de ressarcimento',
-                'Compensação vinculada a um pedido de restituição',
+    upload = None
+    timer = StageTimer()
+    try:
+        upload = read_upload(pdf_file)
+        timer.lap('upload')
+        timer.bytes = source_size(upload[0])
+        verificar_duplicado(upload[1])
+        tipo = sniff_document_type(*upload)
+        # Leitura da primeira página para identificar o tipo
+        timer.lap('extract')
+    except Exception as e:
+        tipo = e.documento.tipo if isinstance(e, DocumentoJaImportado) else None
+        timer.lap('upload' if upload is None else 'extract')
+        status_code, erro = _erro_processamento(e)
+        del erro['ok']
+        payload, status_code = _importacao_sem_tipo(
+            request.user, pdf_file.name, upload[1] if upload else None, erro.pop('error'), status_code, timer, **erro
+        )
+    else:
+        if tipo is None:
+            payload, status_code = _importacao_sem_tipo(
+                request.user, pdf_file.name, upload[1], _TIPO_NAO_RECONHECIDO, 422, timer
             )
-            def _conv_date(dmy: str) -> str | None:
-                m = re.match(r"(\d{2})/(\d{2})/(\d{4})", dmy or '')
-                return f"{m.group(3)}-{m.group(2)}-{m.group(1)}" if m else None
+        else:
+            criar = str(request.POST.get('criar', '0')).lower() in ('1', 'true', 'on', 'yes')
+            payload, status_code = _IMPORT_HANDLERS[tipo](request.user, criar, pdf_file.name, upload, timer=timer)
+    payload = {**payload, 'tipo_documento': tipo, 'tipo_documento_label': DOCUMENT_LABELS.get(tipo)}
+    return JsonResponse(payload, status=status_code)
 
-            if comp_vinc:
-                # Saldo base: usar "Valor Original do Crédito Inicial" quando disponível;
-                # fallback para valor do pedido e, por fim, soma dos débitos
-                from decimal import Decimal
-                from django.db import transaction
-                soma_debitos = Decimal('0')
-                for d in (parsed.debitos or []):
-                    v = d.get('valor')
-                    if v is not None:
-                        try:
-                            soma_debitos += Decimal(str(v))
-                        except Exception:
-                            pass
-                saldo_base = getattr(parsed, 'valor_original_credito_inicial', None)
-                if saldo_base is None:
-                    saldo_base = parsed.valor_pedido if parsed.valor_pedido is not None else soma_debitos
-                try:
-                    with transaction.atomic():
-                        ad = Adesao.objects.create(
-                            cliente=cliente,
-                            perdcomp=parsed.perdcomp or '',
-                            metodo_credito=parsed.metodo_credito,
-                            data_inicio=_conv_date(parsed.data_criacao) or timezone.now().date(),
-                            saldo=float(saldo_base or 0),
-                            ano=parsed.ano or None,
-                            trimestre=parsed.trimestre or None,
-                            tipo_credito=(parsed.tipo_credito or '')[:200] or None,
-                            periodo_apuracao_credito=parsed.periodo_apuracao_credito or None,
-                            codigo_receita=(parsed.codigo_receita or '')[:100] or None,
-                        )
-                        from django.utils import timezone as dj_tz
-                        for d in (parsed.debitos or []):
-                            val = d.get('valor')
-                            if val is None:
-                                continue
-                            Lancamentos.objects.create(
-                                id_adesao=ad,
-                                data_lancamento=dj_tz.now(),
-                                valor=float(val),
-                                sinal='-',
-                                tipo='Gerado',
-                                descricao='Débito vinculado (importado do PDF) - Declaração de Compensação',
-                                metodo=parsed.metodo_credito,
-                                codigo_receita_denominacao=(d.get('codigo_receita_denominacao') or None),
-                                periodo_apuracao_debito=(d.get('periodo_apuracao_debito') or None),
-                                aprovado=True,
-                            )
-                    detail_url = reverse('adesao:detail', kwargs={'pk': ad.pk})
-                    res = {'file': f.name, 'ok': True, 'created': True, 'id': ad.pk, 'detail_url': detail_url}
-                except Exception as e:
-                    res = {'file': f.name, 'ok': False, 'error': f'Falha ao criar adesão e débitos: {e}'}
-                results.append(res)
-                context_log['result'] = res
-                write_log(f.name, context_log)
-                continue
-            else:
-                # Fluxo padrão (Pedido de ressarcimento/restituição): usa o Form para validações
-                form_data = {
-                    'cliente': str(cliente.id),
-                    'perdcomp': parsed.perdcomp or '',
-                    'metodo_credito': parsed.metodo_credito or '',
-                    'data_inicio': _conv_date(parsed.data_criacao) or '',
-                    'saldo': str(parsed.valor_pedido) if parsed.valor_pedido is not None else '',
-                    'ano': parsed.ano or '',
-                    'trimestre': parsed.trimestre or '',
-                    'tipo_credito': (parsed.tipo_credito or '')[:200],
-                    'data_arrecadacao': _conv_date(parsed.data_arrecadacao) or '',
-                    'periodo_apuracao_credito': parsed.periodo_apuracao_credito or '',
-                    'codigo_receita': (parsed.codigo_receita or '')[:100],
-                }
-                form = AdesaoForm(data=form_data)
-                if not form.is_valid():
-                    errs = {k: [str(e) for e in v] for k, v in form.errors.items()}
-                    res = {'file': f.name, 'ok': False, 'error': 'Falha na validação.', 'errors': errs}
-                    results.append(res)
-                    context_log['result'] = res
-                    write_log(f.name, context_log)
-                    continue
-                obj = form.save()
-                detail_url = reverse('adesao:detail', kwargs={'pk': obj.pk})
-                res = {'file': f.name, 'ok': True, 'created': True, 'id': obj.pk, 'detail_url': detail_url}
-                results.append(res)
-                context_log['result'] = res
-                write_log(f.name, context_log)
-        except Exception as e:
-            res = {'file': f.name, 'ok': False, 'error': f'Erro inesperado: {e}'}
-            results.append(res)
-            context_log['result'] = res
-            write_log(f.name, context_log)
-        finally:
-            try:
-                if tmp_path and os.path.exists(tmp_path):
-                    os.remove(tmp_path)
-            except Exception:
-                pass
+
+def importar_documento_extraido(usuario, criar: bool, nome: str, upload, extraido,
+                                timer=None, duplicado=None) -> dict[str, Any]:
+    """Importa um arquivo já extraído com ``parse_documento`` pelo fluxo do seu tipo.
+
+    ``upload`` é o ``(fonte, sha256)`` de ``read_upload`` (``None`` se a leitura
+    falhou). Retorna o resultado do arquivo (payload do fluxo + ``file``,
+    ``status_code`` e ``tipo_documento``). Usado pela importação mista em lote
+    e pelo comando ``importar_pdfs``. Com ``duplicado`` (``DocumentoImportado``
+    do mesmo SHA-256), o arquivo não foi extraído e é recusado como já importado.
+    """
+    timer = timer or StageTimer()
+    if upload and timer.bytes is None:
+        timer.bytes = source_size(upload[0])
+    content_hash = upload[1] if upload else None
+    classificado = extraido.parsed
+    tipo = classificado.tipo if classificado is not None else None
+    try:
+        if duplicado is not None:
+            tipo = duplicado.tipo
+            erro = DocumentoJaImportado(duplicado)
+            payload, status_code = _importacao_sem_tipo(
+                usuario, nome, content_hash, str(erro), 409, timer, **erro.detalhes()
+            )
+        elif extraido.error is not None or tipo is None:
+            timer.record_extraction(extraido)
+            erro = f'Erro inesperado: {extraido.error}' if extraido.error is not None else _TIPO_NAO_RECONHECIDO
+            status_code = 500 if extraido.error is not None and extraido.error_code is None else 422
+            extra = {'error_code': extraido.error_code} if extraido.error_code is not None else {}
+            payload, status_code = _importacao_sem_tipo(
+                usuario, nome, content_hash, erro, status_code, timer, **extra
+            )
+        else:
+            # Sem requisição (comando importar_pdfs): o histórico fica com ``usuario``
+            with _historico_do_usuario(usuario):
+                payload, status_code = _IMPORT_HANDLERS[tipo](
+                    usuario, criar, nome, upload, dataclasses.replace(extraido, parsed=classificado.parsed), timer
+                )
+    except Exception as e:
+        payload, status_code = {'ok': False, 'error': f'Erro inesperado: {e}'}, 500
+    return {
+        **payload,
+        'file': nome,
+        'status_code': status_code,
+        'tipo_documento': tipo,
+        'tipo_documento_label': DOCUMENT_LABELS.get(tipo),
+    }
+
+
+@login_required
+@require_POST
+def importar_documentos_lote(request):
+    """Importação em lote com tipos de documento misturados.
+
+    Campo de arquivos: 'pdfs' (múltiplos). Extração, classificação e parsing
+    rodam no pool de processos em uma única passada (``parse_documento``); em
+    seguida cada arquivo é importado pelo fluxo do seu tipo, na ordem do upload.
+    Retorna JSON com o resultado por arquivo (inclui ``tipo_documento``).
+    """
+    if not (request.user.is_superuser or request.user.is_staff or request.user.has_perm('adesao.add_adesao')):
+        return JsonResponse({'ok': False, 'error': 'Permissão negada para importar documentos.'}, status=403)
+    files = request.FILES.getlist('pdfs') or request.FILES.getlist('pdf')
+    if not files:
+        return JsonResponse({'ok': False, 'error': 'Nenhum arquivo PDF enviado.'}, status=400)
+
+    # Etapa 1: conteúdo de cada upload
+    uploads: list[Any] = []
+    timers: list[StageTimer] = []
+    for f in files:
+        timer = StageTimer()
+        try:
+            uploads.append(read_upload(f))
+        except Exception:
+            uploads.append(None)
+        timer.lap('upload')
+        timers.append(timer)
+
+    # Etapa 2: extração + classificação + parsing em paralelo (ou do cache);
+    # arquivos já importados (mesmo SHA-256) não são extraídos
+    duplicados = documentos_importados(u[1] for u in uploads if u)
+    extraidos = extract_and_parse_many(
+        [u[0] if u and u[1] not in duplicados else None for u in uploads],
+        parse_documento,
+        hashes=[u[1] if u else None for u in uploads],
+    )
+
+    # Etapa 3: importação de cada arquivo pelo fluxo do seu tipo
+    criar = str(request.POST.get('criar', '0')).lower() in ('1', 'true', 'on', 'yes')
+    results = [
+        importar_documento_extraido(
+            request.user, criar, f.name, upload, extraido, timer, duplicados.get(upload[1]) if upload else None
+        )
+        for f, upload, extraido, timer in zip(files, uploads, extraidos, timers)
+    ]
 
     return JsonResponse({'ok': True, 'results': results})
 
@@ -1431,57 +1883,114 @@ def importacao_logs_page(request):
     if not (request.user.is_superuser or request.user.is_staff or request.user.has_perm('adesao.view_adesao')):
         messages.error(request, 'Você não tem permissão para visualizar os logs de importação.')
         return redirect('adesao:list')
-    import os, json, datetime
-    from django.conf import settings
-    logs_dir = os.path.join(getattr(settings, 'MEDIA_ROOT', ''), 'import_logs')
-    entries = []
+    from django.core.paginator import Paginator
+    from django.db.models import Q
+
+    qs = ImportLog.objects.all()
+    q = (request.GET.get('q') or '').strip()
+    contexto = (request.GET.get('contexto') or '').strip()
+    status_filtro = (request.GET.get('status') or '').strip()
+    usuario = (request.GET.get('usuario') or '').strip()
+    if q:
+        qs = qs.filter(Q(arquivo__icontains=q) | Q(perdcomp__icontains=q) | Q(cnpj__icontains=q))
+    if contexto:
+        qs = qs.filter(contexto=contexto)
+    if usuario:
+        qs = qs.filter(username=usuario)
+    if status_filtro == 'erro':
+        qs = qs.exclude(ok=True)
+    elif status_filtro == 'criado':
+        qs = qs.filter(ok=True, criado=True)
+    elif status_filtro == 'atualizado':
+        qs = qs.filter(ok=True, atualizado=True).exclude(criado=True)
+    elif status_filtro == 'previa':
+        qs = qs.filter(ok=True).exclude(criado=True).exclude(atualizado=True)
+
+    page_obj = Paginator(qs, 50).get_page(request.GET.get('page'))
+    filtros = request.GET.copy()
+    filtros.pop('page', None)
+    return render(request, 'adesao/adesao_import_logs.html', {
+        'page_obj': page_obj,
+        'entries': page_obj.object_list,
+        'is_paginated': page_obj.has_other_pages(),
+        'filtros_query': filtros.urlencode(),
+        'contextos': sorted(CONTEXTO_LABELS.items(), key=lambda item: item[1]),
+        'usuarios': ImportLog.objects.exclude(username__isnull=True).exclude(username='')
+        .order_by('username').values_list('username', flat=True).distinct(),
+    })
+
+
+
+@login_required
+@require_GET
+def importacao_metricas(request):
+    """Tempos da importação por tipo de documento (p50/p95/p99), em JSON. Só staff.
+
+    ``?dias=N`` define a janela (padrão 7, máximo 90). Para cada tipo: quantidade
+    de importações e percentis de ``upload_ms``, ``extract_ms``, ``parse_ms``,
+    ``db_ms``, ``total_ms``, páginas lidas e tamanho em bytes.
+    """
+    if not (request.user.is_superuser or request.user.is_staff):
+        return JsonResponse({'ok': False, 'error': 'Permissão negada.'}, status=403)
     try:
-        if os.path.isdir(logs_dir):
-            for fname in os.listdir(logs_dir):
-                if not fname.endswith('.json'):
-                    continue
-                fpath = os.path.join(logs_dir, fname)
-                try:
-                    with open(fpath, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                    mtime = datetime.datetime.fromtimestamp(os.path.getmtime(fpath))
-                    # Flatten a few useful fields
-                    result = data.get('result') or {}
-                    context_type = data.get('context', '')
-                    
-                    # Determinar created/updated com fallback inteligente
-                    created = result.get('created')
-                    updated = result.get('updated')
-                    
-                    # Se não tem os campos explícitos, inferir pelo tipo de contexto
-                    if created is None and updated is None and result.get('ok'):
-                        # Recibos, declarações e créditos sempre atualizam
-                        if context_type in ['recibo_pedido_credito', 'declaracao_compensacao', 'credito_em_conta']:
-                            updated = True
-                            created = False
-                        # Pedidos de crédito criam novos
-                        elif context_type == 'pedido_credito':
-                            created = True
-                            updated = False
-                    
-                    entries.append({
-                        'filename': data.get('filename') or fname,
-                        'user': data.get('user'),
-                        'when': mtime,
-                        'parsed': data.get('parsed', {}),
-                        'ok': result.get('ok'),
-                        'error': result.get('error'),
-                        'detail_url': result.get('detail_url'),
-                        'created': created,
-                        'updated': updated,
-                        'context': context_type,
-                        'raw_name': fname,
-                    })
-                except Exception:
-                    continue
-        # Sort desc by when
-        entries.sort(key=lambda e: e['when'], reverse=True)
-    except Exception:
-        messages.error(request, 'Falha ao ler logs de importação.')
-    return render(request, 'adesao/adesao_import_logs.html', {'entries': entries})
+        dias = min(max(int(request.GET.get('dias', 7)), 1), 90)
+    except (TypeError, ValueError):
+        return JsonResponse({'ok': False, 'error': 'Parâmetro "dias" inválido.'}, status=400)
+    desde = timezone.now() - timedelta(days=dias)
+    return JsonResponse({
+        'ok': True,
+        'dias': dias,
+        'desde': desde.isoformat(),
+        'tipos': metricas_por_contexto(desde),
+    })
+
+
+def _parametros_busca(params) -> tuple[str, str | None, int]:
+    # (consulta, origem, limite) de ?q=&origem=&limite= (até 200 resultados)
+    consulta = (params.get('q') or '').strip()
+    origem = (params.get('origem') or '').strip()
+    if origem not in dict(TextoIndexado.ORIGENS):
+        origem = None
+    limite = min(max(int(params.get('limite') or 50), 1), 200)
+    return consulta, origem, limite
+
+
+@login_required
+@require_GET
+def busca_documentos_page(request):
+    """Busca textual nos PDFs importados e anexos de lançamentos, no escopo do usuário."""
+    try:
+        consulta, origem, limite = _parametros_busca(request.GET)
+    except (TypeError, ValueError):
+        consulta, origem, limite = (request.GET.get('q') or '').strip(), None, 50
+    inicio = time.perf_counter()
+    resultados = buscar(consulta, request.user, origem=origem, limite=limite) if consulta else []
+    return render(request, 'adesao/adesao_busca.html', {
+        'consulta': consulta,
+        'origem': origem or '',
+        'origens': TextoIndexado.ORIGENS,
+        'resultados': resultados,
+        'tempo_ms': round((time.perf_counter() - inicio) * 1000, 1),
+    })
+
+
+class BuscaDocumentosAPI(APIView):
+    """``GET ?q=...`` -> documentos que contêm os termos, por relevância (mesmo escopo da listagem de lançamentos)."""
+    permission_classes = [permissions.IsAuthenticated]
 
+    def get(self, request):
+        try:
+            consulta, origem, limite = _parametros_busca(request.query_params)
+        except (TypeError, ValueError):
+            return Response({'ok': False, 'error': 'Parâmetro "limite" inválido.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not consulta:
+            return Response({'ok': False, 'error': 'Informe o parâmetro "q".'}, status=status.HTTP_400_BAD_REQUEST)
+        inicio = time.perf_counter()
+        resultados = buscar(consulta, request.user, origem=origem, limite=limite)
+        return Response({
+            'ok': True,
+            'q': consulta,
+            'total': len(resultados),
+            'tempo_ms': round((time.perf_counter() - inicio) * 1000, 1),
+            'resultados': resultados,
+        })
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+"""Benchmark dos parsers de ``utils/pdf_parser.py`` sobre um corpus sintético.
+
+Usa o corpus de ``utils/pdf_corpus.py`` (ressarcimento, declaração de
+compensação com débitos, pedido de restituição, recibo e crédito em conta), mede
+o tempo de cada ``parse_*`` e, com ``--ref``, compara com a versão do módulo em
+outra revisão do git: tempos lado a lado e contagem de resultados divergentes.
+
+Uso:
+    python bench_pdf_parser.py                 # só a versão atual
+    python bench_pdf_parser.py --ref HEAD~1    # atual x revisão informada
+    python bench_pdf_parser.py --docs 500 --debitos 40 --repeat 5
+
+Acurácia por campo e PDFs reais: ``python manage.py bench_parsers``.
+"""
+import argparse
+import dataclasses
+import importlib.util
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+from utils import pdf_parser  # noqa: E402
+from utils.pdf_corpus import generate_document  # noqa: E402
+
+# Tipo do corpus (utils/pdf_corpus) -> parser medido
+PARSERS = {
+    'ressarcimento': 'parse_ressarcimento_text',
+    'declaracao': 'parse_declaracao_compensacao_text',
+    'restituicao': 'parse_pedido_credito_text',
+    'recibo': 'parse_recibo_pedido_credito_text',
+    'credito_conta': 'parse_credito_em_conta_text',
+}
+
+
+def gerar_documento(tipo, seed, debitos=20, ruido=40):
+    """Texto sintético de um documento do ``tipo`` informado (ver ``PARSERS``)."""
+    return generate_document(tipo, seed, debitos=debitos, noise_lines=ruido).text
+
+
+def carregar_referencia(rev):
+    """Importa ``utils/pdf_parser.py`` da revisão ``rev`` do git como módulo isolado."""
+    source = subprocess.run(
+        ['git', 'show', f'{rev}:utils/pdf_parser.py'],
+        cwd=BASE_DIR, check=True, capture_output=True,
+    ).stdout
+    fd, path = tempfile.mkstemp(suffix='.py')
+    with os.fdopen(fd, 'wb') as fh:
+        fh.write(source)
+    try:
+        spec = importlib.util.spec_from_file_location(f'pdf_parser_{rev}', path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        os.remove(path)
+    return module
+
+
+def medir(func, textos, repeat):
+    """Melhor tempo (s) de ``repeat`` execuções sobre todo o corpus."""
+    melhor = None
+    for _ in range(repeat):
+        inicio = time.perf_counter()
+        for texto in textos:
+            func(texto)
+        decorrido = time.perf_counter() - inicio
+        melhor = decorrido if melhor is None else min(melhor, decorrido)
+    return melhor
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--docs', type=int, default=200, help='Documentos por tipo (padrão: 200)')
+    parser.add_argument('--debitos', type=int, default=20, help='Blocos de débito por declaração (padrão: 20)')
+    parser.add_argument('--repeat', type=int, default=3, help='Repetições; vale o melhor tempo (padrão: 3)')
+    parser.add_argument('--ref', default=None, help='Revisão do git para comparação (ex.: HEAD~1)')
+    args = parser.parse_args(argv)
+
+    referencia = carregar_referencia(args.ref) if args.ref else None
+    print(f"Corpus: {args.docs} documentos por tipo, {args.debitos} débitos por declaração")
+    if referencia:
+        print(f"{'parser':36s} {'ref ms/doc':>10s} {'atual ms/doc':>12s} {'docs/s':>9s} {'ganho':>7s} {'divergências':>12s}")
+    else:
+        print(f"{'parser':36s} {'ms/doc':>10s} {'docs/s':>9s}")
+
+    total_divergencias = 0
+    for tipo, nome in PARSERS.items():
+        textos = [gerar_documento(tipo, seed, args.debitos) for seed in range(args.docs)]
+        atual = getattr(pdf_parser, nome)
+        tempo = medir(atual, textos, args.repeat)
+        ms_doc = tempo / len(textos) * 1000
+        docs_s = len(textos) / tempo if tempo else float('inf')
+        if not referencia:
+            print(f"{nome:36s} {ms_doc:10.3f} {docs_s:9.0f}")
+            continue
+        antigo = getattr(referencia, nome)
+        tempo_ref = medir(antigo, textos, args.repeat)
+        divergencias = sum(
+            dataclasses.asdict(antigo(texto)) != dataclasses.asdict(atual(texto))
+            for texto in textos
+        )
+        total_divergencias += divergencias
+        print(f"{nome:36s} {tempo_ref / len(textos) * 1000:10.3f} {ms_doc:12.3f} "
+              f"{docs_s:9.0f} {tempo_ref / tempo:6.2f}x {divergencias:12d}")
+    return 1 if total_divergencias else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
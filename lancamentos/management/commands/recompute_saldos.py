@@ -0,0 +1,77 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from adesao.models import Adesao
+from lancamentos.saldos import TOLERANCIA, recalcular, reconstruir_checkpoints
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula o saldo_restante dos lançamentos aprovados e o saldo_atual das "
+        "adesões a partir do valor do crédito e dos lançamentos em ordem de aprovação "
+        "(numa única consulta com funções de janela), informa as divergências e "
+        "grava as correções. Após corrigir, recria os checkpoints de saldo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--adesao", type=int, default=None, help="Somente esta adesão (id)")
+        parser.add_argument(
+            "--verify-only",
+            action="store_true",
+            help="Só verifica; termina com erro se houver divergência",
+        )
+        parser.add_argument(
+            "--tolerancia",
+            type=float,
+            default=TOLERANCIA,
+            help=f"Diferença aceita entre saldo gravado e recalculado (padrão: {TOLERANCIA})",
+        )
+        parser.add_argument(
+            "--checkpoints",
+            action="store_true",
+            help="Recria os checkpoints de saldo mesmo sem divergências (ex.: carga inicial)",
+        )
+        parser.add_argument(
+            "--limite",
+            type=int,
+            default=20,
+            help="Adesões divergentes listadas, as de maior diferença (padrão: 20)",
+        )
+
+    def handle(self, *args, **options):
+        adesao_id = options["adesao"]
+        if options["checkpoints"] and options["verify_only"]:
+            raise CommandError("--checkpoints não pode ser usado com --verify-only.")
+        if adesao_id is not None and not Adesao.objects.filter(pk=adesao_id).exists():
+            raise CommandError(f"Adesão {adesao_id} não encontrada.")
+        tolerancia = options["tolerancia"]
+
+        inicio = time.perf_counter()
+        divergencias = recalcular(
+            adesao_id, tolerancia, options["limite"], corrigir=not options["verify_only"],
+        )
+        decorrido = time.perf_counter() - inicio
+        self.stdout.write(
+            f"Recálculo em {decorrido:.2f}s: {divergencias.lancamentos} lançamento(s) e "
+            f"{divergencias.adesoes} adesão(ões) com saldo divergente"
+        )
+        for pk, gravado, calculado in divergencias.maiores:
+            gravado_txt = "vazio" if gravado is None else f"{gravado:,.2f}"
+            diferenca = calculado - (gravado or 0)
+            self.stdout.write(f"  adesão {pk}: gravado {gravado_txt}, recalculado {calculado:,.2f} ({diferenca:+,.2f})")
+
+        if divergencias and not divergencias.corrigido:
+            raise CommandError("Saldos divergentes; rode sem --verify-only para corrigir.")
+        if divergencias:
+            self.stdout.write(self.style.SUCCESS("Saldos divergentes corrigidos."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Saldos consistentes."))
+
+        # Checkpoints gravados com os saldos errados também precisam ser refeitos
+        if divergencias.corrigido or options["checkpoints"]:
+            inicio = time.perf_counter()
+            criados = reconstruir_checkpoints(adesao_id)
+            self.stdout.write(
+                f"Checkpoints de saldo recriados em {time.perf_counter() - inicio:.2f}s: {criados}"
+            )
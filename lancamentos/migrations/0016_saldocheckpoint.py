@@ -0,0 +1,47 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adesao', '0020_textoindexado'),
+        ('lancamentos', '0015_alter_lancamentos_unique_together'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaldoCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data_aprovacao', models.DateTimeField(verbose_name='Data de aprovação do lançamento')),
+                ('saldo', models.FloatField(verbose_name='Saldo')),
+                ('motivo', models.CharField(choices=[('mensal', 'Fechamento do mês'), ('intervalo', 'Intervalo de lançamentos')], max_length=10, verbose_name='Motivo')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+            ],
+            options={
+                'verbose_name': 'Checkpoint de saldo',
+                'verbose_name_plural': 'Checkpoints de saldo',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='lancamentos',
+            index=models.Index(fields=['id_adesao', 'data_aprovacao', 'id'], name='lancamentos_id_ades_c76861_idx'),
+        ),
+        migrations.AddField(
+            model_name='saldocheckpoint',
+            name='adesao',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints_saldo', to='adesao.adesao', verbose_name='Adesão'),
+        ),
+        migrations.AddField(
+            model_name='saldocheckpoint',
+            name='lancamento',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoint_saldo', to='lancamentos.lancamentos', verbose_name='Último lançamento incluído'),
+        ),
+        migrations.AddIndex(
+            model_name='saldocheckpoint',
+            index=models.Index(fields=['adesao', 'data_aprovacao', 'lancamento'], name='lancamentos_adesao__ea8217_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 19:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lancamentos', '0016_saldocheckpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='anexos',
+            name='indexacao_pendente',
+            field=models.BooleanField(db_index=True, default=False, editable=False, verbose_name='Indexação pendente'),
+        ),
+    ]
@@ -6,6 +6,16 @@ from django.urls import reverse
 from datetime import datetime, timedelta
 from simple_history.models import HistoricalRecords
 
+
+def _usuario_historico():
+    """Usuário da requisição atual para o histórico, como no ``save()`` (middleware do simple_history)."""
+    request = getattr(HistoricalRecords.context, 'request', None)
+    user = getattr(request, 'user', None)
+    if user is not None and getattr(user, 'is_authenticated', False):
+        return user
+    return None
+
+
 class Lancamentos(models.Model):
     id_adesao = models.ForeignKey(
         Adesao,
@@ -237,10 +247,54 @@ class Lancamentos(models.Model):
     def get_absolute_url(self):
         return reverse('lancamentos:detail', kwargs={'pk': self.pk})
     
+    # Campos ignorados na verificação de imutabilidade
+    _CAMPOS_FIXOS = ('id', 'data_criacao')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._registrar_estado()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        # Só os campos relidos: o acesso a um campo adiado também passa por
+        # aqui e não pode apagar alterações ainda não salvas dos demais
+        self._registrar_estado(fields)
+
+    def _registrar_estado(self, fields=None):
+        """Guarda os valores atuais dos campos carregados (estado conhecido do banco)."""
+        carregados = self.__dict__
+        estado = {
+            field.attname: carregados[field.attname]
+            for field in self._meta.concrete_fields
+            if field.attname in carregados
+            and (fields is None or field.name in fields or field.attname in fields)
+        }
+        if fields is not None and getattr(self, '_estado_original', None) is not None:
+            self._estado_original.update(estado)
+        else:
+            self._estado_original = estado
+
+    def _estado_banco(self):
+        """Estado gravado do lançamento: o snapshot de ``from_db`` ou, para
+        instâncias montadas à mão com ``pk``, a linha lida do banco."""
+        estado = getattr(self, '_estado_original', None)
+        if estado is not None:
+            return estado
+        linha = type(self).objects.filter(pk=self.pk).values(
+            *(field.attname for field in self._meta.concrete_fields)
+        ).first()
+        return linha or {}
+
     def save(self, *args, **kwargs):
         """
         Sobrescreve o método save para gerenciar a atualização do saldo
         sempre que um novo lançamento for adicionado.
+
+        Em atualizações, compara com o estado carregado do banco (sem novo
+        SELECT) e grava só as colunas alteradas. Sem alterações, o ``save``
+        continua completo (UPDATE, sinais e histórico), como antes.
         """
         from django.db import transaction
         from django.core.exceptions import ValidationError
@@ -252,81 +306,109 @@ class Lancamentos(models.Model):
 
         # Verifica se é um novo lançamento e captura estado anterior
         is_novo = not self.pk
-        original_aprovado = False
-        if not is_novo:
-            try:
-                original = type(self).objects.get(pk=self.pk)
-                original_aprovado = bool(original.aprovado)
-            except type(self).DoesNotExist:
-                original_aprovado = False
+        original = {} if is_novo else self._estado_banco()
+        original_aprovado = bool(original.get('aprovado', False))
 
         # Regras de aprovação antes de salvar: auto-definir/limpar data
-        if self.aprovado and self.data_aprovacao is None:
+        data_automatica = self.aprovado and self.data_aprovacao is None
+        if data_automatica:
             self.data_aprovacao = timezone.now()
         if not self.aprovado:
             self.data_aprovacao = None
 
         # Imutabilidade: após criação, apenas campos de aprovação podem mudar
-        if not is_novo:
+        if not is_novo and original:
             allowed = {'aprovado', 'data_aprovacao', 'observacao_aprovacao'}
             changed = set()
-            for field in self._meta.fields:
-                fname = field.name
-                if fname in ('id', 'pk', 'data_criacao'):
+            for field in self._meta.concrete_fields:
+                if field.name in self._CAMPOS_FIXOS or field.attname not in original:
                     continue
-                old_val = getattr(original, fname)
-                new_val = getattr(self, fname)
-                if old_val != new_val:
-                    changed.add(fname)
+                if field.attname not in self.__dict__:
+                    continue  # adiado e não tocado: não mudou
+                if original[field.attname] != getattr(self, field.attname):
+                    changed.add(field.name)
             if changed - allowed:
                 raise ValidationError('Após a criação, apenas os campos de aprovação podem ser editados.')
             # Bloquear mudança de status após aprovado
             if original_aprovado and self.aprovado is not True:
                 raise ValidationError('Não é permitido alterar o status após aprovado.')
+            # update_fields vazio faria o Django pular o save inteiro
+            if changed and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+                kwargs['update_fields'] = changed
+
+        # Atualiza o saldo apenas quando aprovação ocorre
+        should_update_saldo = False
+        if is_novo and self.aprovado:
+            should_update_saldo = True
+        elif (not is_novo) and (not original_aprovado) and self.aprovado:
+            should_update_saldo = True
 
         with transaction.atomic():
+            if should_update_saldo:
+                # Adesão travada antes de datar a aprovação: com aprovações
+                # simultâneas, a ordem de data_aprovacao (razão de saldos) é a
+                # ordem em que os saldos são aplicados
+                list(Adesao.objects.select_for_update().filter(pk=self.id_adesao_id).values_list('pk'))
+                if data_automatica:
+                    self.data_aprovacao = timezone.now()
+
             # Salva o lançamento
             super().save(*args, **kwargs)
-            
-            # Atualiza o saldo apenas quando aprovação ocorre
-            should_update_saldo = False
-            if is_novo and self.aprovado:
-                should_update_saldo = True
-            elif (not is_novo) and (not original_aprovado) and self.aprovado:
-                should_update_saldo = True
 
             if should_update_saldo:
                 # Validação final do saldo em caso de débito já foi feita em clean(); ainda assim garantir coerência
                 self.atualizar_saldo_adesao()
-                
+
+        self._registrar_estado()
         return self
     
     def atualizar_saldo_adesao(self):
         """
         Atualiza o saldo atual da adesão com base no valor e sinal deste lançamento.
         Também registra o saldo restante no próprio lançamento para referência histórica.
-        Esta função deve ser chamada dentro de um bloco de transação para garantir a atomicidade.
+
+        A linha da adesão fica travada (``select_for_update``) até o fim da
+        transação e o saldo é alterado no banco com ``F('saldo_atual') ± valor``:
+        aprovações e importações simultâneas na mesma adesão entram em fila em
+        vez de sobrescrever o saldo umas das outras. Grava também o checkpoint
+        de saldo, quando devido. Retorna o novo saldo.
         """
-        adesao = self.id_adesao
-        if adesao.saldo_atual is None:
-            adesao.saldo_atual = adesao.saldo or 0
+        from django.db import transaction
+        from django.db.models import F, Value
+        from django.db.models.functions import Coalesce, Greatest
+        from .saldos import registrar_checkpoints
+
         try:
             valor_numerico = float(self.valor or 0)
         except (TypeError, ValueError):
             valor_numerico = 0
-        # Atualiza o saldo conforme o sinal do lançamento (protegendo negativo em débito)
-        if self.sinal == '-':
-            novo = adesao.saldo_atual - valor_numerico
-            adesao.saldo_atual = novo if novo >= 0 else 0
-        else:
-            adesao.saldo_atual = (adesao.saldo_atual or 0) + valor_numerico
-        
-        # Registra o saldo restante no lançamento (registro histórico)
-        self.saldo_restante = adesao.saldo_atual
-        Lancamentos.objects.filter(pk=self.pk).update(saldo_restante=self.saldo_restante)
-            
-        # Salva a adesão com o novo saldo
-        adesao.save(update_fields=['saldo_atual'])
+
+        # Sem savepoint: dentro do save() já há transação; chamada avulsa abre uma
+        with transaction.atomic(savepoint=False):
+            adesao = Adesao.objects.select_for_update().get(pk=self.id_adesao_id)
+            atual = Coalesce(F('saldo_atual'), F('saldo'), Value(0.0))
+            # Débito não deixa o saldo negativo
+            if self.sinal == '-':
+                novo = Greatest(atual - Value(valor_numerico), Value(0.0))
+            else:
+                novo = atual + Value(valor_numerico)
+            Adesao.objects.filter(pk=adesao.pk).update(saldo_atual=novo)
+            # Com a linha travada, o valor gravado é o lido acima ± valor (mesma
+            # conta do UPDATE); evita reler a adesão
+            saldo = adesao.saldo_atual if adesao.saldo_atual is not None else (adesao.saldo or 0)
+            adesao.saldo_atual = max(saldo - valor_numerico, 0) if self.sinal == '-' else saldo + valor_numerico
+
+            # Registra o saldo restante no lançamento (registro histórico)
+            self.saldo_restante = adesao.saldo_atual
+            Lancamentos.objects.filter(pk=self.pk).update(saldo_restante=self.saldo_restante)
+
+            # update() não dispara o simple_history: registra a alteração da adesão
+            Adesao.historico.bulk_history_create([adesao], update=True, default_user=_usuario_historico())
+            registrar_checkpoints(adesao.pk, saldo, [self])
+
+        if self._meta.get_field('id_adesao').is_cached(self):
+            self.id_adesao.saldo_atual = adesao.saldo_atual
+        return adesao.saldo_atual
 
     # Audit trail
     historico = HistoricalRecords()
@@ -335,6 +417,55 @@ class Lancamentos(models.Model):
         unique_together = (
             ('id_adesao', 'perdcomp_declaracao', 'item'),
         )
+        indexes = [
+            # Ordem do razão de saldos (aprovação) dentro de cada adesão
+            models.Index(fields=['id_adesao', 'data_aprovacao', 'id']),
+        ]
+
+
+class SaldoCheckpoint(models.Model):
+    """Saldo de uma adesão logo após um lançamento aprovado (ponto do razão).
+
+    Gravado ao fechar cada mês (no último lançamento aprovado do mês) e a cada
+    ``SALDO_CHECKPOINT_INTERVALO`` lançamentos, à medida que as aprovações
+    acontecem. A posição no razão é ``(data_aprovacao, lancamento_id)``; o saldo
+    numa data é o do último checkpoint até ela mais os lançamentos seguintes
+    (``lancamentos.saldos.saldo_em``).
+    """
+
+    MENSAL = 'mensal'
+    INTERVALO = 'intervalo'
+    motivo_options = [
+        (MENSAL, 'Fechamento do mês'),
+        (INTERVALO, 'Intervalo de lançamentos'),
+    ]
+
+    adesao = models.ForeignKey(
+        Adesao,
+        on_delete=models.CASCADE,
+        related_name='checkpoints_saldo',
+        verbose_name='Adesão'
+    )
+    lancamento = models.OneToOneField(
+        Lancamentos,
+        on_delete=models.CASCADE,
+        related_name='checkpoint_saldo',
+        verbose_name='Último lançamento incluído'
+    )
+    data_aprovacao = models.DateTimeField(verbose_name='Data de aprovação do lançamento')
+    saldo = models.FloatField(verbose_name='Saldo')
+    motivo = models.CharField(max_length=10, choices=motivo_options, verbose_name='Motivo')
+    criado_em = models.DateTimeField(auto_now_add=True, verbose_name='Criado em')
+
+    def __str__(self):
+        return f"Adesão {self.adesao_id} em {self.data_aprovacao}: {self.saldo}"
+
+    class Meta:
+        verbose_name = 'Checkpoint de saldo'
+        verbose_name_plural = 'Checkpoints de saldo'
+        indexes = [
+            models.Index(fields=['adesao', 'data_aprovacao', 'lancamento']),
+        ]
 
 class Anexos(models.Model):
     id_lancamento = models.ForeignKey(
@@ -383,8 +514,16 @@ class Anexos(models.Model):
         verbose_name='Data de Upload'
     )
 
+    # Texto ainda não (re)indexado para a busca: o import_worker extrai e limpa
+    indexacao_pendente = models.BooleanField(
+        default=False,
+        editable=False,
+        db_index=True,
+        verbose_name='Indexação pendente'
+    )
+
     # Audit trail
-    historico = HistoricalRecords()
+    historico = HistoricalRecords(excluded_fields=['indexacao_pendente'])
     
     def __str__(self):
         return self.nome_anexo or f"Anexo {self.id}" or "Anexo sem nome"
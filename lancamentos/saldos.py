@@ -0,0 +1,394 @@
+"""Recálculo em lote do razão de saldos (``saldo_restante`` e ``Adesao.saldo_atual``).
+
+``Lancamentos.save`` mantém os saldos um lançamento por vez; aqui eles são
+recalculados para todas as adesões numa única consulta, a partir de
+``Adesao.saldo`` e dos lançamentos aprovados em ordem de aprovação
+(``data_aprovacao``, ``id``).
+
+O débito não deixa o saldo negativo (``max(saldo - valor, 0)``), então o saldo
+não é só a soma acumulada: com ``P`` = saldo inicial + soma acumulada dos
+valores com sinal, o saldo após o lançamento ``n`` é
+``P[n] - min(0, P[1..n])``, isto é, a soma acumulada menos o quanto ela já
+desceu abaixo de zero (vale para saldo inicial não negativo, como é o valor do
+crédito). São duas funções de janela (``SUM`` e depois ``MIN``
+sobre a soma), em SQL padrão, que rodam igual no SQLite e no Postgres.
+
+O saldo numa data (``saldo_em``/``saldos_em``) parte do ``SaldoCheckpoint``
+mais recente até ela, mantido a cada aprovação por ``registrar_checkpoints``,
+e aplica a mesma conta só aos lançamentos aprovados depois dele.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timezone as dt_timezone
+from itertools import groupby
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Q, Window
+from django.utils import timezone
+
+from adesao.models import Adesao
+
+from .models import Lancamentos, SaldoCheckpoint
+
+# Diferença a partir da qual um saldo gravado é considerado divergente (meio centavo)
+TOLERANCIA = 0.005
+
+
+@dataclass
+class Divergencias:
+    """Resultado do recálculo: contagens e as adesões com maior diferença."""
+    lancamentos: int = 0
+    adesoes: int = 0
+    # (adesao_id, saldo_atual gravado, saldo recalculado)
+    maiores: List[Tuple[int, Optional[float], float]] = field(default_factory=list)
+    corrigido: bool = False
+
+    def __bool__(self):
+        return bool(self.lancamentos or self.adesoes)
+
+
+_TEMP = 'tmp_saldos_recalculados'
+
+
+def _sql_recalculo(adesao_id: Optional[int]) -> Tuple[str, list]:
+    # Uma linha por lançamento aprovado cujo saldo_restante diverge, mais a
+    # última de cada adesão (``ultimo``), que dá o saldo_atual recalculado
+    lanc = Lancamentos._meta.db_table
+    ades = Adesao._meta.db_table
+    filtro, params = '', []
+    if adesao_id is not None:
+        filtro, params = ' AND id_adesao_id = %s', [adesao_id]
+    ordem = 'PARTITION BY id_adesao_id ORDER BY data_aprovacao, id'
+    sql = f"""
+        WITH acumulados AS (
+            SELECT id, id_adesao_id, data_aprovacao, saldo_restante,
+                   SUM({_delta()}) OVER ({ordem} ROWS UNBOUNDED PRECEDING) AS soma,
+                   CASE WHEN LEAD(id) OVER ({ordem}) IS NULL THEN 1 ELSE 0 END AS ultimo
+            FROM {lanc}
+            WHERE aprovado{filtro}
+        ), pisos AS (
+            SELECT id, id_adesao_id, saldo_restante, soma, ultimo,
+                   MIN(soma) OVER ({ordem} ROWS UNBOUNDED PRECEDING) AS minimo
+            FROM acumulados
+        ), saldos AS (
+            SELECT p.id, p.id_adesao_id AS adesao_id, p.saldo_restante, p.ultimo,
+                   COALESCE(a.saldo, 0) + p.soma - CASE
+                       WHEN COALESCE(a.saldo, 0) + p.minimo < 0 THEN COALESCE(a.saldo, 0) + p.minimo
+                       ELSE 0
+                   END AS saldo
+            FROM pisos p JOIN {ades} a ON a.id = p.id_adesao_id
+        )
+        SELECT id, adesao_id, ultimo, saldo,
+               CASE WHEN {_diverge('saldo_restante', 'saldo')} THEN 1 ELSE 0 END AS diverge
+        FROM saldos
+        WHERE ultimo = 1 OR {_diverge('saldo_restante', 'saldo')}"""
+    return sql, params
+
+
+def _delta(tabela: str = '') -> str:
+    # Valor do lançamento com sinal (débito negativo)
+    prefixo = f"{tabela}." if tabela else ''
+    return (
+        f"CASE WHEN {prefixo}sinal = '-' THEN -COALESCE({prefixo}valor, 0) "
+        f"ELSE COALESCE({prefixo}valor, 0) END"
+    )
+
+
+def _diverge(gravado: str, calculado: str) -> str:
+    # Condição SQL (um parâmetro: a tolerância) de saldo gravado divergente
+    return f"({gravado} IS NULL OR ABS({gravado} - {calculado}) > %s)"
+
+
+def recalcular(adesao_id: Optional[int] = None, tolerancia: float = TOLERANCIA,
+               limite: int = 20, corrigir: bool = False) -> Divergencias:
+    """Recalcula os saldos, compara com os gravados e, com ``corrigir``, grava os divergentes.
+
+    As funções de janela rodam uma única vez, para uma tabela temporária só com
+    as linhas divergentes e a última de cada adesão; contagem, relatório e
+    correção (``UPDATE ... FROM``, SQLite 3.33+ e Postgres) partem dela. Ao
+    corrigir, as adesões ficam travadas até o fim da transação para que nenhuma
+    aprovação entre no meio; as correções não passam pelo ``save()`` e não
+    geram histórico.
+    """
+    lanc = Lancamentos._meta.db_table
+    ades = Adesao._meta.db_table
+    sql, params = _sql_recalculo(adesao_id)
+    escopo, escopo_params = '', []
+    if adesao_id is not None:
+        escopo, escopo_params = ' AND a.id = %s', [adesao_id]
+    # Adesões com saldo_atual divergente (sem lançamento aprovado: o saldo é o valor do crédito)
+    finais = (
+        f"SELECT a.id, a.saldo_atual, COALESCE(t.saldo, COALESCE(a.saldo, 0)) AS saldo "
+        f"FROM {ades} a LEFT JOIN {_TEMP} t ON t.adesao_id = a.id AND t.ultimo = 1 "
+        f"WHERE {_diverge('a.saldo_atual', 'COALESCE(t.saldo, COALESCE(a.saldo, 0))')}{escopo}"
+    )
+    resultado = Divergencias()
+    with transaction.atomic(), connection.cursor() as cursor:
+        if corrigir:
+            travadas = Adesao.objects.select_for_update()
+            if adesao_id is not None:
+                travadas = travadas.filter(pk=adesao_id)
+            list(travadas.values_list('pk', flat=True))
+        cursor.execute(f"DROP TABLE IF EXISTS {_TEMP}")
+        cursor.execute(f"CREATE TEMPORARY TABLE {_TEMP} AS {sql}", params + [tolerancia, tolerancia])
+        try:
+            cursor.execute(f"SELECT COUNT(*) FROM {_TEMP} WHERE diverge = 1")
+            resultado.lancamentos = cursor.fetchone()[0]
+            cursor.execute(f"SELECT COUNT(*) FROM ({finais}) f", [tolerancia] + escopo_params)
+            resultado.adesoes = cursor.fetchone()[0]
+            if resultado.adesoes and limite:
+                cursor.execute(
+                    f"{finais} ORDER BY ABS(COALESCE(a.saldo_atual, 0) - "
+                    f"COALESCE(t.saldo, COALESCE(a.saldo, 0))) DESC, a.id LIMIT %s",
+                    [tolerancia] + escopo_params + [limite],
+                )
+                resultado.maiores = list(cursor.fetchall())
+            if corrigir and resultado:
+                cursor.execute(
+                    f"UPDATE {lanc} SET saldo_restante = t.saldo FROM {_TEMP} t "
+                    f"WHERE {lanc}.id = t.id AND t.diverge = 1"
+                )
+                cursor.execute(
+                    f"UPDATE {ades} SET saldo_atual = f.saldo FROM ({finais}) f WHERE {ades}.id = f.id",
+                    [tolerancia] + escopo_params,
+                )
+                resultado.corrigido = True
+        finally:
+            cursor.execute(f"DROP TABLE IF EXISTS {_TEMP}")
+    return resultado
+
+
+def _intervalo() -> int:
+    return int(getattr(settings, 'SALDO_CHECKPOINT_INTERVALO', 100) or 0)
+
+
+def _mes(data: datetime, fuso) -> Tuple[int, int]:
+    local = data.astimezone(fuso)
+    return local.year, local.month
+
+
+def _pontos(adesao_id: int, entradas: Iterable[Tuple[int, datetime, float]],
+            anterior: Optional[Tuple[int, datetime, float]] = None, marcado: bool = False,
+            desde: int = 0, intervalo: int = 0) -> Iterator[SaldoCheckpoint]:
+    """Checkpoints devidos ao percorrer ``entradas`` (id, data_aprovacao, saldo após), em ordem do razão.
+
+    ``anterior`` é a entrada logo antes delas, ``marcado`` diz se ela já tem
+    checkpoint e ``desde`` quantas entradas vieram depois do último. O mês é
+    fechado no último lançamento aprovado nele, quando chega o primeiro do mês
+    seguinte; o do intervalo, no N-ésimo lançamento após o checkpoint anterior.
+    """
+    # Fuso resolvido uma vez: timezone.localtime() por linha domina a reconstrução
+    fuso = timezone.get_current_timezone()
+    mes_anterior = _mes(anterior[1], fuso) if anterior is not None else None
+    for pk, data, saldo in entradas:
+        mes = _mes(data, fuso)
+        if anterior is not None and not marcado and mes_anterior != mes:
+            yield SaldoCheckpoint(
+                adesao_id=adesao_id, lancamento_id=anterior[0], data_aprovacao=anterior[1],
+                saldo=anterior[2], motivo=SaldoCheckpoint.MENSAL,
+            )
+            desde = 0
+        desde += 1
+        marcado = bool(intervalo) and desde >= intervalo
+        if marcado:
+            yield SaldoCheckpoint(
+                adesao_id=adesao_id, lancamento_id=pk, data_aprovacao=data,
+                saldo=saldo, motivo=SaldoCheckpoint.INTERVALO,
+            )
+            desde = 0
+        anterior, mes_anterior = (pk, data, saldo), mes
+
+
+def _depois_de(data_aprovacao: datetime, lancamento_id: int) -> Q:
+    # Lançamentos posteriores à posição (data_aprovacao, id) no razão; o ">=" à
+    # parte deixa o índice (adesão, data_aprovacao) delimitar a faixa
+    return Q(data_aprovacao__gte=data_aprovacao) & (
+        Q(data_aprovacao__gt=data_aprovacao) | Q(id__gt=lancamento_id)
+    )
+
+
+def invalidar_checkpoints(adesao_id: int, data_aprovacao: datetime, lancamento_id: int) -> int:
+    """Apaga os checkpoints da adesão na posição ``(data_aprovacao, lancamento_id)`` do razão ou depois dela.
+
+    Usado quando o razão muda antes de checkpoints já gravados (aprovação
+    retroativa, lançamento aprovado excluído). Retorna quantos foram apagados.
+    """
+    apagados, _ = SaldoCheckpoint.objects.filter(adesao_id=adesao_id).filter(
+        Q(lancamento_id=lancamento_id) | _depois_de(data_aprovacao, lancamento_id)
+    ).delete()
+    return apagados
+
+
+def registrar_checkpoints(adesao_id: int, saldo_anterior: float,
+                          aprovados: Sequence[Lancamentos]) -> List[SaldoCheckpoint]:
+    """Grava os checkpoints devidos pelos lançamentos recém-aprovados de uma adesão.
+
+    ``aprovados`` vêm em ordem do razão, já gravados com ``data_aprovacao`` e
+    ``saldo_restante``; ``saldo_anterior`` é o saldo da adesão antes deles.
+    Chamado com a adesão travada (``atualizar_saldo_adesao`` e os serviços em
+    lote). Custa duas consultas curtas no índice: o último checkpoint e o
+    lançamento aprovado mais recente, com quantos vieram depois do checkpoint
+    (em regime, no máximo ``SALDO_CHECKPOINT_INTERVALO``).
+
+    Se a aprovação cair antes de checkpoints já gravados (``data_aprovacao``
+    retroativa), eles deixam de valer e são apagados; ``recompute_saldos
+    --checkpoints`` os recria.
+    """
+    aprovados = [lanc for lanc in aprovados if lanc.data_aprovacao is not None]
+    if not aprovados:
+        return []
+    intervalo = _intervalo()
+    primeiro = aprovados[0]
+    checkpoints = SaldoCheckpoint.objects.filter(adesao_id=adesao_id)
+    ultimo = checkpoints.order_by('-data_aprovacao', '-lancamento_id').values_list(
+        'data_aprovacao', 'lancamento_id'
+    ).first()
+    if ultimo is not None and ultimo >= (primeiro.data_aprovacao, primeiro.pk):
+        invalidar_checkpoints(adesao_id, primeiro.data_aprovacao, primeiro.pk)
+        return []
+
+    # Aprovados entre o último checkpoint e este lote: o mais recente e quantos são
+    posteriores = Lancamentos.objects.filter(
+        id_adesao_id=adesao_id, aprovado=True, data_aprovacao__isnull=False,
+    ).exclude(pk__in=[lanc.pk for lanc in aprovados])
+    if ultimo is not None:
+        posteriores = posteriores.filter(_depois_de(*ultimo))
+    recente = posteriores.annotate(quantidade=Window(Count('id'))).order_by(
+        '-data_aprovacao', '-id'
+    ).values_list('pk', 'data_aprovacao', 'quantidade').first()
+    desde = 0
+    if recente is not None:
+        anterior, marcado = (recente[0], recente[1], saldo_anterior), False
+        desde = recente[2]
+    elif ultimo is not None:
+        anterior, marcado = (ultimo[1], ultimo[0], saldo_anterior), True
+    else:
+        anterior, marcado = None, False
+
+    novos = list(_pontos(
+        adesao_id,
+        ((lanc.pk, lanc.data_aprovacao, lanc.saldo_restante) for lanc in aprovados),
+        anterior, marcado, desde, intervalo,
+    ))
+    if novos:
+        SaldoCheckpoint.objects.bulk_create(novos)
+    return novos
+
+
+def _saldos_apos(saldo: float, linhas) -> Iterator[Tuple[int, datetime, float]]:
+    # (id, data_aprovacao, saldo após) de linhas (adesao, id, data_aprovacao, sinal, valor) em ordem do razão
+    for _, pk, data, sinal, valor in linhas:
+        saldo = max(saldo - (valor or 0), 0) if sinal == '-' else saldo + (valor or 0)
+        yield pk, data, saldo
+
+
+def reconstruir_checkpoints(adesao_id: Optional[int] = None) -> int:
+    """Apaga e recria os checkpoints a partir dos lançamentos aprovados.
+
+    O saldo de cada lançamento é recalculado desde ``Adesao.saldo`` (mesma conta
+    do recálculo), sem confiar no ``saldo_restante`` gravado. Retorna quantos
+    checkpoints foram criados.
+    """
+    intervalo = _intervalo()
+    adesoes = Adesao.objects.all()
+    lancamentos = Lancamentos.objects.filter(aprovado=True, data_aprovacao__isnull=False)
+    if adesao_id is not None:
+        adesoes = adesoes.filter(pk=adesao_id)
+        lancamentos = lancamentos.filter(id_adesao_id=adesao_id)
+
+    criados = 0
+    with transaction.atomic():
+        iniciais = dict(adesoes.select_for_update().values_list('pk', 'saldo'))
+        SaldoCheckpoint.objects.filter(adesao_id__in=adesoes.values('pk')).delete()
+        linhas = lancamentos.order_by('id_adesao_id', 'data_aprovacao', 'id').values_list(
+            'id_adesao_id', 'id', 'data_aprovacao', 'sinal', 'valor'
+        ).iterator(chunk_size=5000)
+        lote: List[SaldoCheckpoint] = []
+        for pk, grupo in groupby(linhas, key=lambda linha: linha[0]):
+            lote.extend(_pontos(pk, _saldos_apos(iniciais.get(pk) or 0, grupo), intervalo=intervalo))
+            if len(lote) >= 1000:
+                SaldoCheckpoint.objects.bulk_create(lote)
+                criados += len(lote)
+                lote = []
+        if lote:
+            SaldoCheckpoint.objects.bulk_create(lote)
+            criados += len(lote)
+    return criados
+
+
+def _limite(data: Union[date, datetime]) -> datetime:
+    # Uma data vale até o fim do dia (fuso local); datetime sem fuso, no fuso local
+    if isinstance(data, datetime):
+        return data if timezone.is_aware(data) else timezone.make_aware(data)
+    return timezone.make_aware(datetime.combine(data, time.max))
+
+
+def saldos_em(adesoes: Optional[Iterable[Union[Adesao, int]]], data: Union[date, datetime]) -> Dict[int, float]:
+    """Saldo de cada adesão ao fim de ``data`` (ou no instante, se for datetime), numa única consulta.
+
+    Para cada adesão, o último checkpoint até a data (busca no índice
+    ``adesao, data_aprovacao``) ou, sem checkpoint, ``Adesao.saldo``; sobre ele,
+    os lançamentos aprovados depois do checkpoint e até a data, com o piso em
+    zero da mesma forma que no recálculo. ``adesoes=None`` consulta todas.
+    Retorna ``{adesao_id: saldo}``.
+    """
+    lanc = Lancamentos._meta.db_table
+    ades = Adesao._meta.db_table
+    pontos = SaldoCheckpoint._meta.db_table
+    limite = connection.ops.adapt_datetimefield_value(_limite(data))
+    # Sem checkpoint, o razão começa no primeiro lançamento; um limite inferior
+    # explícito (em vez de "OR sem checkpoint") deixa o índice delimitar a faixa
+    inicio = connection.ops.adapt_datetimefield_value(datetime(1, 1, 1, tzinfo=dt_timezone.utc))
+    filtro, ids = '', []
+    if adesoes is not None:
+        ids = [getattr(adesao, 'pk', adesao) for adesao in adesoes]
+        if not ids:
+            return {}
+        filtro = f"WHERE a.id IN ({', '.join(['%s'] * len(ids))})"
+    sql = f"""
+        WITH partidas AS (
+            SELECT a.id AS adesao_id, COALESCE(c.data_aprovacao, %s) AS desde, c.lancamento_id,
+                   COALESCE(c.saldo, a.saldo, 0) AS inicial
+            FROM {ades} a
+            LEFT JOIN {pontos} c ON c.id = (
+                SELECT c2.id FROM {pontos} c2
+                WHERE c2.adesao_id = a.id AND c2.data_aprovacao <= %s
+                ORDER BY c2.data_aprovacao DESC, c2.lancamento_id DESC
+                LIMIT 1
+            )
+            {filtro}
+        ), acumulados AS (
+            SELECT p.adesao_id, p.inicial, {_delta('l')} AS delta,
+                   SUM({_delta('l')}) OVER (
+                       PARTITION BY p.adesao_id ORDER BY l.data_aprovacao, l.id ROWS UNBOUNDED PRECEDING
+                   ) AS soma
+            FROM partidas p
+            LEFT JOIN {lanc} l ON l.id_adesao_id = p.adesao_id AND l.aprovado
+                AND l.data_aprovacao >= p.desde AND l.data_aprovacao <= %s
+                AND (p.lancamento_id IS NULL OR l.data_aprovacao > p.desde OR l.id > p.lancamento_id)
+        )
+        SELECT adesao_id, inicial + SUM(delta) - CASE
+                   WHEN inicial + MIN(soma) < 0 THEN inicial + MIN(soma)
+                   ELSE 0
+               END
+        FROM acumulados
+        GROUP BY adesao_id, inicial"""
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [inicio, limite] + ids + [limite])
+        return {pk: saldo for pk, saldo in cursor.fetchall()}
+
+
+def saldo_em(adesao: Union[Adesao, int], data: Union[date, datetime]) -> float:
+    """Saldo da adesão ao fim de ``data`` (ver ``saldos_em``).
+
+    Lê um checkpoint pelo índice e no máximo os lançamentos aprovados desde
+    ele (um mês ou ``SALDO_CHECKPOINT_INTERVALO``, o que vier antes).
+    """
+    pk = getattr(adesao, 'pk', adesao)
+    saldos = saldos_em([pk], data)
+    if pk not in saldos:
+        raise Adesao.DoesNotExist(f"Adesão {pk} não encontrada.")
+    return saldos[pk]
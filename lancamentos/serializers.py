@@ -14,3 +14,10 @@ class LancamentoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Lancamentos
         fields = '__all__'
+
+
+class AprovacaoLoteSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=1000,
+    )
+    observacao = serializers.CharField(required=False, allow_blank=True)
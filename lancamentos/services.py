@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from simple_history.utils import bulk_create_with_history, bulk_update_with_history
+
+from adesao.models import Adesao
+
+from .models import Lancamentos
+from .saldos import registrar_checkpoints
+
+
+def criar_lancamentos_em_lote(
+    adesao,
+    lancamentos: Iterable[Lancamentos],
+    usuario=None,
+) -> Tuple[List[Lancamentos], List[Lancamentos]]:
+    """Insere lançamentos novos de uma adesão com um número fixo de queries.
+
+    Equivale a ``save()`` em cada lançamento, na ordem recebida: preenche
+    ``perdcomp_inicial`` e ``data_aprovacao``, calcula em memória o
+    ``saldo_restante`` dos aprovados (débito não deixa o saldo negativo) a partir
+    do saldo relido com a adesão travada e grava o ``saldo_atual`` uma única vez,
+    junto com os checkpoints de saldo devidos. O histórico (simple_history) é
+    criado em lote, com ``usuario`` como autor.
+
+    Lançamentos cuja chave ``(perdcomp_declaracao, item)`` já existe na adesão,
+    ou se repete na própria lista, não são gravados. Retorna
+    ``(criados, ignorados)``.
+    """
+    lancamentos = list(lancamentos)
+    if not lancamentos:
+        return [], []
+
+    with transaction.atomic():
+        # Saldo lido com a linha da adesão travada até o commit: outra importação
+        # ou aprovação simultânea na mesma adesão espera em vez de ser sobrescrita
+        travada = type(adesao).objects.select_for_update().only('saldo', 'saldo_atual').get(pk=adesao.pk)
+        adesao.saldo, adesao.saldo_atual = travada.saldo, travada.saldo_atual
+
+        declaracoes = {lanc.perdcomp_declaracao for lanc in lancamentos if lanc.perdcomp_declaracao}
+        existentes = set()
+        if declaracoes:
+            existentes = set(
+                Lancamentos.objects.filter(id_adesao=adesao, perdcomp_declaracao__in=declaracoes)
+                .values_list('perdcomp_declaracao', 'item')
+            )
+
+        saldo = adesao.saldo_atual if adesao.saldo_atual is not None else (adesao.saldo or 0)
+        saldo_inicial = saldo
+        saldo_alterado = False
+        agora = timezone.now()
+        criados: List[Lancamentos] = []
+        ignorados: List[Lancamentos] = []
+        for lanc in lancamentos:
+            chave = (lanc.perdcomp_declaracao, lanc.item)
+            if lanc.perdcomp_declaracao and lanc.item:
+                if chave in existentes:
+                    ignorados.append(lanc)
+                    continue
+                existentes.add(chave)
+
+            lanc.id_adesao = adesao
+            if not lanc.perdcomp_inicial:
+                lanc.perdcomp_inicial = adesao.perdcomp
+            if lanc.aprovado:
+                if lanc.data_aprovacao is None:
+                    lanc.data_aprovacao = agora
+                try:
+                    valor = float(lanc.valor or 0)
+                except (TypeError, ValueError):
+                    valor = 0
+                if lanc.sinal == '-':
+                    saldo = max(saldo - valor, 0)
+                else:
+                    saldo = saldo + valor
+                lanc.saldo_restante = saldo
+                saldo_alterado = True
+            else:
+                lanc.data_aprovacao = None
+            criados.append(lanc)
+
+        if criados:
+            criados = bulk_create_with_history(criados, Lancamentos, default_user=usuario)
+        if saldo_alterado:
+            adesao.saldo_atual = saldo
+            adesao.save(update_fields=['saldo_atual'])
+            registrar_checkpoints(adesao.pk, saldo_inicial, [lanc for lanc in criados if lanc.aprovado])
+
+    return criados, ignorados
+
+
+def aprovar_lancamentos_em_lote(
+    ids: Iterable[int],
+    usuario=None,
+    observacao: Optional[str] = None,
+) -> Tuple[List[Lancamentos], List[int]]:
+    """Aprova vários lançamentos pendentes de uma vez, com um número fixo de queries.
+
+    Equivale a aprovar cada um pela ``LancamentoApprovalUpdateView``: os
+    lançamentos são agrupados por adesão e, em cada uma, percorridos em ordem de
+    ``id`` (todos recebem a mesma ``data_aprovacao``, e é essa a ordem em que o
+    razão os aplica). A regra de ``clean()`` vale para o lote inteiro: se algum
+    débito deixar o saldo negativo, considerando os lançamentos anteriores do
+    próprio lote, levanta ``ValidationError`` com um item por lançamento e nada é
+    gravado.
+
+    Adesões e lançamentos ficam travados até o commit (na mesma ordem do
+    ``save()``: adesão e depois lançamento). Os lançamentos são gravados com um
+    ``bulk_update``, o ``saldo_atual`` uma vez por adesão, e o histórico de ambos
+    é criado em lote, com ``usuario`` como autor; os checkpoints de saldo
+    devidos são gravados por adesão.
+
+    Ids inexistentes ou de lançamentos já aprovados não são alterados. Retorna
+    ``(aprovados, ignorados)``: os lançamentos aprovados, com ``saldo_restante``
+    preenchido, e os ids ignorados.
+    """
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return [], []
+
+    with transaction.atomic():
+        adesoes: Dict[int, Adesao] = {
+            adesao.pk: adesao
+            for adesao in Adesao.objects.select_for_update()
+            .filter(pk__in=Lancamentos.objects.filter(pk__in=ids, aprovado=False).values('id_adesao_id'))
+            .order_by('pk')
+        }
+        # Relidos com as adesões já travadas: uma aprovação simultânea pode ter
+        # aprovado algum deles enquanto este lote esperava
+        pendentes = list(
+            Lancamentos.objects.select_for_update()
+            .filter(pk__in=ids, aprovado=False, id_adesao_id__in=list(adesoes))
+            .order_by('pk')
+        )
+        encontrados = {lanc.pk for lanc in pendentes}
+        ignorados = [pk for pk in ids if pk not in encontrados]
+        if not pendentes:
+            return [], ignorados
+        saldos = {
+            pk: adesao.saldo_atual if adesao.saldo_atual is not None else (adesao.saldo or 0)
+            for pk, adesao in adesoes.items()
+        }
+
+        agora = timezone.now()
+        erros = []
+        for lanc in pendentes:
+            try:
+                valor = float(lanc.valor or 0)
+            except (TypeError, ValueError):
+                erros.append(f"Lançamento {lanc.pk}: valor inválido.")
+                continue
+            saldo = saldos[lanc.id_adesao_id]
+            if lanc.sinal == '-':
+                if saldo - valor < 0:
+                    erros.append(
+                        f"Lançamento {lanc.pk}: o saldo não pode ficar negativo. "
+                        f"Saldo antes do lançamento: R$ {saldo}, Valor do débito: R$ {valor}"
+                    )
+                saldo = max(saldo - valor, 0.0)
+            else:
+                saldo = saldo + valor
+            saldos[lanc.id_adesao_id] = saldo
+
+            lanc.aprovado = True
+            lanc.data_aprovacao = agora
+            if observacao:
+                lanc.observacao_aprovacao = observacao
+            lanc.saldo_restante = saldo
+            lanc.id_adesao = adesoes[lanc.id_adesao_id]
+        if erros:
+            raise ValidationError(erros)
+
+        campos = ['aprovado', 'data_aprovacao', 'saldo_restante']
+        if observacao:
+            campos.append('observacao_aprovacao')
+        bulk_update_with_history(pendentes, Lancamentos, campos, default_user=usuario)
+
+        anteriores = {pk: adesao.saldo_atual for pk, adesao in adesoes.items()}
+        for pk, adesao in adesoes.items():
+            adesao.saldo_atual = saldos[pk]
+        bulk_update_with_history(list(adesoes.values()), Adesao, ['saldo_atual'], default_user=usuario)
+        for pk, adesao in adesoes.items():
+            saldo = anteriores[pk] if anteriores[pk] is not None else (adesao.saldo or 0)
+            registrar_checkpoints(pk, saldo, [lanc for lanc in pendentes if lanc.id_adesao_id == pk])
+
+    for lanc in pendentes:
+        lanc._registrar_estado()
+    return pendentes, ignorados
@@ -0,0 +1,29 @@
+from django.db.models.signals import post_delete, pre_save
+from django.dispatch import receiver
+
+from .models import Anexos, Lancamentos
+
+
+@receiver(pre_save, sender=Anexos)
+def marcar_anexo_para_indexacao(sender, instance, update_fields=None, **kwargs):
+    """Marca o anexo para a busca textual quando o arquivo muda; o ``import_worker`` extrai o texto fora da requisição.
+
+    Anexo novo só entra se for PDF; um arquivo trocado sempre entra (o texto
+    antigo sai do índice se o novo não for PDF). Gravado no próprio ``save``.
+    """
+    if update_fields is not None and 'arquivo' not in update_fields:
+        return
+    if instance._state.adding:
+        instance.indexacao_pendente = (instance.arquivo.name or '').lower().endswith('.pdf')
+    elif instance.arquivo and not instance.arquivo._committed:
+        # Upload ainda não gravado: o FileField salva o arquivo depois deste sinal
+        instance.indexacao_pendente = True
+
+
+@receiver(post_delete, sender=Lancamentos)
+def invalidar_checkpoints_do_lancamento(sender, instance, **kwargs):
+    """Lançamento aprovado excluído: os checkpoints de saldo a partir dele deixam de valer."""
+    from .saldos import invalidar_checkpoints
+
+    if instance.aprovado and instance.data_aprovacao is not None:
+        invalidar_checkpoints(instance.id_adesao_id, instance.data_aprovacao, instance.pk)
@@ -1,3 +1,592 @@
-from django.test import TestCase
+import random
+import tempfile
+import threading
+from datetime import date, datetime, time, timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import close_old_connections, connection
+from django.db.models.signals import post_save
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from adesao.models import Adesao
+from clientes_parceiros.models import ClientesParceiros
+from empresas.models import Empresa
+
+from .models import Anexos, Lancamentos, SaldoCheckpoint
+from .saldos import recalcular, reconstruir_checkpoints, saldo_em, saldos_em
+from .services import aprovar_lancamentos_em_lote, criar_lancamentos_em_lote
+
+
+def criar_cliente(cnpj='11222333000181'):
+    empresa = Empresa.objects.create(cnpj=cnpj, razao_social='Empresa Teste')
+    return ClientesParceiros.objects.create(
+        id_company_base=empresa, id_company_vinculada=empresa, nome_referencia='Cliente Teste',
+    )
+
+
+def criar_adesao(cliente=None, saldo=1000.0, perdcomp='TESTE-1'):
+    """Adesão mínima com o valor de crédito informado (cria o cliente, se não vier)."""
+    return Adesao.objects.create(
+        cliente=cliente or criar_cliente(), data_inicio=timezone.now().date(), perdcomp=perdcomp, saldo=saldo,
+    )
+
+
+def novo_lancamento(adesao, valor, sinal='-', item=None, **campos):
+    """Lançamento pendente (não salvo) da adesão."""
+    campos.setdefault('perdcomp_declaracao', 'DECL-1')
+    return Lancamentos(
+        id_adesao=adesao, data_lancamento=timezone.now(), valor=valor, sinal=sinal, item=item, **campos,
+    )
+
+
+class AprovacaoConcorrenteTests(TransactionTestCase):
+    """Aprovações simultâneas na mesma adesão não perdem atualizações de saldo.
+
+    Cada thread usa sua própria conexão, como workers do gunicorn; o saldo só
+    fecha se ``atualizar_saldo_adesao`` trava a adesão e aplica o valor no banco.
+    """
+
+    THREADS = 4
+    LANCAMENTOS = 60
+    SALDO_INICIAL = 100_000.0
+
+    def setUp(self):
+        self.adesao = criar_adesao(saldo=self.SALDO_INICIAL)
+        r = random.Random(0)
+        self.esperado = self.SALDO_INICIAL
+        pendentes = []
+        for i in range(self.LANCAMENTOS):
+            valor = round(r.uniform(1, 500), 2)
+            sinal = '-' if r.random() < 0.8 else '+'
+            self.esperado += valor if sinal == '+' else -valor
+            pendentes.append(novo_lancamento(
+                self.adesao, valor, sinal, item=f'{i:03d}', perdcomp_inicial=self.adesao.perdcomp,
+            ))
+        self.ids = [lanc.pk for lanc in Lancamentos.objects.bulk_create(pendentes)]
+
+    def _aprovar(self, ids, erros):
+        try:
+            for pk in ids:
+                # Como a LancamentoApprovalUpdateView: adesão carregada antes da aprovação
+                lanc = Lancamentos.objects.select_related('id_adesao').get(pk=pk)
+                lanc.aprovado = True
+                lanc.save()
+        except Exception as exc:  # registrado e verificado na thread principal
+            erros.append(exc)
+        finally:
+            close_old_connections()
+            connection.close()
+
+    def test_saldo_final_e_saldos_restantes(self):
+        erros = []
+        workers = [
+            threading.Thread(target=self._aprovar, args=(self.ids[i::self.THREADS], erros))
+            for i in range(self.THREADS)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(erros, [])
+        self.adesao.refresh_from_db()
+        self.assertAlmostEqual(self.adesao.saldo_atual, self.esperado, places=2)
+
+        # Cada aprovação parte do saldo deixado pela anterior: a sequência de
+        # saldo_restante, em ordem de aprovação, é a do razão
+        saldo = self.SALDO_INICIAL
+        aprovados = Lancamentos.objects.filter(pk__in=self.ids, aprovado=True).order_by('data_aprovacao', 'id')
+        self.assertEqual(aprovados.count(), self.LANCAMENTOS)
+        for lanc in aprovados:
+            saldo = max(saldo - lanc.valor, 0) if lanc.sinal == '-' else saldo + lanc.valor
+            self.assertAlmostEqual(lanc.saldo_restante, saldo, places=2, msg=f'lançamento {lanc.pk}')
+
+
+@override_settings(SALDO_CHECKPOINT_INTERVALO=2)
+class AprovacaoEmLoteTests(TestCase):
+    def setUp(self):
+        cliente = criar_cliente()
+        self.adesao_a = criar_adesao(cliente, saldo=100.0, perdcomp='LOTE-A')
+        self.adesao_b = criar_adesao(cliente, saldo=50.0, perdcomp='LOTE-B')
+
+    def _pendentes(self, adesao, itens):
+        return [
+            Lancamentos.objects.create(id_adesao=adesao, data_lancamento=timezone.now(), valor=valor, sinal=sinal,
+                                       perdcomp_declaracao=adesao.perdcomp, item=str(i))
+            for i, (sinal, valor) in enumerate(itens)
+        ]
+
+    def test_debito_que_negativa_o_saldo_cancela_o_lote(self):
+        # O terceiro débito só estoura considerando os anteriores do próprio lote
+        lancs = self._pendentes(self.adesao_a, [('-', 40), ('+', 10), ('-', 30), ('-', 50)])
+        historico_lanc = Lancamentos.historico.count()
+        historico_adesao = Adesao.historico.count()
+
+        with self.assertRaises(ValidationError) as ctx:
+            aprovar_lancamentos_em_lote([lanc.pk for lanc in lancs])
+
+        self.assertEqual(len(ctx.exception.messages), 1)
+        self.assertIn(f'Lançamento {lancs[3].pk}', ctx.exception.messages[0])
+        for lanc in Lancamentos.objects.filter(pk__in=[lanc.pk for lanc in lancs]):
+            self.assertFalse(lanc.aprovado)
+            self.assertIsNone(lanc.data_aprovacao)
+            self.assertIsNone(lanc.saldo_restante)
+        self.adesao_a.refresh_from_db()
+        self.assertEqual(self.adesao_a.saldo_atual, 100.0)
+        self.assertEqual(Lancamentos.historico.count(), historico_lanc)
+        self.assertEqual(Adesao.historico.count(), historico_adesao)
+        self.assertFalse(SaldoCheckpoint.objects.exists())
+
+    def test_ids_desconhecidos_e_ja_aprovados_sao_ignorados(self):
+        aprovado, pendente = self._pendentes(self.adesao_a, [('-', 10), ('-', 20)])
+        aprovado.aprovado = True
+        aprovado.save()
+
+        aprovados, ignorados = aprovar_lancamentos_em_lote([999999, aprovado.pk, pendente.pk])
+
+        self.assertEqual([lanc.pk for lanc in aprovados], [pendente.pk])
+        self.assertEqual(ignorados, [999999, aprovado.pk])
+        pendente.refresh_from_db()
+        self.assertEqual(pendente.saldo_restante, 70.0)
+
+    def test_ordem_por_pk_dentro_de_cada_adesao(self):
+        lancs_a = self._pendentes(self.adesao_a, [('-', 30), ('+', 5), ('-', 75)])
+        lancs_b = self._pendentes(self.adesao_b, [('-', 20), ('-', 10)])
+        ids = [lanc.pk for lanc in lancs_b + lancs_a]
+
+        aprovados, ignorados = aprovar_lancamentos_em_lote(reversed(ids))
+
+        self.assertEqual(ignorados, [])
+        self.assertEqual([lanc.pk for lanc in aprovados], sorted(ids))
+        restantes = dict(Lancamentos.objects.filter(pk__in=ids).values_list('pk', 'saldo_restante'))
+        # A: 100 - 30 = 70, + 5 = 75, - 75 = 0 (só cabe depois do crédito); B: 50 - 20 = 30, - 10 = 20
+        self.assertEqual([restantes[lanc.pk] for lanc in lancs_a], [70.0, 75.0, 0.0])
+        self.assertEqual([restantes[lanc.pk] for lanc in lancs_b], [30.0, 20.0])
+        self.assertEqual(len({lanc.data_aprovacao for lanc in aprovados}), 1)
+
+    def test_uma_gravacao_de_saldo_e_um_historico_por_adesao(self):
+        lancs = self._pendentes(self.adesao_a, [('-', 10)] * 3) + self._pendentes(self.adesao_b, [('+', 1)] * 2)
+        historico = {
+            adesao.pk: adesao.historico.count() for adesao in (self.adesao_a, self.adesao_b)
+        }
+        historico_lanc = Lancamentos.historico.count()
+        tabela = Adesao._meta.db_table
+
+        with CaptureQueriesContext(connection) as consultas:
+            aprovar_lancamentos_em_lote([lanc.pk for lanc in lancs])
+
+        updates = [q['sql'] for q in consultas.captured_queries if q['sql'].startswith(f'UPDATE "{tabela}"')]
+        self.assertEqual(len(updates), 1)
+        for adesao, esperado in ((self.adesao_a, 70.0), (self.adesao_b, 52.0)):
+            adesao.refresh_from_db()
+            self.assertEqual(adesao.saldo_atual, esperado)
+            self.assertEqual(adesao.historico.count(), historico[adesao.pk] + 1)
+            self.assertEqual(adesao.historico.first().saldo_atual, esperado)
+        self.assertEqual(Lancamentos.historico.count(), historico_lanc + len(lancs))
+
+    def test_observacao_gravada_so_quando_informada(self):
+        com, sem = self._pendentes(self.adesao_a, [('-', 1), ('-', 1)])
+        Lancamentos.objects.filter(pk=sem.pk).update(observacao_aprovacao='observação anterior')
+
+        aprovar_lancamentos_em_lote([com.pk], observacao='conferido')
+        aprovar_lancamentos_em_lote([sem.pk])
+
+        com.refresh_from_db()
+        sem.refresh_from_db()
+        self.assertEqual(com.observacao_aprovacao, 'conferido')
+        self.assertEqual(sem.observacao_aprovacao, 'observação anterior')
+        self.assertTrue(sem.aprovado)
+
+
+class GravacaoDeAlteracoesTests(TestCase):
+    def setUp(self):
+        self.adesao = criar_adesao(saldo=100.0)
+        self.lanc = novo_lancamento(self.adesao, 10)
+        self.lanc.save()
+        self.tabela = Lancamentos._meta.db_table
+
+    def _updates(self, consultas):
+        return [q['sql'] for q in consultas.captured_queries if q['sql'].startswith(f'UPDATE "{self.tabela}"')]
+
+    def test_aprovacao_grava_so_as_colunas_alteradas(self):
+        lanc = Lancamentos.objects.get(pk=self.lanc.pk)
+        lanc.aprovado = True
+
+        with CaptureQueriesContext(connection) as consultas:
+            lanc.save()
+
+        # A própria gravação e a do saldo restante (ver atualizar_saldo_adesao)
+        colunas = [sql.split(' SET ', 1)[1].split(' WHERE ', 1)[0] for sql in self._updates(consultas)]
+        self.assertEqual(len(colunas), 2)
+        self.assertRegex(colunas[0], r'^"aprovado" = .*, "data_aprovacao" = [^,]*$')
+        self.assertRegex(colunas[1], r'^"saldo_restante" = [^,]*$')
+        self.assertEqual(lanc.historico.first().aprovado, True)
+
+    def test_save_sem_alteracoes_continua_completo(self):
+        lanc = Lancamentos.objects.get(pk=self.lanc.pk)
+        historico = lanc.historico.count()
+        sinais = []
+
+        def registrar(sender, instance, **kwargs):
+            sinais.append(kwargs.get('update_fields'))
+        post_save.connect(registrar, sender=Lancamentos)
+        self.addCleanup(post_save.disconnect, registrar, sender=Lancamentos)
+
+        with CaptureQueriesContext(connection) as consultas:
+            lanc.save()
+
+        self.assertEqual(len(self._updates(consultas)), 1)
+        self.assertEqual(sinais, [None])
+        self.assertEqual(lanc.historico.count(), historico + 1)
+
+
+class CriacaoEmLoteTests(TestCase):
+    """``criar_lancamentos_em_lote`` grava o mesmo que ``save()`` um a um.
+
+    A mesma entrada vai para duas adesões iguais: numa pelo caminho sequencial
+    (como a importação fazia: pula a chave já gravada e chama ``save()``), na
+    outra pelo lote.
+    """
+
+    DATA_INFORMADA = timezone.make_aware(datetime(2024, 3, 1, 12, 0))
+
+    def setUp(self):
+        cliente = criar_cliente()
+        self.sequencial = criar_adesao(cliente, saldo=100.0, perdcomp='SEQ-1')
+        self.lote = criar_adesao(cliente, saldo=100.0, perdcomp='LOTE-1')
+        for adesao in (self.sequencial, self.lote):
+            # Chave já gravada, e saldo_atual (90) diferente do crédito inicial
+            novo_lancamento(adesao, 10, item='X', aprovado=True).save()
+            adesao.refresh_from_db()
+
+    def _entrada(self, adesao):
+        return [
+            novo_lancamento(adesao, 30, item='1', aprovado=True),
+            novo_lancamento(adesao, 10, '+', item='2'),
+            novo_lancamento(adesao, 100, item='3', aprovado=True),  # piso em zero
+            novo_lancamento(adesao, 25, '+', item='4', aprovado=True, data_aprovacao=self.DATA_INFORMADA),
+            novo_lancamento(adesao, 1, item='1', aprovado=True),  # repetido na lista
+            novo_lancamento(adesao, 1, item='X', aprovado=True),  # já gravado
+            novo_lancamento(adesao, 5, '+', aprovado=True, perdcomp_inicial='OUTRO'),
+            novo_lancamento(adesao, 5, '+', aprovado=True),  # sem item: não entra na chave
+        ]
+
+    def _salvar_em_sequencia(self, adesao, lancamentos):
+        criados = []
+        for lanc in lancamentos:
+            if lanc.perdcomp_declaracao and lanc.item and Lancamentos.objects.filter(
+                id_adesao=adesao, perdcomp_declaracao=lanc.perdcomp_declaracao, item=lanc.item,
+            ).exists():
+                continue
+            lanc.save()
+            criados.append(lanc)
+        return criados
+
+    def _gravados(self, criados):
+        gravados = Lancamentos.objects.in_bulk([lanc.pk for lanc in criados])
+        return [gravados[lanc.pk] for lanc in criados]
+
+    def test_mesmo_resultado_que_save_em_sequencia(self):
+        esperados = self._gravados(self._salvar_em_sequencia(self.sequencial, self._entrada(self.sequencial)))
+        entrada = self._entrada(self.lote)
+        criados, ignorados = criar_lancamentos_em_lote(self.lote, entrada)
+
+        self.assertEqual(ignorados, [entrada[4], entrada[5]])
+        obtidos = self._gravados(criados)
+        self.assertEqual([lanc.item for lanc in obtidos], [lanc.item for lanc in esperados])
+        self.assertEqual([lanc.saldo_restante for lanc in obtidos], [60.0, None, 0.0, 25.0, 30.0, 35.0])
+        for esperado, obtido in zip(esperados, obtidos):
+            self.assertEqual(obtido.saldo_restante, esperado.saldo_restante, msg=f'item {obtido.item}')
+            self.assertEqual(obtido.aprovado, esperado.aprovado)
+            if esperado.data_aprovacao in (None, self.DATA_INFORMADA):
+                self.assertEqual(obtido.data_aprovacao, esperado.data_aprovacao)
+            else:
+                self.assertIsNotNone(obtido.data_aprovacao)
+        # perdcomp_inicial vem da adesão de cada um, salvo quando informado
+        self.assertEqual([lanc.perdcomp_inicial for lanc in esperados], ['SEQ-1'] * 4 + ['OUTRO', 'SEQ-1'])
+        self.assertEqual([lanc.perdcomp_inicial for lanc in obtidos], ['LOTE-1'] * 4 + ['OUTRO', 'LOTE-1'])
+
+        self.sequencial.refresh_from_db()
+        self.lote.refresh_from_db()
+        self.assertEqual(self.lote.saldo_atual, self.sequencial.saldo_atual)
+        self.assertEqual(self.lote.saldo_atual, 35.0)
+
+    def test_lote_sem_aprovados_nao_grava_a_adesao(self):
+        historico = self.lote.historico.count()
+        tabela = Adesao._meta.db_table
+
+        with CaptureQueriesContext(connection) as consultas:
+            criados, ignorados = criar_lancamentos_em_lote(self.lote, [
+                novo_lancamento(self.lote, 10, item='P1'),
+                novo_lancamento(self.lote, 20, '+', item='P2'),
+            ])
+
+        self.assertEqual(len(criados), 2)
+        self.assertEqual(ignorados, [])
+        self.assertFalse([q for q in consultas.captured_queries if q['sql'].startswith(f'UPDATE "{tabela}"')])
+        self.lote.refresh_from_db()
+        self.assertEqual(self.lote.saldo_atual, 90.0)
+        self.assertEqual(self.lote.historico.count(), historico)
+        for lanc in self._gravados(criados):
+            self.assertFalse(lanc.aprovado)
+            self.assertIsNone(lanc.data_aprovacao)
+            self.assertIsNone(lanc.saldo_restante)
+
+
+def em(dia, mes, hora=12, ano=2024):
+    return timezone.make_aware(datetime(ano, mes, dia, hora, 0))
+
+
+@override_settings(SALDO_CHECKPOINT_INTERVALO=3)
+class SaldoCheckpointTests(TestCase):
+    """Checkpoints gravados a cada aprovação e saldo numa data a partir deles."""
+
+    # (data de aprovação, sinal, valor); saldo inicial 100
+    RAZAO = [
+        (em(10, 1), '-', 30),   # 70
+        (em(20, 1), '+', 50),   # 120
+        (em(25, 1), '-', 200),  # 0 (piso); 3º desde o início: intervalo
+        (em(5, 2), '+', 40),    # 40
+        (em(6, 2), '-', 10),    # 30
+        (em(7, 2), '-', 5),     # 25; intervalo
+        (em(8, 2), '+', 1),     # 26; último de fevereiro: mensal
+        (em(1, 3), '-', 100),   # 0
+        (em(2, 3), '+', 10),    # 10
+    ]
+
+    def setUp(self):
+        self.adesao = criar_adesao(saldo=100.0)
+        self.lancs = []
+        for i, (data, sinal, valor) in enumerate(self.RAZAO):
+            lanc = novo_lancamento(self.adesao, valor, sinal, item=str(i), aprovado=True, data_aprovacao=data)
+            lanc.save()
+            self.lancs.append(lanc)
+
+    def _checkpoints(self):
+        return list(
+            SaldoCheckpoint.objects.filter(adesao=self.adesao)
+            .order_by('data_aprovacao', 'lancamento_id')
+            .values_list('lancamento_id', 'motivo', 'saldo')
+        )
+
+    def _razao_ate(self, limite):
+        # Saldo refeito do zero, lançamento a lançamento
+        saldo = self.adesao.saldo
+        for lanc in Lancamentos.objects.filter(
+            id_adesao=self.adesao, aprovado=True, data_aprovacao__lte=limite,
+        ).order_by('data_aprovacao', 'id'):
+            saldo = max(saldo - lanc.valor, 0) if lanc.sinal == '-' else saldo + lanc.valor
+        return saldo
+
+    def _instantes(self):
+        datas = Lancamentos.objects.filter(id_adesao=self.adesao).values_list('data_aprovacao', flat=True)
+        return [em(1, 1)] + sorted(
+            instante for data in datas for instante in (data - timedelta(seconds=1), data, data + timedelta(hours=1))
+        )
+
+    def _confere_com_o_razao(self):
+        for instante in self._instantes():
+            self.assertAlmostEqual(saldo_em(self.adesao, instante), self._razao_ate(instante), places=2,
+                                   msg=f'em {instante}')
+
+    def test_checkpoints_mensais_e_por_intervalo(self):
+        self.assertEqual(self._checkpoints(), [
+            (self.lancs[2].pk, SaldoCheckpoint.INTERVALO, 0.0),
+            (self.lancs[5].pk, SaldoCheckpoint.INTERVALO, 25.0),
+            (self.lancs[6].pk, SaldoCheckpoint.MENSAL, 26.0),
+        ])
+
+    def test_saldo_em_igual_ao_razao(self):
+        self.assertEqual(saldo_em(self.adesao, em(1, 1)), 100.0)
+        # Exatamente no checkpoint e logo depois dele
+        self.assertEqual(saldo_em(self.adesao, em(25, 1)), 0.0)
+        self.assertEqual(saldo_em(self.adesao, em(8, 2)), 26.0)
+        self.assertEqual(saldo_em(self.adesao.pk, em(1, 3)), 0.0)
+        self._confere_com_o_razao()
+        # Data sem hora: até o fim do dia
+        self.assertEqual(saldo_em(self.adesao, date(2024, 2, 7)), 25.0)
+        fim_do_dia = timezone.make_aware(datetime.combine(date(2024, 2, 7), time.max))
+        self.assertEqual(saldo_em(self.adesao, date(2024, 2, 7)), self._razao_ate(fim_do_dia))
+
+    def test_saldos_em_varias_adesoes(self):
+        outra = criar_adesao(self.adesao.cliente, saldo=7.0, perdcomp='TESTE-2')
+        self.assertEqual(saldos_em([self.adesao, outra.pk], em(6, 2)), {self.adesao.pk: 30.0, outra.pk: 7.0})
+        self.assertEqual(saldos_em([], em(6, 2)), {})
+        with self.assertRaises(Adesao.DoesNotExist):
+            saldo_em(999999, em(6, 2))
+
+    def test_aprovacao_retroativa_invalida_checkpoints_seguintes(self):
+        novo_lancamento(self.adesao, 15, '+', item='R', aprovado=True, data_aprovacao=em(1, 2)).save()
+
+        self.assertEqual(self._checkpoints(), [(self.lancs[2].pk, SaldoCheckpoint.INTERVALO, 0.0)])
+        self._confere_com_o_razao()
+
+    def test_exclusao_invalida_checkpoints_seguintes(self):
+        self.lancs[3].delete()
+
+        self.assertEqual(self._checkpoints(), [(self.lancs[2].pk, SaldoCheckpoint.INTERVALO, 0.0)])
+        self._confere_com_o_razao()
+
+    def test_reconstruir_checkpoints_idempotente(self):
+        incrementais = self._checkpoints()
+
+        self.assertEqual(reconstruir_checkpoints(self.adesao.pk), len(incrementais))
+        self.assertEqual(self._checkpoints(), incrementais)
+        self.assertEqual(reconstruir_checkpoints(), len(incrementais))
+        self.assertEqual(self._checkpoints(), incrementais)
+
+        # Depois de invalidados, a reconstrução volta a seguir o razão
+        novo_lancamento(self.adesao, 15, '+', item='R', aprovado=True, data_aprovacao=em(1, 2)).save()
+        reconstruir_checkpoints(self.adesao.pk)
+        reconstruidos = self._checkpoints()
+        self.assertEqual(len(reconstruidos), 3)
+        reconstruir_checkpoints(self.adesao.pk)
+        self.assertEqual(self._checkpoints(), reconstruidos)
+        self._confere_com_o_razao()
+
+
+class RecalculoSaldosTests(TestCase):
+    """``recalcular`` e ``recompute_saldos`` chegam aos saldos gravados pelo ``save()``."""
+
+    def setUp(self):
+        cliente = criar_cliente()
+        # Soma acumulada que desce abaixo de zero (piso) e outra que nunca desce
+        self.com_piso = criar_adesao(cliente, saldo=50.0, perdcomp='PISO')
+        self.sem_piso = criar_adesao(cliente, saldo=100.0, perdcomp='SEM-PISO')
+        self.lancs = {}
+        for adesao, itens in ((self.com_piso, [('-', 80), ('+', 30), ('-', 10)]),
+                              (self.sem_piso, [('-', 30), ('+', 10), ('-', 20)])):
+            self.lancs[adesao.pk] = []
+            for i, (sinal, valor) in enumerate(itens):
+                lanc = novo_lancamento(adesao, valor, sinal, item=str(i), aprovado=True,
+                                       data_aprovacao=em(i + 1, 1))
+                lanc.save()
+                self.lancs[adesao.pk].append(lanc)
+        self.esperado = {
+            self.com_piso.pk: ([0.0, 30.0, 20.0], 20.0),
+            self.sem_piso.pk: ([70.0, 80.0, 60.0], 60.0),
+        }
+
+    def _saldos(self, adesao):
+        adesao.refresh_from_db()
+        restantes = dict(Lancamentos.objects.filter(id_adesao=adesao).values_list('pk', 'saldo_restante'))
+        return [restantes[lanc.pk] for lanc in self.lancs[adesao.pk]], adesao.saldo_atual
+
+    def _corromper(self):
+        com_piso, sem_piso = self.lancs[self.com_piso.pk], self.lancs[self.sem_piso.pk]
+        Lancamentos.objects.filter(pk=com_piso[0].pk).update(saldo_restante=-30.0)
+        Lancamentos.objects.filter(pk=com_piso[2].pk).update(saldo_restante=None)
+        Lancamentos.objects.filter(pk=sem_piso[1].pk).update(saldo_restante=81.0)
+        Adesao.objects.filter(pk=self.com_piso.pk).update(saldo_atual=-10.0)
+        Adesao.objects.filter(pk=self.sem_piso.pk).update(saldo_atual=None)
+
+    def _comando(self, *args):
+        saida = StringIO()
+        call_command('recompute_saldos', *args, stdout=saida)
+        return saida.getvalue()
+
+    def test_recalculo_confere_com_o_save(self):
+        for adesao in (self.com_piso, self.sem_piso):
+            self.assertEqual(self._saldos(adesao), self.esperado[adesao.pk])
+        divergencias = recalcular()
+        self.assertFalse(divergencias)
+        self.assertEqual(divergencias.maiores, [])
+        self.assertIn('Saldos consistentes.', self._comando('--verify-only'))
+
+    def test_verificacao_informa_divergencias_sem_gravar(self):
+        self._corromper()
+        saida = StringIO()
+
+        with self.assertRaises(CommandError):
+            call_command('recompute_saldos', '--verify-only', stdout=saida)
+
+        saida = saida.getvalue()
+        self.assertIn('3 lançamento(s) e 2 adesão(ões) com saldo divergente', saida)
+        # Maior diferença primeiro
+        self.assertLess(saida.index(f'adesão {self.sem_piso.pk}:'), saida.index(f'adesão {self.com_piso.pk}:'))
+        self.assertIn(f'adesão {self.sem_piso.pk}: gravado vazio, recalculado 60.00 (+60.00)', saida)
+        self.assertIn(f'adesão {self.com_piso.pk}: gravado -10.00, recalculado 20.00 (+30.00)', saida)
+        self.assertEqual(self._saldos(self.com_piso), ([-30.0, 30.0, None], -10.0))
+        self.assertEqual(self._saldos(self.sem_piso), ([70.0, 81.0, 60.0], None))
+
+        divergencias = recalcular(self.com_piso.pk)
+        self.assertEqual((divergencias.lancamentos, divergencias.adesoes), (2, 1))
+        self.assertEqual(divergencias.maiores, [(self.com_piso.pk, -10.0, 20.0)])
+        self.assertFalse(divergencias.corrigido)
+
+    def test_correcao_grava_os_saldos_recalculados(self):
+        self._corromper()
+
+        saida = self._comando()
+
+        self.assertIn('3 lançamento(s) e 2 adesão(ões) com saldo divergente', saida)
+        self.assertIn('Saldos divergentes corrigidos.', saida)
+        for adesao in (self.com_piso, self.sem_piso):
+            self.assertEqual(self._saldos(adesao), self.esperado[adesao.pk])
+        self.assertIn('Checkpoints de saldo recriados', saida)
+        self.assertIn('Saldos consistentes.', self._comando('--verify-only'))
+
+    def test_correcao_restrita_a_uma_adesao(self):
+        self._corromper()
+
+        saida = self._comando('--adesao', str(self.sem_piso.pk))
+
+        self.assertIn('1 lançamento(s) e 1 adesão(ões) com saldo divergente', saida)
+        self.assertEqual(self._saldos(self.sem_piso), self.esperado[self.sem_piso.pk])
+        self.assertEqual(self._saldos(self.com_piso), ([-30.0, 30.0, None], -10.0))
+
+
+class AnexoIndexacaoPendenteTests(TestCase):
+    """O anexo é marcado para a busca no próprio ``save``, só quando o arquivo muda."""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        configuracao = override_settings(MEDIA_ROOT=media.name)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        self.lanc = novo_lancamento(criar_adesao(), 10)
+        self.lanc.save()
+
+    def _salvar(self, nome, anexo=None):
+        # Como o formset: o upload é atribuído ao campo e gravado pelo save()
+        anexo = anexo or Anexos(id_lancamento=self.lanc, descricao='comprovante')
+        anexo.arquivo = SimpleUploadedFile(nome, b'%PDF-1.4 conteudo')
+        anexo.save()
+        return anexo
+
+    def _pendente(self, anexo):
+        return Anexos.objects.values_list('indexacao_pendente', flat=True).get(pk=anexo.pk)
+
+    def _indexado(self, anexo):
+        # Como o import_worker depois de extrair o texto
+        Anexos.objects.filter(pk=anexo.pk).update(indexacao_pendente=False)
+        return Anexos.objects.get(pk=anexo.pk)
+
+    def test_novo_anexo_marcado_so_se_for_pdf(self):
+        tabela = Anexos._meta.db_table
+        with CaptureQueriesContext(connection) as consultas:
+            pdf = self._salvar('guia.pdf')
+
+        self.assertTrue(self._pendente(pdf))
+        self.assertFalse([q for q in consultas.captured_queries if q['sql'].startswith(f'UPDATE "{tabela}"')])
+        self.assertFalse(self._pendente(self._salvar('planilha.xlsx')))
+
+    def test_alteracao_sem_trocar_o_arquivo_nao_marca(self):
+        anexo = self._indexado(self._salvar('guia.pdf'))
+
+        anexo.descricao = 'outra descrição'
+        anexo.save()
+
+        self.assertFalse(self._pendente(anexo))
+
+    def test_troca_de_arquivo_marca(self):
+        # Mesmo para um arquivo que não é PDF: o texto antigo sai do índice
+        anexo = self._salvar('planilha.xlsx', self._indexado(self._salvar('guia.pdf')))
+
+        self.assertTrue(self._pendente(anexo))
@@ -8,6 +8,7 @@ urlpatterns = [
     path('', views.LancamentosListView.as_view(), name='list'),
     path('<int:pk>/', views.LancamentoDetailView.as_view(), name='detail'),
     path('<int:pk>/aprovar/', views.LancamentoApprovalUpdateView.as_view(), name='aprovar'),
+    path('aprovar-lote/', views.aprovar_lancamentos_lote, name='aprovar_lote'),
     path('novo/', views.LancamentoCreateView.as_view(), name='create'),
     path('exportar-xlsx/', views.exportar_lancamentos_xlsx, name='exportar_xlsx'),
     path('historico/<int:pk>/', views.lancamento_history_json, name='history_json'),
@@ -16,6 +17,7 @@ urlpatterns = [
     # API DRF padronizada
     path('api/v1/listar-lancamento/', views.LancamentoListAPI.as_view(), name='api-lancamento-list'),
     path('api/v1/criar-lancamento/', views.LancamentoCreateAPI.as_view(), name='api-lancamento-create'),
+    path('api/v1/aprovar-lancamentos/', views.LancamentoAprovarLoteAPI.as_view(), name='api-lancamento-aprovar-lote'),
     path('api/v1/listar-lancamento/<int:pk>/', views.LancamentoDetailAPI.as_view(), name='api-lancamento-detail'),
     path('api/v1/listar-anexo/', views.AnexoListAPI.as_view(), name='api-anexo-list'),
     path('api/v1/criar-anexo/', views.AnexoCreateAPI.as_view(), name='api-anexo-create'),
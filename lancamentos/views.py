@@ -22,12 +22,14 @@ from openpyxl.styles import Font
 from django.utils.timezone import now, localtime
 from empresas.models import Empresa
 from django.utils.dateformat import format as date_format
-from django.views.decorators.http import require_GET
+from django.views.decorators.http import require_GET, require_POST
+from django.utils.http import url_has_allowed_host_and_scheme
 from django.contrib.auth.decorators import login_required
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import permissions, status
-from .serializers import LancamentoSerializer, AnexoSerializer
+from .serializers import LancamentoSerializer, AnexoSerializer, AprovacaoLoteSerializer
+from .services import aprovar_lancamentos_em_lote
 from .models import Lancamentos, Anexos
 # --- Exportação de lançamentos para XLSX ---
 from django.contrib.auth.decorators import login_required
@@ -390,6 +392,36 @@ class LancamentoApprovalUpdateView(AdminRequiredMixin, UpdateView):
             return redirect('lancamentos:detail', pk=self.object.pk)
         return super().dispatch(request, *args, **kwargs)
 
+@admin_required
+@require_POST
+def aprovar_lancamentos_lote(request):
+    """Aprova os lançamentos marcados na listagem (campo ``ids``) numa única operação."""
+    destino = request.POST.get('next') or ''
+    if not url_has_allowed_host_and_scheme(destino, allowed_hosts={request.get_host()}):
+        destino = ''
+    destino = destino or reverse('lancamentos:list')
+    try:
+        ids = [int(pk) for pk in request.POST.getlist('ids')]
+    except ValueError:
+        messages.error(request, 'Seleção de lançamentos inválida.')
+        return redirect(destino)
+    if not ids:
+        messages.info(request, 'Nenhum lançamento selecionado.')
+        return redirect(destino)
+    try:
+        aprovados, ignorados = aprovar_lancamentos_em_lote(
+            ids, usuario=request.user, observacao=request.POST.get('observacao_aprovacao') or None,
+        )
+    except ValidationError as e:
+        for erro in e.messages:
+            messages.error(request, erro)
+        messages.error(request, 'Nenhum lançamento foi aprovado.')
+        return redirect(destino)
+    messages.success(request, f'{len(aprovados)} lançamento(s) aprovado(s).')
+    if ignorados:
+        messages.info(request, f'{len(ignorados)} lançamento(s) ignorado(s): já aprovados ou inexistentes.')
+    return redirect(destino)
+
 @login_required
 @require_GET
 def lancamento_history_json(request, pk):
@@ -525,6 +557,31 @@ class LancamentoCreateAPI(APIView):
             return Response(ser.data, status=status.HTTP_201_CREATED)
         return Response(ser.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class LancamentoAprovarLoteAPI(APIView):
+    permission_classes = [permissions.IsAuthenticated, IsSuperAdmin]
+    def post(self, request):
+        ser = AprovacaoLoteSerializer(data=request.data)
+        if not ser.is_valid():
+            return Response(ser.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            aprovados, ignorados = aprovar_lancamentos_em_lote(
+                ser.validated_data['ids'],
+                usuario=request.user,
+                observacao=ser.validated_data.get('observacao') or None,
+            )
+        except ValidationError as e:
+            return Response({'ids': e.messages}, status=status.HTTP_400_BAD_REQUEST)
+        # Último saldo_restante de cada adesão = saldo_atual gravado
+        saldos = {lanc.id_adesao_id: lanc.saldo_restante for lanc in aprovados}
+        return Response({
+            'aprovados': [
+                {'id': lanc.pk, 'id_adesao': lanc.id_adesao_id, 'saldo_restante': lanc.saldo_restante}
+                for lanc in aprovados
+            ],
+            'ignorados': ignorados,
+            'saldos': [{'id_adesao': pk, 'saldo_atual': saldo} for pk, saldo in saldos.items()],
+        })
+
 class LancamentoDetailAPI(APIView):
     permission_classes = [permissions.IsAuthenticated, IsSuperAdmin]
     def get_object(self, pk):
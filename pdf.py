@@ -1,22 +1,48 @@
+import io
 import os
 import sys
+from typing import BinaryIO, Iterator, Tuple, Union
 from pypdf import PdfReader
 
+PDFSource = Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO]
 
-def extract_text(pdf_path: str) -> str:
-    """Extrai texto diretamente de um PDF utilizando apenas o conteúdo embutido."""
-    if not pdf_path.lower().endswith(".pdf"):
-        raise ValueError("Somente arquivos PDF são suportados")
 
-    if not os.path.exists(pdf_path):
-        raise FileNotFoundError(pdf_path)
+def _open_reader(source: PDFSource) -> PdfReader:
+    if isinstance(source, (str, os.PathLike)):
+        pdf_path = os.fspath(source)
+        if not pdf_path.lower().endswith(".pdf"):
+            raise ValueError("Somente arquivos PDF são suportados")
 
-    reader = PdfReader(pdf_path)
-    texts = []
-    for page in reader.pages:
-        page_text = page.extract_text() or ""
-        texts.append(page_text)
+        if not os.path.exists(pdf_path):
+            raise FileNotFoundError(pdf_path)
 
+        return PdfReader(pdf_path)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return PdfReader(io.BytesIO(source))
+    # Objeto com read/seek (arquivo aberto, upload do Django, mmap...)
+    return PdfReader(source)
+
+
+def iter_page_texts(source: PDFSource) -> Iterator[Tuple[int, int, str]]:
+    """Extrai o texto página a página, sob demanda.
+
+    Gera ``(numero_da_pagina, total_de_paginas, texto)``; o consumidor pode
+    interromper a iteração assim que tiver o que precisa, evitando o custo do
+    pypdf nas páginas restantes.
+    """
+    reader = _open_reader(source)
+    total = len(reader.pages)
+    for number, page in enumerate(reader.pages, start=1):
+        yield number, total, page.extract_text() or ""
+
+
+def extract_text(source: PDFSource) -> str:
+    """Extrai texto diretamente de um PDF utilizando apenas o conteúdo embutido.
+
+    ``source`` pode ser o caminho do arquivo, o conteúdo em bytes ou um objeto
+    de arquivo já aberto (ex.: upload do Django ou ``mmap``).
+    """
+    texts = [page_text for _, _, page_text in iter_page_texts(source)]
     return "\n".join(texts).strip()
 
 def main():
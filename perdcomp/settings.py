@@ -132,6 +132,13 @@ else:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': SQLITE_PATH,
+            # Transações pegam o lock de escrita no BEGIN (o SQLite ignora
+            # select_for_update) e esperam por ele em vez de falhar na hora
+            'OPTIONS': {'timeout': 20, 'transaction_mode': 'IMMEDIATE'},
+            # Banco de teste em arquivo: os testes com várias threads (aprovações
+            # concorrentes) precisam de conexões independentes, que no banco em
+            # memória compartilhado falham com "table is locked" sem esperar
+            'TEST': {'NAME': str(BASE_DIR / 'test_db.sqlite3')},
         }
     }
 
@@ -191,6 +198,39 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 
+# Importação de PDFs
+# Nº de processos usados na extração paralela da importação em lote (0 = nº de CPUs)
+PDF_EXTRACTION_WORKERS = int(os.getenv('DJANGO_PDF_EXTRACTION_WORKERS', '0'))
+# Cache do texto extraído, por SHA-256 do PDF (LRU; 0 entradas = desabilitado).
+# Fora de MEDIA_ROOT para não ser servido publicamente pelo Nginx.
+PDF_TEXT_CACHE_DIR = os.getenv('DJANGO_PDF_TEXT_CACHE_DIR', os.path.join(BASE_DIR, 'cache', 'pdf_text'))
+PDF_TEXT_CACHE_MAX_ENTRIES = int(os.getenv('DJANGO_PDF_TEXT_CACHE_MAX_ENTRIES', '2000'))
+# Sandbox de extração: o pypdf roda em processos filhos reutilizados, com
+# limites por PDF (0 = sem limite). PDFs que estouram um limite viram erro
+# (422, com error_code) em vez de derrubar o worker. SANDBOX=False extrai no
+# próprio processo, sem limites (desenvolvimento).
+PDF_EXTRACTION_SANDBOX = os.getenv('DJANGO_PDF_EXTRACTION_SANDBOX', 'True').lower() in ('1', 'true', 'yes')
+PDF_EXTRACTION_TIMEOUT = float(os.getenv('DJANGO_PDF_EXTRACTION_TIMEOUT', '60'))
+PDF_EXTRACTION_CPU_SECONDS = int(os.getenv('DJANGO_PDF_EXTRACTION_CPU_SECONDS', '60'))
+PDF_EXTRACTION_MEMORY_MB = int(os.getenv('DJANGO_PDF_EXTRACTION_MEMORY_MB', '1024'))
+PDF_EXTRACTION_MAX_TASKS_PER_CHILD = int(os.getenv('DJANGO_PDF_EXTRACTION_MAX_TASKS_PER_CHILD', '200'))
+# Importação de .zip (ex.: pacotes do e-CAC): limites por arquivo ZIP (0 = sem limite)
+PDF_ZIP_MAX_ENTRIES = int(os.getenv('DJANGO_PDF_ZIP_MAX_ENTRIES', '5000'))
+PDF_ZIP_MAX_ENTRY_BYTES = int(os.getenv('DJANGO_PDF_ZIP_MAX_ENTRY_BYTES', str(50 * 1024 * 1024)))
+# Fila de importação em segundo plano (manage.py import_worker): itens em
+# processamento há mais que STALE_SECONDS são devolvidos à fila (worker caiu),
+# até MAX_ATTEMPTS tentativas.
+IMPORT_JOB_STALE_SECONDS = int(os.getenv('DJANGO_IMPORT_JOB_STALE_SECONDS', '900'))
+IMPORT_JOB_MAX_ATTEMPTS = int(os.getenv('DJANGO_IMPORT_JOB_MAX_ATTEMPTS', '3'))
+# Logs de importação em JSON Lines (MEDIA_ROOT/import_logs), gravados por uma
+# thread em segundo plano: tamanho máximo de cada segmento e da fila em memória
+IMPORT_LOG_SEGMENT_BYTES = int(os.getenv('DJANGO_IMPORT_LOG_SEGMENT_BYTES', str(64 * 1024 * 1024)))
+IMPORT_LOG_QUEUE_SIZE = int(os.getenv('DJANGO_IMPORT_LOG_QUEUE_SIZE', '10000'))
+
+# Razão de saldos: além do fechamento de cada mês, um checkpoint de saldo por
+# adesão a cada N lançamentos aprovados (0 = só os mensais)
+SALDO_CHECKPOINT_INTERVALO = int(os.getenv('DJANGO_SALDO_CHECKPOINT_INTERVALO', '100'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
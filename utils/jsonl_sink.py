@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import atexit
+import datetime
+import os
+import queue
+import threading
+from typing import List, Optional
+
+__all__ = ['JsonLinesSink']
+
+_STOP = object()
+
+
+class JsonLinesSink:
+    """Grava linhas JSON em segundo plano, em segmentos ``.jsonl`` rotativos.
+
+    ``submit`` só enfileira a linha (fila limitada) e retorna; uma thread
+    daemon agrupa as linhas pendentes e as grava de uma vez no segmento atual,
+    abrindo um novo ao passar de ``max_bytes``. Com a fila cheia a linha é
+    gravada na hora (nada é descartado). A fila é esvaziada no encerramento do
+    processo (``atexit``). Segmentos levam o PID no nome: vários processos
+    (workers do gunicorn) nunca escrevem no mesmo arquivo.
+    """
+
+    def __init__(self, directory: str, prefix: str, max_bytes: int = 64 * 1024 * 1024,
+                 queue_size: int = 10000, flush_interval: float = 1.0, batch_size: int = 500):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()  # arquivo do segmento (thread + gravações diretas)
+        self._start_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._fh = None
+        self._size = 0
+        atexit.register(self.close)
+
+    def submit(self, line: str) -> None:
+        """Enfileira uma linha (sem ``\\n``) para gravação."""
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(line)
+        except queue.Full:
+            self._write([line])
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Grava o que estiver na fila e fecha o segmento atual."""
+        if self._running():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+    def _ensure_thread(self) -> None:
+        # Após um fork (gunicorn --preload) a thread do processo pai não existe no filho
+        if self._running():
+            return
+        with self._start_lock:
+            if self._running():
+                return
+            self._queue = queue.Queue(maxsize=self._queue.maxsize)
+            self._fh = None
+            self._size = 0
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name=f'{self.prefix}-writer', daemon=True)
+            self._thread.start()
+
+    def _running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and self._pid == os.getpid()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch: List[str] = []
+            stop = first is _STOP
+            if not stop:
+                batch.append(first)
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                else:
+                    batch.append(item)
+            if batch:
+                self._write(batch)
+            if stop:
+                return
+
+    def _write(self, lines: List[str]) -> None:
+        data = ''.join(line + '\n' for line in lines).encode('utf-8')
+        with self._lock:
+            try:
+                if self._fh is None or (self._size and self._size + len(data) > self.max_bytes):
+                    self._rotate()
+                self._fh.write(data)
+                self._fh.flush()
+                self._size += len(data)
+            except Exception:
+                # Falha de disco não pode derrubar a thread (nem a requisição)
+                if self._fh is not None:
+                    try:
+                        self._fh.close()
+                    except Exception:
+                        pass
+                self._fh = None
+                self._size = 0
+
+    def _rotate(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+        os.makedirs(self.directory, exist_ok=True)
+        ts = datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%d_%H%M%S_%f')
+        path = os.path.join(self.directory, f'{self.prefix}_{ts}_{os.getpid()}.jsonl')
+        self._fh = open(path, 'ab')
+        self._size = self._fh.tell()
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple, Union
+
+__all__ = [
+    'PDFTextCache',
+    'get_text_cache',
+    'read_upload',
+    'open_source',
+]
+
+# Caminho de um arquivo em disco ou conteúdo do PDF em memória
+UploadSource = Union[str, bytes]
+
+
+class PDFTextCache:
+    """Cache persistente (em disco) do texto extraído de PDFs.
+
+    Chave: SHA-256 do conteúdo do PDF. Cada entrada é um arquivo
+    ``<dir>/<sha[:2]>/<sha>.txt``; o mtime marca o último uso e a remoção
+    segue LRU quando ``max_entries`` é ultrapassado. Seguro entre processos:
+    gravações usam ``os.replace`` e remoções concorrentes são ignoradas.
+
+    A quantidade de entradas é estimada em memória a cada gravação; o
+    diretório só é percorrido quando a estimativa passa de ``max_entries``
+    ou a cada ``max_entries // 10`` gravações (para contar as de outros
+    processos). A remoção desce até 90% do limite, para que as gravações
+    seguintes não voltem a percorrer o diretório.
+    """
+
+    def __init__(self, directory: str, max_entries: int = 2000):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._count: Optional[int] = None  # desconhecida até o primeiro percurso
+        self._writes = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory) and self.max_entries > 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.txt")
+
+    def get(self, key: str | None) -> Optional[str]:
+        if not key or not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as fh:
+                text = fh.read()
+        except OSError:
+            return None
+        try:
+            os.utime(path, None)  # marca uso recente (LRU)
+        except OSError:
+            pass
+        return text
+
+    def set(self, key: str | None, text: str) -> None:
+        if not key or not self.enabled:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+            with os.fdopen(fd, 'w', encoding='utf-8') as fh:
+                fh.write(text or '')
+            os.replace(tmp, path)
+        except OSError:
+            return
+        with self._lock:
+            self._writes += 1
+            if self._count is not None:
+                self._count += 1  # sobrescrita conta a mais: só antecipa o percurso
+            due = (
+                self._count is None
+                or self._count > self.max_entries
+                or self._writes >= max(1, self.max_entries // 10)
+            )
+        if due:
+            self._evict()
+
+    def _evict(self) -> None:
+        entries = []
+        try:
+            for bucket in os.scandir(self.directory):
+                if not bucket.is_dir():
+                    continue
+                for entry in os.scandir(bucket.path):
+                    if entry.name.endswith('.txt'):
+                        try:
+                            entries.append((entry.stat().st_mtime, entry.path))
+                        except OSError:
+                            continue
+        except OSError:
+            return
+        excess = 0
+        if len(entries) > self.max_entries:
+            excess = len(entries) - (self.max_entries - self.max_entries // 10)
+            entries.sort()
+            for _, path in entries[:excess]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        with self._lock:
+            self._count = len(entries) - excess
+            self._writes = 0
+
+
+_cache: Optional[PDFTextCache] = None
+
+
+def get_text_cache() -> PDFTextCache:
+    """Instância do cache configurada por ``PDF_TEXT_CACHE_DIR``/``PDF_TEXT_CACHE_MAX_ENTRIES``."""
+    global _cache
+    if _cache is None:
+        from django.conf import settings
+        _cache = PDFTextCache(
+            getattr(settings, 'PDF_TEXT_CACHE_DIR', ''),
+            int(getattr(settings, 'PDF_TEXT_CACHE_MAX_ENTRIES', 0) or 0),
+        )
+    return _cache
+
+
+def read_upload(pdf_file) -> Tuple[UploadSource, str]:
+    """Obtém o conteúdo de um upload sem criar cópias temporárias próprias.
+
+    Retorna ``(fonte, sha256_hex)``: para ``TemporaryUploadedFile`` a fonte é o
+    caminho do arquivo temporário do próprio Django; para uploads em memória,
+    os bytes já carregados. A fonte é lida por ``open_source`` e pode ser
+    enviada ao pool de processos (ver ``utils.pdf_pool.extract_and_parse``).
+    """
+    temporary_file_path = getattr(pdf_file, 'temporary_file_path', None)
+    if callable(temporary_file_path):
+        path = temporary_file_path()
+        with open(path, 'rb') as fh:
+            digest = hashlib.file_digest(fh, 'sha256')
+        return path, digest.hexdigest()
+    pdf_file.seek(0)
+    data = pdf_file.read()
+    return data, hashlib.sha256(data).hexdigest()
+
+
+@contextmanager
+def open_source(source: UploadSource) -> Iterator:
+    """Abre a fonte para o pypdf: caminho via ``mmap`` (sem cópia) ou bytes.
+
+    Fontes com ``read_bytes()`` (ex.: ``utils.pdf_zip.ZipEntrySource``) são
+    lidas para a memória somente aqui, no processo que fará a extração.
+    """
+    if hasattr(source, 'read_bytes'):
+        yield source.read_bytes()
+        return
+    if not isinstance(source, str):
+        yield source
+        return
+    with open(source, 'rb') as fh:
+        try:
+            mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # arquivo vazio não pode ser mapeado
+            yield fh
+            return
+        with mm:
+            yield mm
+
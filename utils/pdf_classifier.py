@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+from utils.pdf_parser import (
+    parse_credito_em_conta_text,
+    parse_declaracao_compensacao_text,
+    parse_pedido_credito_text,
+    parse_recibo_pedido_credito_text,
+    parse_ressarcimento_text,
+)
+
+__all__ = [
+    'DOC_PERDCOMP',
+    'DOC_PEDIDO_CREDITO',
+    'DOC_DECLARACAO_COMPENSACAO',
+    'DOC_RECIBO',
+    'DOC_CREDITO_CONTA',
+    'DOCUMENT_LABELS',
+    'PARSERS',
+    'ClassifiedDocument',
+    'classify_header',
+    'sniff_document_type',
+    'parse_documento',
+]
+
+# Tipos de documento (mesmos nomes usados em 'context' nos logs de importação)
+DOC_PERDCOMP = 'perdcomp'
+DOC_PEDIDO_CREDITO = 'pedido_credito'
+DOC_DECLARACAO_COMPENSACAO = 'declaracao_compensacao'
+DOC_RECIBO = 'recibo_pedido_credito'
+DOC_CREDITO_CONTA = 'credito_em_conta'
+
+DOCUMENT_LABELS = {
+    DOC_PERDCOMP: 'PER/DCOMP',
+    DOC_PEDIDO_CREDITO: 'Pedido de Crédito',
+    DOC_DECLARACAO_COMPENSACAO: 'Declaração de Compensação',
+    DOC_RECIBO: 'Recibo de Pedido de Crédito',
+    DOC_CREDITO_CONTA: 'Notificação de Crédito em Conta',
+}
+
+PARSERS: Dict[str, Callable[[str], Any]] = {
+    DOC_PERDCOMP: parse_ressarcimento_text,
+    DOC_PEDIDO_CREDITO: parse_pedido_credito_text,
+    DOC_DECLARACAO_COMPENSACAO: parse_declaracao_compensacao_text,
+    DOC_RECIBO: parse_recibo_pedido_credito_text,
+    DOC_CREDITO_CONTA: parse_credito_em_conta_text,
+}
+
+# Apenas o início do documento é analisado: os rótulos que identificam o
+# tipo ficam no cabeçalho da primeira página.
+HEADER_CHARS = 2000
+
+_RE_INFORMAMOS = re.compile(r"Informamos\s+que", re.IGNORECASE)
+_RE_RECIBO = re.compile(r"\bRecibo\b", re.IGNORECASE)
+_RE_RECIBO_CAMPOS = re.compile(r"N[úu]mero\s+de\s+Controle|Autentica[cç][aã]o", re.IGNORECASE)
+_RE_TIPO_DOCUMENTO = re.compile(r"Tipo\s+de\s+Documento\s*[:\-]?\s*(.+?)(?:\n|$)", re.IGNORECASE)
+_RE_DECLARACAO = re.compile(r"Declara[cç][aã]o\s+de\s+Compensa[cç][aã]o|PER\s*/?\s*DCOMP\s+inicial", re.IGNORECASE)
+_RE_PEDIDO = re.compile(r"Pedido\s+(?:Eletr[ôo]nico\s+)?de\s+(?:Restitui|Ressarc)", re.IGNORECASE)
+_RE_PERDCOMP = re.compile(r"PER\s*/?\s*DCOMP", re.IGNORECASE)
+
+
+def classify_header(text: str) -> Optional[str]:
+    """Identifica o tipo do documento pelo texto do cabeçalho.
+
+    Considera só os primeiros ``HEADER_CHARS`` caracteres. Retorna um dos
+    ``DOC_*`` ou ``None`` quando nada reconhecível foi encontrado.
+    """
+    head = (text or '')[:HEADER_CHARS]
+    if not head.strip():
+        return None
+    if _RE_INFORMAMOS.search(head):
+        return DOC_CREDITO_CONTA
+    if _RE_RECIBO.search(head) and _RE_RECIBO_CAMPOS.search(head):
+        return DOC_RECIBO
+    m_tipo = _RE_TIPO_DOCUMENTO.search(head)
+    if m_tipo:
+        tipo = m_tipo.group(1).lower()
+        if 'declara' in tipo and 'compensa' in tipo:
+            return DOC_DECLARACAO_COMPENSACAO
+        if 'ressarc' in tipo or 'restitui' in tipo:
+            return DOC_PEDIDO_CREDITO
+    # Sem 'Tipo de Documento' reconhecível: títulos/rótulos característicos
+    if _RE_DECLARACAO.search(head):
+        return DOC_DECLARACAO_COMPENSACAO
+    if _RE_PEDIDO.search(head):
+        return DOC_PEDIDO_CREDITO
+    if _RE_PERDCOMP.search(head):
+        return DOC_PERDCOMP
+    return None
+
+
+def _first_page_text(source: Any) -> Optional[str]:
+    # Roda no processo de extração (utils.pdf_sandbox)
+    from pdf import iter_page_texts
+    from utils.pdf_cache import open_source
+
+    with open_source(source) as stream:
+        for _number, _total, page_text in iter_page_texts(stream):
+            return page_text
+    return None
+
+
+def sniff_document_type(source: Any, content_hash: Optional[str] = None) -> Optional[str]:
+    """Classifica um PDF lendo somente a primeira página.
+
+    Se o texto já estiver no cache de extração (``content_hash``), o pypdf nem
+    é aberto. ``source`` segue ``utils.pdf_cache.read_upload``. A página é lida
+    no pool de ``utils.pdf_sandbox`` (pode levantar ``ExtractionLimitError``).
+    """
+    from utils import pdf_sandbox
+    from utils.pdf_cache import get_text_cache
+
+    cached = get_text_cache().get(content_hash)
+    if cached is not None:
+        return classify_header(cached)
+    page_text = pdf_sandbox.run(_first_page_text, source)
+    return classify_header(page_text) if page_text is not None else None
+
+
+@dataclass
+class ClassifiedDocument:
+    """Resultado de ``parse_documento``: tipo identificado e campos do parser."""
+    tipo: Optional[str] = None
+    parsed: Any = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'tipo': self.tipo,
+            'parsed': self.parsed.as_dict() if self.parsed is not None else None,
+        }
+
+
+def parse_documento(txt: str) -> ClassifiedDocument:
+    """Classifica pelo cabeçalho e aplica o ``parse_*`` do tipo encontrado.
+
+    Função de módulo (picklable) para uso com ``utils.pdf_pool`` em lotes com
+    tipos de documento misturados.
+    """
+    tipo = classify_header(txt)
+    if tipo is None:
+        return ClassifiedDocument()
+    return ClassifiedDocument(tipo=tipo, parsed=PARSERS[tipo](txt))
@@ -0,0 +1,383 @@
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+__all__ = [
+    'DOCUMENT_KINDS',
+    'SyntheticDocument',
+    'generate_document',
+    'generate_corpus',
+    'render_pdf',
+    'compare_fields',
+    'text_line_accuracy',
+]
+
+# Tipo de documento sintético -> parsers que devem extrair todos os campos
+# esperados dele (o primeiro é o usado na importação daquele tipo)
+DOCUMENT_KINDS: Dict[str, Sequence[str]] = {
+    'ressarcimento': ('parse_ressarcimento_text', 'parse_pedido_credito_text'),
+    'restituicao': ('parse_pedido_credito_text', 'parse_ressarcimento_text'),
+    'declaracao': ('parse_declaracao_compensacao_text',),
+    'recibo': ('parse_recibo_pedido_credito_text',),
+    'credito_conta': ('parse_credito_em_conta_text',),
+}
+
+_FRASES = (
+    'Os dados informados neste documento são de responsabilidade do contribuinte',
+    'As informações prestadas estão sujeitas à verificação pela autoridade fiscal',
+    'Este documento foi gerado pelo programa gerador da declaração',
+    'A autenticidade deste documento pode ser confirmada na página da Receita Federal',
+    'O contribuinte declara que as informações são verdadeiras',
+    'Mantenha este comprovante junto aos seus documentos fiscais',
+)
+_PALAVRAS = (
+    'contribuinte', 'informações', 'declarado', 'processo', 'sistema', 'fiscal',
+    'programa', 'gerador', 'autenticidade', 'comprovante', 'responsabilidade',
+)
+_TRIBUTOS = ('IRPJ', 'CSLL', 'PIS', 'COFINS', 'IPI')
+_DENOMINACOES = (
+    'Estimativa mensal', 'Lucro real anual', 'Não cumulativo', 'Faturamento', 'Retenção na fonte',
+)
+_CABECALHOS = (
+    'MINISTÉRIO DA FAZENDA',
+    'SECRETARIA ESPECIAL DA RECEITA FEDERAL DO BRASIL',
+)
+
+
+@dataclass
+class SyntheticDocument:
+    """Documento sintético com os valores que os parsers devem extrair dele."""
+    kind: str
+    seed: int
+    pages: List[str]
+    # Campo do resultado ``parse_*`` -> valor esperado (Decimal para valores,
+    # ``debitos`` como a lista de dicts do parser)
+    expected: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.pages)
+
+    @property
+    def parsers(self) -> Sequence[str]:
+        return DOCUMENT_KINDS[self.kind]
+
+
+# --- Valores aleatórios -----------------------------------------------------
+
+def _cnpj(r: random.Random) -> str:
+    # CNPJ com dígitos verificadores válidos: "12.345.678/0001-95"
+    base = [r.randint(0, 9) for _ in range(8)] + [0, 0, 0, 1]
+    for pesos in ((5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2), (6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2)):
+        resto = sum(d * p for d, p in zip(base, pesos)) % 11
+        base.append(0 if resto < 2 else 11 - resto)
+    d = ''.join(map(str, base))
+    return f"{d[:2]}.{d[2:5]}.{d[5:8]}/{d[8:12]}-{d[12:]}"
+
+
+def _perdcomp(r: random.Random) -> str:
+    # Sequencial.controle.data(ddmmaa).1.tipo.nn-nnnn
+    data = f"{r.randint(1, 28):02d}{r.randint(1, 12):02d}{r.randint(18, 24):02d}"
+    return (f"{r.randint(10000, 99999)}.{r.randint(10000, 99999)}.{data}"
+            f".1.{r.randint(1, 7)}.{r.randint(10, 99)}-{r.randint(1000, 9999)}")
+
+
+def _data(r: random.Random, ano: Optional[int] = None) -> str:
+    return f"{r.randint(1, 28):02d}/{r.randint(1, 12):02d}/{ano or r.randint(2018, 2024)}"
+
+
+def _valor(r: random.Random) -> tuple[str, Decimal]:
+    # ("123.456,78", Decimal("123456.78")), de centavos a dezenas de milhões
+    centavos = r.randint(1, 10 ** r.randint(3, 10))
+    inteiro, frac = divmod(centavos, 100)
+    texto = f"{inteiro:,}".replace(',', '.') + f",{frac:02d}"
+    return texto, Decimal(f"{inteiro}.{frac:02d}")
+
+
+# --- Ruído de layout ----------------------------------------------------------
+
+def _ruido(r: random.Random, linhas: int) -> List[str]:
+    saida = []
+    for _ in range(linhas):
+        if r.random() < 0.5:
+            saida.append(r.choice(_FRASES) + '.')
+        else:
+            saida.append(' '.join(r.choice(_PALAVRAS) for _ in range(r.randint(4, 12))))
+    return saida
+
+
+def _rotulo(r: random.Random, rotulo: str, valor: str, noise: bool) -> str:
+    # "Rótulo: valor" com as variações de espaçamento do texto extraído
+    if not noise:
+        return f"{rotulo}: {valor}"
+    separador = r.choice((': ', ':  ', ' : ', ':\t', ':\u00a0', ' '))
+    return f"{rotulo}{separador}{valor}{r.choice(('', '', ' ', '  '))}"
+
+
+def _paginar(r: random.Random, linhas: List[str], noise: bool, por_pagina: int = 45) -> List[str]:
+    # Quebra em páginas com cabeçalho/rodapé (só com ruído de layout)
+    if not noise:
+        return ["\n".join(linhas)]
+    blocos = [linhas[i:i + por_pagina] for i in range(0, len(linhas), por_pagina)] or [[]]
+    total = len(blocos)
+    paginas = []
+    for numero, bloco in enumerate(blocos, start=1):
+        topo = list(_CABECALHOS) if numero == 1 or r.random() < 0.5 else []
+        paginas.append("\n".join(topo + bloco + [f"Página {numero} de {total}"]))
+    return paginas
+
+
+# --- Documentos ---------------------------------------------------------------
+
+def _doc_pedido(r: random.Random, ressarcimento: bool, noise: bool, noise_lines: int):
+    cnpj, perdcomp = _cnpj(r), _perdcomp(r)
+    criacao = _data(r, 2024)
+    valor_txt, valor = _valor(r)
+    esperado: Dict[str, Any] = {
+        'cnpj': cnpj.replace('.', '').replace('/', '').replace('-', ''),
+        'perdcomp': perdcomp,
+        'data_criacao': criacao,
+        'valor_pedido': valor,
+    }
+    linhas = [
+        'PEDIDO ELETRÔNICO DE RESTITUIÇÃO OU RESSARCIMENTO',
+        f"CNPJ: {cnpj} {perdcomp}",
+        _rotulo(r, 'Data de Criação', criacao, noise),
+    ] + _ruido(r, noise_lines // 2)
+    if ressarcimento:
+        tributo = r.choice(('IPI', 'PIS/Pasep Não Cumulativo', 'Cofins Não Cumulativa'))
+        ano = str(r.randint(2018, 2024))
+        trimestre = str(r.randint(1, 4))
+        linhas += [
+            _rotulo(r, 'Tipo de Documento', 'Pedido de Ressarcimento', noise),
+            _rotulo(r, 'Tipo de Crédito', tributo, noise),
+            _rotulo(r, 'Ano', ano, noise),
+            f"{trimestre}º Trimestre",
+            f"Valor do Pedido de Ressarcimento {valor_txt}",
+        ]
+        esperado.update(metodo_credito='Pedido de ressarcimento', tipo_credito=tributo,
+                        ano=ano, trimestre=trimestre, codigo_receita=None, data_arrecadacao=None)
+    else:
+        periodo = _data(r)
+        codigo = str(r.randint(1000, 9999))
+        arrecadacao = _data(r)
+        linhas += [
+            _rotulo(r, 'Tipo de Documento', 'Pedido de Restituição', noise),
+            _rotulo(r, 'Tipo de Crédito', 'Pagamento Indevido ou a Maior', noise),
+            f"Valor do Pedido de Restituição {valor_txt}",
+            'DETALHAMENTO DO DARF',
+            _rotulo(r, 'Período de Apuração', periodo, noise),
+            _rotulo(r, 'Código da Receita', codigo, noise),
+            _rotulo(r, 'Data de Arrecadação', arrecadacao, noise),
+        ]
+        esperado.update(metodo_credito='Pedido de restituição', tipo_credito='Pagamento Indevido ou a Maior',
+                        ano=None, trimestre=None, periodo_apuracao_credito=periodo,
+                        codigo_receita=codigo, data_arrecadacao=arrecadacao)
+    return linhas + _ruido(r, noise_lines - noise_lines // 2), esperado
+
+
+def _doc_declaracao(r: random.Random, debitos: int, noise: bool, noise_lines: int):
+    cnpj, perdcomp, inicial = _cnpj(r), _perdcomp(r), _perdcomp(r)
+    criacao = _data(r, 2024)
+    original_txt, original = _valor(r)
+    vinculo = r.choice((None, 'ressarcimento', 'restituição'))
+    linhas = [
+        'DECLARAÇÃO DE COMPENSAÇÃO',
+        f"PER/DCOMP {perdcomp}",
+        f"CNPJ: {cnpj} {perdcomp}",
+        _rotulo(r, 'Tipo de Documento', 'Declaração de Compensação', noise),
+        _rotulo(r, 'Data de Criação', criacao, noise),
+        _rotulo(r, 'Nº do PER/DCOMP inicial', inicial, noise),
+    ]
+    if vinculo:
+        linhas.append(f"Compensação vinculada a um pedido de {vinculo}")
+    linhas += _ruido(r, noise_lines // 2) + [
+        'CRÉDITO PAGAMENTO INDEVIDO OU A MAIOR',
+        f"Valor Original do Crédito Inicial {original_txt}",
+        'DÉBITOS COMPENSADOS',
+    ]
+    esperado_debitos = []
+    for item in range(1, debitos + 1):
+        codigo = str(r.randint(1000, 9999))
+        denominacao = r.choice(_DENOMINACOES)
+        periodo = f"{r.randint(1, 12):02d}/{r.randint(2018, 2024)}"
+        valor_txt, valor = _valor(r)
+        linhas += [
+            f"{item:03d}. Débito {r.choice(_TRIBUTOS)}",
+            _rotulo(r, 'Código da Receita', codigo, noise),
+            _rotulo(r, 'Denominação', denominacao, noise),
+            _rotulo(r, 'Período de Apuração', periodo, noise),
+            f"Valor do Débito {valor_txt}",
+        ]
+        if noise and r.random() < 0.2:
+            linhas += _ruido(r, 1)
+        esperado_debitos.append({
+            'item': f"{item:03d}",
+            'codigo_receita_denominacao': f"{codigo} - {denominacao}",
+            'periodo_apuracao_debito': periodo,
+            'valor': valor,
+        })
+    metodo = {
+        None: 'Declaração de Compensação',
+        'ressarcimento': 'Compensação vinculada a um pedido de ressarcimento',
+        'restituição': 'Compensação vinculada a um pedido de restituição',
+    }[vinculo]
+    esperado = {
+        'cnpj': cnpj.replace('.', '').replace('/', '').replace('-', ''),
+        'perdcomp': perdcomp,
+        'perdcomp_inicial': inicial,
+        'metodo_credito': metodo,
+        'data_criacao': criacao,
+        'valor_original_credito_inicial': original,
+        'debitos': esperado_debitos,
+    }
+    return linhas + _ruido(r, noise_lines - noise_lines // 2), esperado
+
+
+def _doc_recibo(r: random.Random, noise: bool, noise_lines: int):
+    numero = _perdcomp(r)
+    controle = f"{r.randint(10, 99)}.{r.randint(10, 99)}.{r.randint(10, 99)}.{r.randint(10, 99)}.{r.randint(10, 99)}-{r.randint(10, 99)}"
+    transmissao = _data(r, 2024)
+    recebido = _data(r, 2024)
+    hora = f"{r.randint(0, 23):02d}:{r.randint(0, 59):02d}:{r.randint(0, 59):02d}"
+    autenticacao = str(r.randint(10 ** 9, 10 ** 12))
+    separador = r.choice((' ', '\n')) if noise else ' '
+    linhas = [
+        'RECIBO DE ENTREGA DE PEDIDO DE CRÉDITO',
+        _rotulo(r, 'Número do Documento', numero, noise),
+        _rotulo(r, 'Número de Controle', controle, noise),
+        _rotulo(r, 'Data de Transmissão', transmissao, noise),
+    ] + _ruido(r, noise_lines) + [
+        f"O documento foi recebido em {recebido} às {hora}{separador}{autenticacao}",
+    ]
+    esperado = {
+        'numero_documento': numero,
+        'numero_controle': controle,
+        'data_transmissao': transmissao,
+        'data_hora_recebimento': f"{recebido} {hora}",
+        'autenticacao_serpro': autenticacao,
+    }
+    return linhas, esperado
+
+
+def _doc_credito_conta(r: random.Random, noise: bool, noise_lines: int):
+    perdcomp = _perdcomp(r)
+    data = _data(r, 2024)
+    valor_txt, valor = _valor(r)
+    linhas = _ruido(r, noise_lines // 2) + [
+        'NOTIFICAÇÃO DE CRÉDITO EM CONTA',
+        f"Informamos que, em {data}, foi creditado em sua conta bancária o valor de R$ {valor_txt}",
+        f"referente ao Perdcomp nº {perdcomp}",
+    ] + _ruido(r, noise_lines - noise_lines // 2)
+    return linhas, {'perdcomp': perdcomp, 'data_credito': data, 'valor_credito': valor}
+
+
+def generate_document(kind: str, seed: int, debitos: int = 20, noise_lines: int = 40,
+                      layout_noise: bool = True) -> SyntheticDocument:
+    """Documento sintético do tipo ``kind`` (ver ``DOCUMENT_KINDS``), determinístico por ``seed``.
+
+    ``layout_noise`` varia o espaçamento dos rótulos (tabs, NBSP, espaços
+    duplos), quebra o texto em páginas com cabeçalho e rodapé e intercala
+    parágrafos entre os blocos de débito; ``noise_lines`` é o total de linhas
+    de texto irrelevante.
+    """
+    r = random.Random(f"{kind}:{seed}")
+    if kind == 'ressarcimento':
+        linhas, esperado = _doc_pedido(r, True, layout_noise, noise_lines)
+    elif kind == 'restituicao':
+        linhas, esperado = _doc_pedido(r, False, layout_noise, noise_lines)
+    elif kind == 'declaracao':
+        linhas, esperado = _doc_declaracao(r, debitos, layout_noise, noise_lines)
+    elif kind == 'recibo':
+        linhas, esperado = _doc_recibo(r, layout_noise, noise_lines // 4)
+    elif kind == 'credito_conta':
+        linhas, esperado = _doc_credito_conta(r, layout_noise, noise_lines // 4)
+    else:
+        raise ValueError(f"Tipo de documento sintético desconhecido: {kind}")
+    return SyntheticDocument(kind=kind, seed=seed, pages=_paginar(r, linhas, layout_noise), expected=esperado)
+
+
+def generate_corpus(kinds: Optional[Sequence[str]] = None, per_kind: int = 100, seed: int = 0,
+                    **kwargs: Any) -> Iterator[SyntheticDocument]:
+    """``per_kind`` documentos de cada tipo, com sementes ``seed``, ``seed + 1``..."""
+    for kind in kinds or DOCUMENT_KINDS:
+        for n in range(per_kind):
+            yield generate_document(kind, seed + n, **kwargs)
+
+
+# --- PDF ----------------------------------------------------------------------
+
+def _pdf_string(linha: str) -> bytes:
+    texto = linha.replace('\t', ' ').replace('\u00a0', ' ').encode('cp1252', errors='replace')
+    return b'(' + texto.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+def render_pdf(pages: Sequence[str]) -> bytes:
+    """PDF mínimo (Helvetica, WinAnsi) com uma página A4 por item de ``pages``.
+
+    Uma linha de texto por linha do PDF, para medir ``pdf.extract_text`` e os
+    parsers sobre o texto que o pypdf devolve.
+    """
+    objetos: List[bytes] = [b"<< /Type /Catalog /Pages 2 0 R >>", b"", b""]
+    objetos[2] = b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"
+    kids = []
+    for pagina in pages:
+        linhas = pagina.split("\n")
+        conteudo = b"BT /F1 9 Tf 11 TL 36 806 Td " + b" ".join(_pdf_string(l) + b" '" for l in linhas) + b" ET"
+        pagina_id = len(objetos) + 1
+        kids.append(pagina_id)
+        objetos.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {pagina_id + 1} 0 R >>".encode()
+        )
+        objetos.append(b"<< /Length %d >>\nstream\n" % len(conteudo) + conteudo + b"\nendstream")
+    objetos[1] = f"<< /Type /Pages /Kids [{' '.join(f'{k} 0 R' for k in kids)}] /Count {len(kids)} >>".encode()
+
+    saida = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for numero, objeto in enumerate(objetos, start=1):
+        offsets.append(len(saida))
+        saida += b"%d 0 obj\n" % numero + objeto + b"\nendobj\n"
+    xref = len(saida)
+    saida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    for offset in offsets:
+        saida += b"%010d 00000 n \n" % offset
+    saida += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objetos) + 1, xref)
+    return bytes(saida)
+
+
+# --- Comparação ---------------------------------------------------------------
+
+def compare_fields(expected: Dict[str, Any], parsed: Any) -> Dict[str, bool]:
+    """Campo -> extraído corretamente, para os campos de ``expected``.
+
+    Listas de dicts (``debitos``) também são comparadas por chave, como
+    ``debitos.valor``: certo só se todos os itens baterem.
+    """
+    resultado = {}
+    for nome, valor in expected.items():
+        obtido = getattr(parsed, nome, None)
+        resultado[nome] = obtido == valor
+        if isinstance(valor, list) and valor and isinstance(valor[0], dict):
+            obtidos = obtido if isinstance(obtido, list) and len(obtido) == len(valor) else None
+            for chave in valor[0]:
+                resultado[f"{nome}.{chave}"] = obtidos is not None and all(
+                    isinstance(o, dict) and o.get(chave) == e[chave] for o, e in zip(obtidos, valor)
+                )
+    return resultado
+
+
+def _linhas(texto: str) -> List[str]:
+    return [' '.join(l.split()) for l in texto.splitlines() if l.strip()]
+
+
+def text_line_accuracy(original: str, extracted: str) -> float:
+    """Fração das linhas de ``original`` presentes (espaços normalizados) em ``extracted``."""
+    esperadas = _linhas(original)
+    if not esperadas:
+        return 1.0
+    obtidas = set(_linhas(extracted))
+    return sum(l in obtidas for l in esperadas) / len(esperadas)
@@ -1,7 +1,102 @@
 import re
 from decimal import Decimal, InvalidOperation
 from dataclasses import dataclass, field
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Callable, Iterator, Tuple
+
+
+# Versão dos parsers, gravada junto do texto de cada documento importado
+# (``DocumentoImportado``). Incrementar ao mudar o que algum ``parse_*``
+# extrai; ``manage.py reparse_imports`` compara os documentos antigos com a
+# versão atual.
+PARSER_VERSION = 1
+
+# Padrões pré-compilados (o módulo é chamado uma vez por PDF importado e em
+# lote; compilar aqui evita a consulta ao cache do ``re`` e o tratamento de
+# flags em cada uma das dezenas de buscas por documento).
+_I = re.IGNORECASE
+_IS = re.IGNORECASE | re.DOTALL
+
+_RE_NORMALIZE = re.compile(r"[\t\u00A0]+")
+_RE_NON_DIGIT = re.compile(r"[^0-9]")
+_RE_NON_PERDCOMP_CHARS = re.compile(r"[^0-9.\-/]")
+_RE_WHITESPACE = re.compile(r"\s+")
+_RE_DIGIT = re.compile(r"\d")
+_RE_SHORT_DECIMAL = re.compile(r"\d+\.\d{1,2}")
+_RE_MONEY = re.compile(r"([0-9.]+,\d{2})")
+_RE_DATE_OR_MONTH = re.compile(r"(\d{2}/\d{2}/\d{4}|\d{2}/\d{4})")
+_RE_AFTER_CNPJ = re.compile(r"(\d{5}[\d.\-]+\d{4})")
+
+# Candidatos a número de PER/DCOMP (em ordem de preferência)
+_RE_PERDCOMP_CANDIDATES = (
+    re.compile(r"\b\d{5,}\.\d{4,}\.\d{5,}\.\d\.\d\.\d{2}-\d{4}\b"),
+    re.compile(r"\b\d[\d.\-]{11,}\d\b"),
+)
+_RE_PERDCOMP_LOOSE = re.compile(r"\d[\d.\-\s]{11,}\d")
+
+# Rótulos comuns aos documentos de PER/DCOMP
+_RE_CNPJ = re.compile(r"CNPJ\s*[:\-]?\s*([0-9./-]{14,20})", _I)
+_RE_ANO = re.compile(r"\bAno\b\s*[:\-]?\s*(\d{4})", _I)
+_RE_TRIMESTRE = re.compile(r"(\d+)\s*º?\s*Trimestre", _I)
+_RE_VALOR_ORIGINAL_INICIAL = re.compile(r"Valor\s+Original\s+do\s+Cr[eé]dito\s+Inicial\s*[:\-]?\s*([0-9.]+,\d{2})", _I)
+_RE_BLOCO_CREDITO_PAGAMENTO = re.compile(r"CR[EÉ]DITO\s+PAGAMENTO\s+INDEVIDO\s+OU\s+A\s+MAIOR(.*?)(?=\n\s*[A-Z][A-Z ]{5,}|\Z)", _IS)
+_RE_DATA_CRIACAO = re.compile(r"Data\s+de\s+Cria[cç][aã]o\s*[:\-]?\s*(\d{2}/\d{2}/\d{4})", _I)
+_RE_TIPO_DOCUMENTO_LINHA = re.compile(r"Tipo\s+de\s+Documento\s*[:\-]?\s*(.+?)(?:\n|$)", _I)
+
+# Período de Apuração: o rótulo é localizado uma única vez e o valor é lido
+# logo após cada ocorrência (dd/mm/aaaa tem prioridade sobre mm/aaaa).
+_RE_PERIODO_LABEL = re.compile(r"Per[ií]odo\s+de\s+Apura[cç][aã]o", _I)
+_RE_PERIODO_VALOR = re.compile(r"\s*[:\-]?\s*(?:(\d{2}/\d{2}/\d{4})|(\d{2}/\d{4}))")
+
+# Blocos de débitos ("001. Débito ...") e seus campos
+_RE_DEBITO_HEADER = re.compile(r"^\s*(\d{1,3})\s*\.\s*D[eé]bito\s*", re.M)
+_RE_DEBITO_TITULO = re.compile(r"^\s*\d{1,3}\s*\.\s*D[eé]bito\s*(.*?)\s*(?:\r?\n|$)")
+_RE_DEBITO_CODIGO = re.compile(r"C[oó]digo\s*(?:da|de)\s*Receita\s*[:\-]?\s*([0-9.]+)", _I)
+_RE_DEBITO_DENOMINACAO = re.compile(r"Denomina[cç][aã]o\s*[:\-]?\s*(.+)", _I)
+_RE_DEBITO_PERIODO = re.compile(r"Per[ií]odo\s+de\s+Apura[cç][aã]o.*?(\d{2}/\d{2}/\d{4}|\d{2}/\d{4})", _IS)
+_RE_DEBITO_VALOR = re.compile(r"Valor\s*(?:do\s*D[eé]bito|Total)\s*[:\-]?\s*([0-9.]+,\d{2})", _I)
+
+# parse_ressarcimento_text
+_RE_RESSARC_INICIAL = re.compile(r"N[ºo°]\s*do\s+PER\s*/?\s*DCOMP\s+inicial\s*[:\-]?\s*([0-9A-Za-z./\-\s]+)", _I)
+_RE_RESSARC_AFTER_CNPJ = re.compile(r"\s*([0-9A-Za-z./\-]+)")
+_RE_RESSARC_PER = re.compile(r"PER\s*/?\s*DCOMP(?!\s*inicial)\s*(?:n[ºo]\s*)?[:\-]?\s*([0-9A-Za-z.\-]+)", _I)
+_RE_RESSARC_DECLARACAO = re.compile(r"Declara[cç][aã]o\s+de\s+Compensa[cç][aã]o\s*(?:n[ºo]\s*)?[:\-]?\s*([0-9A-Za-z.\-]+)", _I)
+_RE_RESSARC_TIPO_DOCUMENTO = re.compile(r"Tipo de Documento\s*[:\-]?\s*(.+)", _I)
+_RE_RESSARC_DATA_CRIACAO = re.compile(r"Data de Cria[cç][aã]o\s*[:\-]?\s*(\d{2}/\d{2}/\d{4})", _I)
+_RE_RESSARC_DATA_ARRECADACAO = re.compile(r"Data de Arrecada[cç][aã]o\s*[:\-]?\s*(\d{2}/\d{2}/\d{4})", _I)
+_RE_RESSARC_VALOR_PEDIDO = re.compile(r"Valor do Pedido.*?([0-9.]+,\d{2})", _IS)
+_RE_RESSARC_CODIGO_RECEITA = re.compile(r"C[oó]digo (?:da|de) Receita\s*[:\-]?\s*([0-9.]+)", _I)
+_RE_RESSARC_TIPO_CREDITO = re.compile(r"Tipo de Cr[eé]dito\s*[:\-]?\s*(.+)", _I)
+_RE_BLOCO_ORIGEM_CREDITO = re.compile(r"ORIGEM\s+DO\s+CR[EÉ]DITO(.*?)(?=\n\s*[A-Z][A-Z ]{5,}|\Z)", _IS)
+_RE_VALOR_TOTAL = re.compile(r"Valor\s+Total\s*[:\-]?\s*([0-9.]+,\d{2})", _I)
+
+# parse_declaracao_compensacao_text
+_RE_DECL_INICIAL = re.compile(r"(?:N[ºo°]\.?\s*do\s+|Nº\s+do\s+|Numero\s+do\s+)?PER\s*/?\s*DCOMP\s+inicial\s*[:\-]?\s*([0-9A-Za-z./\-\s]{15,35})", _I)
+_RE_DECL_HEADER = re.compile(r"(?:PERDCOMP|PER\s*/?\s*DCOMP)\s+(\d+[\d.\-]+)", _I)
+
+# parse_recibo_pedido_credito_text
+_RE_RECIBO_NUMERO_DOCUMENTO = re.compile(r"N[úu]mero\s+do\s+Documento\s*[:\-]?\s*([0-9A-Za-z./\-]+)", _I)
+_RE_RECIBO_NUMERO_CONTROLE = re.compile(r"N[úu]mero\s+de\s+Controle\s*[:\-]?\s*([0-9A-Za-z./\-]+)", _I)
+_RE_RECIBO_DATA_TRANSMISSAO = re.compile(r"Data\s+de\s+Transmiss[aã]o\s*[:\-]?\s*(\d{2}/\d{2}/\d{4})", _I)
+_RE_RECIBO_RECEBIMENTO = re.compile(r"em\s+(\d{2}/\d{2}/\d{4})\s+às\s+(\d{2}:\d{2}:\d{2})\s+(\d+)", _I)
+_RE_RECIBO_AUTENTICACAO = re.compile(r"às\s+(\d{2}:\d{2}:\d{2})\s+(\d+)", _I)
+
+# parse_credito_em_conta_text
+_RE_CONTA_DATA = re.compile(r"Informamos que,\s*em\s*(\d{2}/\d{2}/\d{4})", _I)
+_RE_CONTA_VALOR = re.compile(r"valor\s+de\s*(?:R\$\s*)?([0-9.\s]+,\d{2})", _I)
+_RE_CONTA_VALOR_CREDITO = re.compile(r"cr[eé]dito.*?(?:R\$\s*)?([0-9.\s]+,\d{2})", _IS)
+_RE_CONTA_PERDCOMP = re.compile(r"Perdcomp\s*(?:n[ºo]\s*)?[:\-]?\s*([0-9A-Za-z./\-]+)", _I)
+
+# parse_pedido_credito_text
+_RE_PEDIDO_PER = re.compile(r"(?:PERDCOMP|PER\s*/?\s*DCOMP)\s*(?:n[ºo]\s*)?[:\-]?\s*(\d+[\d.\-]+)", _I)
+_RE_PEDIDO_VALOR = re.compile(r"Valor\s+do\s+Pedido.*?([0-9.]+,\d{2})", _IS)
+_RE_PEDIDO_TIPO_CREDITO = re.compile(r"Tipo\s+de\s+Cr[eé]dito\s*[:\-]?\s*(.+?)(?:\n|$)", _I)
+_RE_PEDIDO_CODIGO_RECEITA = re.compile(r"C[oó]digo\s+(?:da|de)\s+Receita\s*[:\-]?\s*([0-9.]+)", _I)
+_RE_PEDIDO_DATA_ARRECADACAO = re.compile(r"Data\s+de\s+Arrecada[cç][aã]o\s*[:\-]?\s*(\d{2}/\d{2}/\d{4})", _I)
+
+
+def _normalize(txt: str) -> str:
+    # Normalizar tabs e espaços não separáveis
+    return _RE_NORMALIZE.sub(" ", txt)
 
 
 def _parse_ptbr_number(s: str) -> Optional[Decimal]:
@@ -18,7 +113,28 @@ def _parse_ptbr_number(s: str) -> Optional[Decimal]:
 def _clean_cnpj(s: str) -> str:
     if not s:
         return ""
-    return re.sub(r"[^0-9]", "", s)
+    return _RE_NON_DIGIT.sub("", s)
+
+
+def requires_fields(*fields: str) -> Callable:
+    """Declara os campos de que um parser precisa.
+
+    Quando todos estão preenchidos no texto parcial, a extração página a página
+    pode parar antes do fim do PDF. Parsers sem esta declaração (ex.: os que
+    coletam blocos de débitos) sempre recebem o documento inteiro.
+    """
+    def decorator(func: Callable) -> Callable:
+        func.required_fields = tuple(fields)
+        return func
+    return decorator
+
+
+def parser_is_satisfied(parser: Callable, parsed: Any) -> bool:
+    """Indica se ``parsed`` já contém todos os campos declarados por ``parser``."""
+    fields = getattr(parser, 'required_fields', None)
+    if not fields:
+        return False
+    return all(getattr(parsed, name, None) not in (None, '') for name in fields)
 
 
 def _looks_like_perdcomp(value: str | None) -> bool:
@@ -31,12 +147,12 @@ def _looks_like_perdcomp(value: str | None) -> bool:
         return False
     if candidate.lower().startswith('perdcomp'):
         return False
-    if re.fullmatch(r"\d+\.\d{1,2}", candidate):
+    if _RE_SHORT_DECIMAL.fullmatch(candidate):
         return False
     separator_count = sum(ch in '.-' for ch in candidate)
     if separator_count < 2:
         return False
-    return bool(re.search(r"\d", candidate)) and any(ch in candidate for ch in ('.', '-'))
+    return bool(_RE_DIGIT.search(candidate)) and any(ch in candidate for ch in ('.', '-'))
 
 
 def _find_perdcomp_candidate(text: str, exclude: Optional[List[str]] = None) -> Optional[str]:
@@ -44,19 +160,15 @@ def _find_perdcomp_candidate(text: str, exclude: Optional[List[str]] = None) ->
         return None
     excluded = {val.strip() for val in (exclude or []) if val}
     search_scope = text
-    patterns = (
-        r"\b\d{5,}\.\d{4,}\.\d{5,}\.\d\.\d\.\d{2}-\d{4}\b",
-        r"\b\d[\d.\-]{11,}\d\b",
-    )
-    for pattern in patterns:
-        for match in re.finditer(pattern, search_scope):
+    for pattern in _RE_PERDCOMP_CANDIDATES:
+        for match in pattern.finditer(search_scope):
             candidate = match.group(0).strip()
             if excluded and candidate in excluded:
                 continue
             if _looks_like_perdcomp(candidate):
                 return candidate
-    for loose_match in re.finditer(r"\d[\d.\-\s]{11,}\d", search_scope):
-        candidate = re.sub(r"\s+", "", loose_match.group(0)).strip(" .;,:")
+    for loose_match in _RE_PERDCOMP_LOOSE.finditer(search_scope):
+        candidate = _RE_WHITESPACE.sub("", loose_match.group(0)).strip(" .;,:")
         if excluded and candidate in excluded:
             continue
         if _looks_like_perdcomp(candidate):
@@ -64,6 +176,46 @@ def _find_perdcomp_candidate(text: str, exclude: Optional[List[str]] = None) ->
     return None
 
 
+def _find_periodo_apuracao(norm: str, fallback_window: int = 0) -> Optional[str]:
+    """Período de Apuração do crédito em uma única varredura do rótulo.
+
+    Prioridade (igual às buscas sequenciais anteriores): primeira ocorrência
+    seguida de dd/mm/aaaa; senão a primeira seguida de mm/aaaa; senão, com
+    ``fallback_window``, a primeira data nos caracteres após o primeiro rótulo.
+    """
+    first_label = None
+    mes_ano = None
+    for label in _RE_PERIODO_LABEL.finditer(norm):
+        if first_label is None:
+            first_label = label
+        m = _RE_PERIODO_VALOR.match(norm, label.end())
+        if m:
+            if m.group(1):
+                return m.group(1)
+            if mes_ano is None:
+                mes_ano = m.group(2)
+    if mes_ano is not None:
+        return mes_ano
+    if first_label is not None and fallback_window:
+        tail = norm[first_label.end():first_label.end() + fallback_window]
+        m = _RE_DATE_OR_MONTH.search(tail)
+        if m:
+            return m.group(1)
+    return None
+
+
+def _iter_debit_blocks(norm: str) -> Iterator[Tuple[str, str]]:
+    """Gera ``(numero_do_item, bloco)`` para cada bloco "N. Débito".
+
+    Cada bloco vai do seu cabeçalho até o cabeçalho seguinte (ou o fim do
+    texto); os cabeçalhos são localizados em uma única varredura.
+    """
+    headers = list(_RE_DEBITO_HEADER.finditer(norm))
+    for idx, header in enumerate(headers):
+        end = headers[idx + 1].start() if idx + 1 < len(headers) else len(norm)
+        yield header.group(1), norm[header.start():end]
+
+
 @dataclass
 class PDFParsed:
     cnpj: Optional[str] = None
@@ -120,15 +272,15 @@ def parse_ressarcimento_text(txt: str) -> PDFParsed:
         return p
 
     # Normalizar quebras e espaços múltiplos para facilitar regex com DOTALL minimalista
-    norm = re.sub(r"[\t\u00A0]+", " ", txt)
+    norm = _normalize(txt)
 
     # ETAPA 1: Número do PER/DCOMP inicial (seção "Nº do PER/DCOMP inicial")
     # Este é o número que identifica a adesão original e deve ser capturado PRIMEIRO
-    m_initial = re.search(r"N[ºo°]\s*do\s+PER\s*/?\s*DCOMP\s+inicial\s*[:\-]?\s*([0-9A-Za-z./\-\s]+)", norm, flags=re.IGNORECASE)
+    m_initial = _RE_RESSARC_INICIAL.search(norm)
     if m_initial:
         raw_initial = m_initial.group(1).strip()
         # Remove letras e mantém apenas números, pontos, traços e barras
-        candidate_initial = re.sub(r"[^0-9.\-/]", "", raw_initial)
+        candidate_initial = _RE_NON_PERDCOMP_CHARS.sub("", raw_initial)
         candidate_initial = candidate_initial.strip(" .;,:")
         if _looks_like_perdcomp(candidate_initial):
             p.perdcomp_inicial = candidate_initial
@@ -143,12 +295,12 @@ def parse_ressarcimento_text(txt: str) -> PDFParsed:
 
     # ETAPA 2: Capturar CNPJ e o PERDCOMP do cabeçalho (número da declaração atual)
     # Este número aparece no topo do documento, geralmente destacado, e é o número desta declaração
-    m_cnpj = re.search(r"CNPJ\s*[:\-]?\s*([0-9./-]{14,20})", norm, flags=re.IGNORECASE)
+    m_cnpj = _RE_CNPJ.search(norm)
     if m_cnpj:
         p.cnpj = _clean_cnpj(m_cnpj.group(1))
         # O número que aparece após CNPJ (geralmente destacado) é o PERDCOMP da declaração
         tail_segment = norm[m_cnpj.end(): m_cnpj.end() + 120]
-        m_after = re.match(r"\s*([0-9A-Za-z./\-]+)", tail_segment)
+        m_after = _RE_RESSARC_AFTER_CNPJ.match(tail_segment)
         if m_after:
             candidate = m_after.group(1).strip().strip(" .;,:")
             # Este é o PERDCOMP da DECLARAÇÃO (diferente do inicial)
@@ -166,14 +318,14 @@ def parse_ressarcimento_text(txt: str) -> PDFParsed:
 
     # ETAPA 3: Fallbacks adicionais para capturar número da declaração
     if not p.perdcomp:
-        m_per = re.search(r"PER\s*/?\s*DCOMP(?!\s*inicial)\s*(?:n[ºo]\s*)?[:\-]?\s*([0-9A-Za-z.\-]+)", norm, flags=re.IGNORECASE)
+        m_per = _RE_RESSARC_PER.search(norm)
         if m_per:
             candidate = m_per.group(1).strip()
             if _looks_like_perdcomp(candidate) and candidate != p.perdcomp_inicial:
                 p.perdcomp = candidate
 
     if not p.perdcomp:
-        m_decl = re.search(r"Declara[cç][aã]o\s+de\s+Compensa[cç][aã]o\s*(?:n[ºo]\s*)?[:\-]?\s*([0-9A-Za-z.\-]+)", norm, flags=re.IGNORECASE)
+        m_decl = _RE_RESSARC_DECLARACAO.search(norm)
         if m_decl:
             candidate = m_decl.group(1).strip()
             if _looks_like_perdcomp(candidate) and candidate != p.perdcomp_inicial:
@@ -190,7 +342,7 @@ def parse_ressarcimento_text(txt: str) -> PDFParsed:
         p.perdcomp = p.perdcomp_inicial
 
     # Tipo de Documento -> mapeia para metodo_credito conforme opções do sistema
-    m = re.search(r"Tipo de Documento\s*[:\-]?\s*(.+)", norm, flags=re.IGNORECASE)
+    m = _RE_RESSARC_TIPO_DOCUMENTO.search(norm)
     if m:
         raw = m.group(1).strip()
         # Heurística simples para mapear para choices
@@ -214,81 +366,64 @@ def parse_ressarcimento_text(txt: str) -> PDFParsed:
             p.metodo_credito = raw
 
     # Data de Criação dd/mm/aaaa
-    m = re.search(r"Data de Cria[cç][aã]o\s*[:\-]?\s*(\d{2}/\d{2}/\d{4})", norm, flags=re.IGNORECASE)
+    m = _RE_RESSARC_DATA_CRIACAO.search(norm)
     if m:
         p.data_criacao = m.group(1)
 
     # Data de Arrecadação dd/mm/aaaa (para Pedido de restituição)
-    m = re.search(r"Data de Arrecada[cç][aã]o\s*[:\-]?\s*(\d{2}/\d{2}/\d{4})", norm, flags=re.IGNORECASE)
+    m = _RE_RESSARC_DATA_ARRECADACAO.search(norm)
     if m:
         p.data_arrecadacao = m.group(1)
 
     # Valor do Pedido (Ressarcimento/Restituição)
-    m = re.search(r"Valor do Pedido.*?([0-9.]+,\d{2})", norm, flags=re.IGNORECASE | re.DOTALL)
+    m = _RE_RESSARC_VALOR_PEDIDO.search(norm)
     if m:
         p.valor_pedido = _parse_ptbr_number(m.group(1))
 
-    # Período de Apuração (Crédito): pode vir como dd/mm/aaaa (ex.: 30/06/2020) ou mm/aaaa.
-    # 1) Captura direta com dd/mm/aaaa
-    m = re.search(r"(?:\b\d+\s*\.\s*)?Per[ií]odo\s+de\s+Apura[cç][aã]o\s*[:\-]?\s*(\d{2}/\d{2}/\d{4})", norm, flags=re.IGNORECASE)
-    if m:
-        # Manter como aparece no PDF (dd/mm/aaaa)
-        p.periodo_apuracao_credito = m.group(1)
-    else:
-        # 2) Captura direta com mm/aaaa
-        m = re.search(r"(?:\b\d+\s*\.\s*)?Per[ií]odo\s+de\s+Apura[cç][aã]o\s*[:\-]?\s*(\d{2}/\d{4})", norm, flags=re.IGNORECASE)
-        if m:
-            p.periodo_apuracao_credito = m.group(1)
-        else:
-            # 3) Fallback: encontra o rótulo e procura a primeira data próxima em até ~120 caracteres
-            label = re.search(r"(?:\b\d+\s*\.\s*)?Per[ií]odo\s+de\s+Apura[cç][aã]o", norm, flags=re.IGNORECASE)
-            if label:
-                tail = norm[label.end():label.end() + 200]
-                m = re.search(r"(\d{2}/\d{2}/\d{4}|\d{2}/\d{4})", tail)
-                if m:
-                    p.periodo_apuracao_credito = m.group(1)
+    # Período de Apuração (Crédito): pode vir como dd/mm/aaaa (ex.: 30/06/2020) ou mm/aaaa,
+    # mantido como aparece no PDF. Fallback: primeira data em até 200 caracteres após o rótulo.
+    p.periodo_apuracao_credito = _find_periodo_apuracao(norm, fallback_window=200)
 
     # Código da Receita
-    m = re.search(r"C[oó]digo (?:da|de) Receita\s*[:\-]?\s*([0-9.]+)", norm, flags=re.IGNORECASE)
+    m = _RE_RESSARC_CODIGO_RECEITA.search(norm)
     if m:
         p.codigo_receita = m.group(1).strip()
 
     # Ano
-    m = re.search(r"\bAno\b\s*[:\-]?\s*(\d{4})", norm, flags=re.IGNORECASE)
+    m = _RE_ANO.search(norm)
     if m:
         p.ano = m.group(1)
 
     # Trimestre (e.g., 1º Trimestre)
-    m = re.search(r"(\d+)\s*º?\s*Trimestre", norm, flags=re.IGNORECASE)
+    m = _RE_TRIMESTRE.search(norm)
     if m:
         p.trimestre = m.group(1)
 
     # Tipo de Crédito
-    m = re.search(r"Tipo de Cr[eé]dito\s*[:\-]?\s*(.+)", norm, flags=re.IGNORECASE)
+    m = _RE_RESSARC_TIPO_CREDITO.search(norm)
     if m:
         p.tipo_credito = m.group(1).strip()
 
     # Extração de múltiplos Débitos em 'Declaração de Compensação'
     # Busca blocos iniciando com número e a palavra Débito
     debitos: List[Dict[str, Any]] = []
-    for blk in re.finditer(r"(?ms)^\s*(\d{1,3})\s*\.\s*D[eé]bito\s*(.*?)(?=^\s*\d{1,3}\s*\.\s*D[eé]bito|\Z)", norm):
-        block = blk.group(0)
-        item_number = blk.group(1).strip() if blk.group(1) else None
+    for item_number, block in _iter_debit_blocks(norm):
+        item_number = item_number.strip() if item_number else None
         if item_number:
             item_number = item_number.zfill(3)
         # Tenta obter um título do débito a partir da primeira linha
         titulo = None
-        mtitle = re.search(r"^\s*\d{1,3}\s*\.\s*D[eé]bito\s*(.*?)\s*(?:\r?\n|$)", block)
+        mtitle = _RE_DEBITO_TITULO.search(block)
         if mtitle:
             t = mtitle.group(1).strip()
             titulo = t if t else None
         # Código da Receita e Denominação
         cod = None
         denom = None
-        mcode = re.search(r"C[oó]digo\s*(?:da|de)\s*Receita\s*[:\-]?\s*([0-9.]+)\s*", block, flags=re.IGNORECASE)
+        mcode = _RE_DEBITO_CODIGO.search(block)
         if mcode:
             cod = mcode.group(1).strip()
-        mden = re.search(r"Denomina[cç][aã]o\s*[:\-]?\s*(.+)", block, flags=re.IGNORECASE)
+        mden = _RE_DEBITO_DENOMINACAO.search(block)
         if mden:
             # Pega até fim de linha
             denom = mden.group(1).strip().splitlines()[0].strip()
@@ -296,15 +431,15 @@ def parse_ressarcimento_text(txt: str) -> PDFParsed:
             denom = f"{cod or ''} {titulo or ''}".strip()
         # Período de Apuração (Débito)
         per_d = None
-        mperd = re.search(r"Per[ií]odo\s+de\s+Apura[cç][aã]o.*?(\d{2}/\d{2}/\d{4}|\d{2}/\d{4})", block, flags=re.IGNORECASE | re.DOTALL)
+        mperd = _RE_DEBITO_PERIODO.search(block)
         if mperd:
             per_d = mperd.group(1)
         # Valor (procurar 'Valor do Débito' ou 'Total')
         val = None
-        mval = re.search(r"Valor\s*(?:do\s*D[eé]bito|Total)\s*[:\-]?\s*([0-9.]+,\d{2})", block, flags=re.IGNORECASE)
+        mval = _RE_DEBITO_VALOR.search(block)
         if not mval:
             # fallback: primeiro valor monetário no bloco
-            mval = re.search(r"([0-9.]+,\d{2})", block)
+            mval = _RE_MONEY.search(block)
         if mval:
             val = _parse_ptbr_number(mval.group(1))
         if cod or denom or per_d or val is not None:
@@ -319,24 +454,24 @@ def parse_ressarcimento_text(txt: str) -> PDFParsed:
 
     # Valor Total na Origem do Crédito
     # Busca o bloco 'ORIGEM DO CRÉDITO' e captura a linha 'Valor Total'
-    m_origem = re.search(r"ORIGEM\s+DO\s+CR[EÉ]DITO(.*?)(?=\n\s*[A-Z][A-Z ]{5,}|\Z)", norm, flags=re.IGNORECASE | re.DOTALL)
+    m_origem = _RE_BLOCO_ORIGEM_CREDITO.search(norm)
     if m_origem:
         bloco = m_origem.group(1)
-        mv = re.search(r"Valor\s+Total\s*[:\-]?\s*([0-9.]+,\d{2})", bloco, flags=re.IGNORECASE)
+        mv = _RE_VALOR_TOTAL.search(bloco)
         if mv:
             p.valor_total_origem = _parse_ptbr_number(mv.group(1))
 
     # Valor Original do Crédito Inicial (para documentos sem 'Origem do Crédito')
     # Normalmente aparece no bloco 'CRÉDITO PAGAMENTO INDEVIDO OU A MAIOR'
-    m_credito = re.search(r"CR[EÉ]DITO\s+PAGAMENTO\s+INDEVIDO\s+OU\s+A\s+MAIOR(.*?)(?=\n\s*[A-Z][A-Z ]{5,}|\Z)", norm, flags=re.IGNORECASE | re.DOTALL)
+    m_credito = _RE_BLOCO_CREDITO_PAGAMENTO.search(norm)
     if m_credito:
         bloco_c = m_credito.group(1)
-        mvo = re.search(r"Valor\s+Original\s+do\s+Cr[eé]dito\s+Inicial\s*[:\-]?\s*([0-9.]+,\d{2})", bloco_c, flags=re.IGNORECASE)
+        mvo = _RE_VALOR_ORIGINAL_INICIAL.search(bloco_c)
         if mvo:
             p.valor_original_credito_inicial = _parse_ptbr_number(mvo.group(1))
     # Fallback global: procurar a mesma label no documento todo caso a seção tenha outro título
     if p.valor_original_credito_inicial is None:
-        mg = re.search(r"Valor\s+Original\s+do\s+Cr[eé]dito\s+Inicial\s*[:\-]?\s*([0-9.]+,\d{2})", norm, flags=re.IGNORECASE)
+        mg = _RE_VALOR_ORIGINAL_INICIAL.search(norm)
         if mg:
             p.valor_original_credito_inicial = _parse_ptbr_number(mg.group(1))
 
@@ -359,24 +494,20 @@ def parse_declaracao_compensacao_text(txt: str) -> PDFParsed:
         return p
     
     # Normalizar
-    norm = re.sub(r"[\t\u00A0]+", " ", txt)
+    norm = _normalize(txt)
     
     # 1. CNPJ (obrigatório)
-    m_cnpj = re.search(r"CNPJ\s*[:\-]?\s*([0-9./-]{14,20})", norm, flags=re.IGNORECASE)
+    m_cnpj = _RE_CNPJ.search(norm)
     if m_cnpj:
         p.cnpj = _clean_cnpj(m_cnpj.group(1))
     
     # 2. Número do PER/DCOMP INICIAL (obrigatório para declaração)
     # Busca explicitamente pela label "Nº do PER/DCOMP inicial"
-    m_inicial = re.search(
-        r"(?:N[ºo°]\.?\s*do\s+|Nº\s+do\s+|Numero\s+do\s+)?PER\s*/?\s*DCOMP\s+inicial\s*[:\-]?\s*([0-9A-Za-z./\-\s]{15,35})",
-        norm,
-        flags=re.IGNORECASE
-    )
+    m_inicial = _RE_DECL_INICIAL.search(norm)
     if m_inicial:
         raw = m_inicial.group(1).strip()
         # Remove espaços e mantém apenas números, pontos, traços e barras
-        candidate = re.sub(r"[^0-9.\-/]", "", raw)
+        candidate = _RE_NON_PERDCOMP_CHARS.sub("", raw)
         candidate = candidate.strip(" .;,:")
         if _looks_like_perdcomp(candidate):
             p.perdcomp_inicial = candidate
@@ -386,11 +517,7 @@ def parse_declaracao_compensacao_text(txt: str) -> PDFParsed:
     # É diferente do PER/DCOMP inicial - este identifica a declaração atual
     
     # 3a. Buscar no cabeçalho (linha com PERDCOMP destacado)
-    m_header = re.search(
-        r"(?:PERDCOMP|PER\s*/?\s*DCOMP)\s+(\d+[\d.\-]+)",
-        norm[:500],  # Primeiras linhas do documento
-        flags=re.IGNORECASE
-    )
+    m_header = _RE_DECL_HEADER.search(norm[:500])  # Primeiras linhas do documento
     if m_header:
         candidate = m_header.group(1).strip()
         if _looks_like_perdcomp(candidate) and candidate != p.perdcomp_inicial:
@@ -399,7 +526,7 @@ def parse_declaracao_compensacao_text(txt: str) -> PDFParsed:
     # 3b. Buscar após CNPJ (número geralmente destacado)
     if not p.perdcomp and m_cnpj:
         tail = norm[m_cnpj.end():m_cnpj.end() + 100]
-        m_after = re.search(r"(\d{5}[\d.\-]+\d{4})", tail)
+        m_after = _RE_AFTER_CNPJ.search(tail)
         if m_after:
             candidate = m_after.group(1).strip()
             if _looks_like_perdcomp(candidate) and candidate != p.perdcomp_inicial:
@@ -412,7 +539,7 @@ def parse_declaracao_compensacao_text(txt: str) -> PDFParsed:
             p.perdcomp = candidate
     
     # 4. Tipo de Documento - confirmar que é Declaração de Compensação
-    m_tipo = re.search(r"Tipo\s+de\s+Documento\s*[:\-]?\s*(.+?)(?:\n|$)", norm, flags=re.IGNORECASE)
+    m_tipo = _RE_TIPO_DOCUMENTO_LINHA.search(norm)
     if m_tipo:
         tipo_raw = m_tipo.group(1).strip()
         tipo_lower = tipo_raw.lower()
@@ -430,29 +557,21 @@ def parse_declaracao_compensacao_text(txt: str) -> PDFParsed:
         p.metodo_credito = 'Declaração de Compensação'
     
     # 5. Data de Criação
-    m_data = re.search(r"Data\s+de\s+Cria[cç][aã]o\s*[:\-]?\s*(\d{2}/\d{2}/\d{4})", norm, flags=re.IGNORECASE)
+    m_data = _RE_DATA_CRIACAO.search(norm)
     if m_data:
         p.data_criacao = m_data.group(1)
     
     # 6. Valor Original do Crédito Inicial (seção CRÉDITO PAGAMENTO INDEVIDO OU A MAIOR)
-    m_credito_bloco = re.search(
-        r"CR[EÉ]DITO\s+PAGAMENTO\s+INDEVIDO\s+OU\s+A\s+MAIOR(.*?)(?=\n\s*[A-Z][A-Z ]{5,}|\Z)",
-        norm,
-        flags=re.IGNORECASE | re.DOTALL
-    )
+    m_credito_bloco = _RE_BLOCO_CREDITO_PAGAMENTO.search(norm)
     if m_credito_bloco:
         bloco = m_credito_bloco.group(1)
-        m_valor = re.search(r"Valor\s+Original\s+do\s+Cr[eé]dito\s+Inicial\s*[:\-]?\s*([0-9.]+,\d{2})", bloco, flags=re.IGNORECASE)
+        m_valor = _RE_VALOR_ORIGINAL_INICIAL.search(bloco)
         if m_valor:
             p.valor_original_credito_inicial = _parse_ptbr_number(m_valor.group(1))
     
     # Fallback global
     if p.valor_original_credito_inicial is None:
-        m_valor_global = re.search(
-            r"Valor\s+Original\s+do\s+Cr[eé]dito\s+Inicial\s*[:\-]?\s*([0-9.]+,\d{2})",
-            norm,
-            flags=re.IGNORECASE
-        )
+        m_valor_global = _RE_VALOR_ORIGINAL_INICIAL.search(norm)
         if m_valor_global:
             p.valor_original_credito_inicial = _parse_ptbr_number(m_valor_global.group(1))
     
@@ -460,24 +579,20 @@ def parse_declaracao_compensacao_text(txt: str) -> PDFParsed:
     debitos: List[Dict[str, Any]] = []
     
     # Buscar blocos que começam com "N. Débito" onde N é um número
-    for match in re.finditer(
-        r"(?ms)^\s*(\d{1,3})\s*\.\s*D[eé]bito\s*(.*?)(?=^\s*\d{1,3}\s*\.\s*D[eé]bito|\Z)",
-        norm
-    ):
-        bloco = match.group(0)
-        item_num = match.group(1).strip()
+    for item_num, bloco in _iter_debit_blocks(norm):
+        item_num = item_num.strip()
         if item_num:
             item_num = item_num.zfill(3)  # 001, 002, etc
         
         # Código da Receita
         codigo = None
-        m_cod = re.search(r"C[oó]digo\s*(?:da|de)\s*Receita\s*[:\-]?\s*([0-9.]+)", bloco, flags=re.IGNORECASE)
+        m_cod = _RE_DEBITO_CODIGO.search(bloco)
         if m_cod:
             codigo = m_cod.group(1).strip()
         
         # Denominação
         denominacao = None
-        m_denom = re.search(r"Denomina[cç][aã]o\s*[:\-]?\s*(.+?)(?:\n|$)", bloco, flags=re.IGNORECASE)
+        m_denom = _RE_DEBITO_DENOMINACAO.search(bloco)
         if m_denom:
             denominacao = m_denom.group(1).strip().splitlines()[0].strip()
         
@@ -493,24 +608,16 @@ def parse_declaracao_compensacao_text(txt: str) -> PDFParsed:
         
         # Período de Apuração
         periodo = None
-        m_per = re.search(
-            r"Per[ií]odo\s+de\s+Apura[cç][aã]o.*?(\d{2}/\d{2}/\d{4}|\d{2}/\d{4})",
-            bloco,
-            flags=re.IGNORECASE | re.DOTALL
-        )
+        m_per = _RE_DEBITO_PERIODO.search(bloco)
         if m_per:
             periodo = m_per.group(1)
         
         # Valor do Débito
         valor = None
-        m_val = re.search(
-            r"Valor\s*(?:do\s*D[eé]bito|Total)\s*[:\-]?\s*([0-9.]+,\d{2})",
-            bloco,
-            flags=re.IGNORECASE
-        )
+        m_val = _RE_DEBITO_VALOR.search(bloco)
         if not m_val:
             # Fallback: primeiro valor monetário
-            m_val = re.search(r"([0-9.]+,\d{2})", bloco)
+            m_val = _RE_MONEY.search(bloco)
         
         if m_val:
             valor = _parse_ptbr_number(m_val.group(1))
@@ -548,32 +655,33 @@ class PDFReceiptParsed:
         }
 
 
+@requires_fields('numero_documento', 'numero_controle', 'autenticacao_serpro')
 def parse_recibo_pedido_credito_text(txt: str) -> PDFReceiptParsed:
     parsed = PDFReceiptParsed()
     if not txt:
         return parsed
 
-    norm = re.sub(r"[\t\u00A0]+", " ", txt)
+    norm = _normalize(txt)
 
-    m = re.search(r"N[úu]mero\s+do\s+Documento\s*[:\-]?\s*([0-9A-Za-z./\-]+)", norm, flags=re.IGNORECASE)
+    m = _RE_RECIBO_NUMERO_DOCUMENTO.search(norm)
     if m:
         parsed.numero_documento = m.group(1).strip()
 
-    m = re.search(r"N[úu]mero\s+de\s+Controle\s*[:\-]?\s*([0-9A-Za-z./\-]+)", norm, flags=re.IGNORECASE)
+    m = _RE_RECIBO_NUMERO_CONTROLE.search(norm)
     if m:
         parsed.numero_controle = m.group(1).strip()
 
-    m = re.search(r"Data\s+de\s+Transmiss[aã]o\s*[:\-]?\s*(\d{2}/\d{2}/\d{4})", norm, flags=re.IGNORECASE)
+    m = _RE_RECIBO_DATA_TRANSMISSAO.search(norm)
     if m:
         parsed.data_transmissao = m.group(1).strip()
 
     # Captura data/hora do recebimento para arm zen
-    m = re.search(r"em\s+(\d{2}/\d{2}/\d{4})\s+às\s+(\d{2}:\d{2}:\d{2})\s+(\d+)", norm, flags=re.IGNORECASE)
+    m = _RE_RECIBO_RECEBIMENTO.search(norm)
     if m:
         parsed.data_hora_recebimento = f"{m.group(1)} {m.group(2)}"
         parsed.autenticacao_serpro = m.group(3).strip()
     else:
-        m_alt = re.search(r"às\s+(\d{2}:\d{2}:\d{2})\s+(\d+)", norm, flags=re.IGNORECASE)
+        m_alt = _RE_RECIBO_AUTENTICACAO.search(norm)
         if m_alt:
             parsed.autenticacao_serpro = m_alt.group(2).strip()
 
@@ -594,6 +702,7 @@ class PDFCreditoContaParsed:
         }
 
 
+@requires_fields('perdcomp', 'data_credito', 'valor_credito')
 def parse_credito_em_conta_text(txt: str) -> PDFCreditoContaParsed:
     """
     Extrai dados básicos de uma notificação de crédito em conta:
@@ -606,25 +715,25 @@ def parse_credito_em_conta_text(txt: str) -> PDFCreditoContaParsed:
         return parsed
 
     # Normaliza tabs e espaços não separáveis
-    norm = re.sub(r"[\t\u00A0]+", " ", txt)
+    norm = _normalize(txt)
 
     # Data do crédito ("Informamos que, em 12/03/2024, ...")
-    m_data = re.search(r"Informamos que,\s*em\s*(\d{2}/\d{2}/\d{4})", norm, flags=re.IGNORECASE)
+    m_data = _RE_CONTA_DATA.search(norm)
     if m_data:
         parsed.data_credito = m_data.group(1)
 
     # Valor creditado ("no valor de R$ 1.234,56" ou "o valor de 1.234,56")
-    m_valor = re.search(r"valor\s+de\s*(?:R\$\s*)?([0-9.\s]+,\d{2})", norm, flags=re.IGNORECASE)
+    m_valor = _RE_CONTA_VALOR.search(norm)
     if not m_valor:
         # Fallback buscando primeira ocorrência de valor após palavra crédito
-        credito_section = re.search(r"cr[eé]dito.*?(?:R\$\s*)?([0-9.\s]+,\d{2})", norm, flags=re.IGNORECASE | re.DOTALL)
+        credito_section = _RE_CONTA_VALOR_CREDITO.search(norm)
         if credito_section:
             m_valor = credito_section
     if m_valor:
         parsed.valor_credito = _parse_ptbr_number(m_valor.group(1))
 
     # PERDCOMP vinculado
-    m_perdcomp = re.search(r"Perdcomp\s*(?:n[ºo]\s*)?[:\-]?\s*([0-9A-Za-z./\-]+)", norm, flags=re.IGNORECASE)
+    m_perdcomp = _RE_CONTA_PERDCOMP.search(norm)
     if m_perdcomp:
         candidate = m_perdcomp.group(1).strip().strip(" .;,:")
         if _looks_like_perdcomp(candidate):
@@ -663,10 +772,10 @@ def parse_pedido_credito_text(txt: str) -> PDFParsed:
         return p
     
     # Normalizar
-    norm = re.sub(r"[\t\u00A0]+", " ", txt)
+    norm = _normalize(txt)
     
     # 1. CNPJ (obrigatório)
-    m_cnpj = re.search(r"CNPJ\s*[:\-]?\s*([0-9./-]{14,20})", norm, flags=re.IGNORECASE)
+    m_cnpj = _RE_CNPJ.search(norm)
     if m_cnpj:
         p.cnpj = _clean_cnpj(m_cnpj.group(1))
     
@@ -674,14 +783,14 @@ def parse_pedido_credito_text(txt: str) -> PDFParsed:
     # Buscar no cabeçalho ou após CNPJ
     if m_cnpj:
         tail = norm[m_cnpj.end():m_cnpj.end() + 100]
-        m_per = re.search(r"(\d{5}[\d.\-]+\d{4})", tail)
+        m_per = _RE_AFTER_CNPJ.search(tail)
         if m_per:
             candidate = m_per.group(1).strip()
             if _looks_like_perdcomp(candidate):
                 p.perdcomp = candidate
     
     if not p.perdcomp:
-        m_per = re.search(r"(?:PERDCOMP|PER\s*/?\s*DCOMP)\s*(?:n[ºo]\s*)?[:\-]?\s*(\d+[\d.\-]+)", norm, flags=re.IGNORECASE)
+        m_per = _RE_PEDIDO_PER.search(norm)
         if m_per:
             candidate = m_per.group(1).strip()
             if _looks_like_perdcomp(candidate):
@@ -693,7 +802,7 @@ def parse_pedido_credito_text(txt: str) -> PDFParsed:
             p.perdcomp = candidate
     
     # 3. Tipo de Documento - determina se é Restituição ou Ressarcimento
-    m_tipo = re.search(r"Tipo\s+de\s+Documento\s*[:\-]?\s*(.+?)(?:\n|$)", norm, flags=re.IGNORECASE)
+    m_tipo = _RE_TIPO_DOCUMENTO_LINHA.search(norm)
     if m_tipo:
         raw = m_tipo.group(1).strip()
         low = raw.lower()
@@ -713,48 +822,42 @@ def parse_pedido_credito_text(txt: str) -> PDFParsed:
             p.metodo_credito = 'Pedido de restituição'
     
     # 4. Data de Criação
-    m_data = re.search(r"Data\s+de\s+Cria[cç][aã]o\s*[:\-]?\s*(\d{2}/\d{2}/\d{4})", norm, flags=re.IGNORECASE)
+    m_data = _RE_DATA_CRIACAO.search(norm)
     if m_data:
         p.data_criacao = m_data.group(1)
     
     # 5. Valor do Pedido
-    m_valor = re.search(r"Valor\s+do\s+Pedido.*?([0-9.]+,\d{2})", norm, flags=re.IGNORECASE | re.DOTALL)
+    m_valor = _RE_PEDIDO_VALOR.search(norm)
     if m_valor:
         p.valor_pedido = _parse_ptbr_number(m_valor.group(1))
     
     # 6. Campos específicos de RESSARCIMENTO
     # Ano
-    m_ano = re.search(r"\bAno\b\s*[:\-]?\s*(\d{4})", norm, flags=re.IGNORECASE)
+    m_ano = _RE_ANO.search(norm)
     if m_ano:
         p.ano = m_ano.group(1)
     
     # Trimestre
-    m_trim = re.search(r"(\d+)\s*º?\s*Trimestre", norm, flags=re.IGNORECASE)
+    m_trim = _RE_TRIMESTRE.search(norm)
     if m_trim:
         p.trimestre = m_trim.group(1)
     
     # Tipo de Crédito
-    m_tipo_cred = re.search(r"Tipo\s+de\s+Cr[eé]dito\s*[:\-]?\s*(.+?)(?:\n|$)", norm, flags=re.IGNORECASE)
+    m_tipo_cred = _RE_PEDIDO_TIPO_CREDITO.search(norm)
     if m_tipo_cred:
         p.tipo_credito = m_tipo_cred.group(1).strip()
     
     # 7. Campos específicos de RESTITUIÇÃO
     # Período de Apuração (pode ser dd/mm/aaaa ou mm/aaaa)
-    m_per_ap = re.search(r"Per[ií]odo\s+de\s+Apura[cç][aã]o\s*[:\-]?\s*(\d{2}/\d{2}/\d{4})", norm, flags=re.IGNORECASE)
-    if m_per_ap:
-        p.periodo_apuracao_credito = m_per_ap.group(1)
-    else:
-        m_per_ap = re.search(r"Per[ií]odo\s+de\s+Apura[cç][aã]o\s*[:\-]?\s*(\d{2}/\d{4})", norm, flags=re.IGNORECASE)
-        if m_per_ap:
-            p.periodo_apuracao_credito = m_per_ap.group(1)
+    p.periodo_apuracao_credito = _find_periodo_apuracao(norm)
     
     # Código da Receita
-    m_rec = re.search(r"C[oó]digo\s+(?:da|de)\s+Receita\s*[:\-]?\s*([0-9.]+)", norm, flags=re.IGNORECASE)
+    m_rec = _RE_PEDIDO_CODIGO_RECEITA.search(norm)
     if m_rec:
         p.codigo_receita = m_rec.group(1).strip()
     
     # Data de Arrecadação
-    m_arrec = re.search(r"Data\s+de\s+Arrecada[cç][aã]o\s*[:\-]?\s*(\d{2}/\d{2}/\d{4})", norm, flags=re.IGNORECASE)
+    m_arrec = _RE_PEDIDO_DATA_ARRECADACAO.search(norm)
     if m_arrec:
         p.data_arrecadacao = m_arrec.group(1)
     
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Sequence
+
+__all__ = [
+    'ExtractionResult',
+    'get_pool_size',
+    'extract_and_parse',
+    'extract_and_parse_many',
+    'iter_extract_and_parse',
+]
+
+
+@dataclass
+class ExtractionResult:
+    """Resultado da etapa de extração (pypdf + parser) de um único arquivo."""
+    text: str = ''
+    parsed: Any = None
+    error: Optional[str] = None
+    pages_read: Optional[int] = None
+    pages_total: Optional[int] = None
+    from_cache: bool = False
+    # Tempos medidos onde a extração rodou (processo do pool, inclusive)
+    extract_ms: Optional[float] = None
+    parse_ms: Optional[float] = None
+    # Limite do sandbox estourado (``utils.pdf_sandbox.ExtractionLimitError.code``)
+    error_code: Optional[str] = None
+
+    @property
+    def complete(self) -> bool:
+        """Texto cobre o documento inteiro (pode ser gravado no cache)."""
+        return self.pages_total is not None and self.pages_read == self.pages_total
+
+    def pages_log(self) -> Dict[str, Any]:
+        return {'read': self.pages_read, 'total': self.pages_total, 'cache': self.from_cache}
+
+
+def get_pool_size(total: int) -> int:
+    """Quantidade de processos para extrair ``total`` arquivos.
+
+    Usa ``settings.PDF_EXTRACTION_WORKERS`` (0/ausente = nº de CPUs) e nunca
+    ultrapassa a quantidade de arquivos.
+    """
+    try:
+        from django.conf import settings
+        configured = int(getattr(settings, 'PDF_EXTRACTION_WORKERS', 0) or 0)
+    except Exception:
+        configured = 0
+    if configured <= 0:
+        configured = os.cpu_count() or 1
+    return max(1, min(configured, total))
+
+
+def _extract_and_parse(source: Any, parser: Callable[[str], Any]) -> ExtractionResult:
+    # Pode rodar no processo filho: apenas pypdf + regex, sem acesso ao banco.
+    # Para parsers com campos declarados (utils.pdf_parser.requires_fields), a
+    # leitura para na primeira página em que todos os campos estão preenchidos.
+    # A cada página só ela e a anterior (rótulo e valor em páginas diferentes)
+    # passam pelo parser; o texto acumulado é analisado uma vez, quando todos
+    # os campos já apareceram, e não a cada página.
+    from pdf import iter_page_texts
+    from utils.pdf_cache import open_source
+    from utils.pdf_parser import parser_is_satisfied
+
+    fields = getattr(parser, 'required_fields', None) or ()
+    lazy = bool(fields)
+    found: set = set()
+    texts: List[str] = []
+    total = 0
+    start = time.perf_counter()
+    parse_s = 0.0
+
+    def timed_parse(txt: str) -> Any:
+        nonlocal parse_s
+        t0 = time.perf_counter()
+        try:
+            return parser(txt)
+        finally:
+            parse_s += time.perf_counter() - t0
+
+    def result(txt: str, parsed: Any, pages_read: int) -> ExtractionResult:
+        elapsed = time.perf_counter() - start
+        return ExtractionResult(
+            text=txt, parsed=parsed, pages_read=pages_read, pages_total=total,
+            extract_ms=(elapsed - parse_s) * 1000, parse_ms=parse_s * 1000,
+        )
+
+    with open_source(source) as stream:
+        for number, total, page_text in iter_page_texts(stream):
+            texts.append(page_text)
+            if lazy and number < total:
+                window = timed_parse("\n".join(texts[-2:]).strip())
+                found.update(name for name in fields if getattr(window, name, None) not in (None, ''))
+                if len(found) < len(fields):
+                    continue
+                partial = "\n".join(texts).strip()
+                parsed = timed_parse(partial)
+                if parser_is_satisfied(parser, parsed):
+                    return result(partial, parsed, number)
+                lazy = False  # texto acumulado não confirma as páginas: lê até o fim
+    txt = "\n".join(texts).strip()
+    return result(txt, timed_parse(txt), len(texts))
+
+
+def _from_cache(text: str, parser: Callable[[str], Any]) -> ExtractionResult:
+    t0 = time.perf_counter()
+    parsed = parser(text)
+    return ExtractionResult(
+        text=text, parsed=parsed, from_cache=True,
+        extract_ms=0.0, parse_ms=(time.perf_counter() - t0) * 1000,
+    )
+
+
+def extract_and_parse(
+    source: Any,
+    parser: Callable[[str], Any],
+    content_hash: Optional[str] = None,
+) -> ExtractionResult:
+    """Extrai e faz o parsing de um único PDF no processo de extração.
+
+    A leitura roda no pool de ``utils.pdf_sandbox``, com os limites de tempo e
+    memória configurados. Usa o cache de texto quando ``content_hash`` é
+    informado; só textos completos (todas as páginas lidas) são gravados no
+    cache. Exceções de extração são propagadas ao chamador, e um limite
+    estourado sai como ``ExtractionLimitError``.
+    """
+    from utils import pdf_sandbox
+    from utils.pdf_cache import get_text_cache
+
+    cache = get_text_cache()
+    cached = cache.get(content_hash)
+    if cached is not None:
+        return _from_cache(cached, parser)
+    result = pdf_sandbox.run(_extract_and_parse, source, parser)
+    if result.complete:
+        cache.set(content_hash, result.text)
+    return result
+
+
+def iter_extract_and_parse(
+    sources: Sequence[Any],
+    parser: Callable[[str], Any],
+    max_workers: Optional[int] = None,
+    hashes: Optional[Sequence[Optional[str]]] = None,
+) -> Iterator[ExtractionResult]:
+    """Versão incremental de ``extract_and_parse_many``: um resultado por fonte.
+
+    Os resultados saem na ordem de ``sources`` assim que cada um fica pronto.
+    No máximo ``2 * workers`` arquivos ficam em andamento (ou prontos à espera
+    do consumidor), então a memória não cresce com o tamanho do lote. Se o
+    consumidor parar no meio, os pendentes são cancelados. Os arquivos vão ao
+    pool compartilhado de ``utils.pdf_sandbox``; um PDF que estoura um limite
+    vira um resultado com ``error_code``, sem interromper os demais.
+    """
+    from utils import pdf_sandbox
+    from utils.pdf_cache import get_text_cache
+
+    cache = get_text_cache()
+    hashes = list(hashes) if hashes is not None else [None] * len(sources)
+    total = sum(1 for source in sources if source is not None)
+    workers = max_workers or get_pool_size(total)
+    window = 1 if workers <= 1 or total <= 1 else 2 * workers
+
+    def submit(idx: int):
+        source = sources[idx]
+        if source is None:
+            return ExtractionResult(error='Arquivo indisponível.')
+        cached = cache.get(hashes[idx])
+        if cached is not None:
+            try:
+                return _from_cache(cached, parser)
+            except Exception as exc:
+                return ExtractionResult(error=str(exc), from_cache=True)
+        return pdf_sandbox.submit(_extract_and_parse, source, parser)
+
+    def resolve(idx: int, item: Any) -> ExtractionResult:
+        if not isinstance(item, ExtractionResult):
+            try:
+                item = pdf_sandbox.result(item)
+            except pdf_sandbox.ExtractionLimitError as exc:
+                return ExtractionResult(error=str(exc), error_code=exc.code)
+            except Exception as exc:
+                return ExtractionResult(error=str(exc))
+        if item.complete:
+            cache.set(hashes[idx], item.text)
+        return item
+
+    in_flight: Deque[Any] = deque()
+    submitted = 0
+    try:
+        for idx in range(len(sources)):
+            while submitted < len(sources) and submitted < idx + window:
+                in_flight.append(submit(submitted))
+                submitted += 1
+            yield resolve(idx, in_flight.popleft())
+    finally:
+        for item in in_flight:
+            pdf_sandbox.cancel(item)
+
+
+def extract_and_parse_many(
+    sources: Sequence[Any],
+    parser: Callable[[str], Any],
+    max_workers: Optional[int] = None,
+    hashes: Optional[Sequence[Optional[str]]] = None,
+) -> List[ExtractionResult]:
+    """Extrai texto e aplica ``parser`` em cada fonte usando um pool de processos.
+
+    Cada fonte é um caminho ou os bytes do PDF (ver ``utils.pdf_cache.read_upload``).
+    A lista retornada segue a mesma ordem de ``sources``. Fontes ``None`` são
+    ignoradas (resultado com erro). Falhas em um arquivo (inclusive limites de
+    tempo/memória do sandbox) não interrompem os demais.
+    O ``parser`` precisa ser uma função de módulo (picklable), ex.: os ``parse_*``
+    de ``utils.pdf_parser``. Com ``hashes`` (SHA-256 de cada arquivo), o texto é
+    buscado/gravado no cache de extração e só os arquivos ausentes vão ao pool.
+    """
+    return list(iter_extract_and_parse(sources, parser, max_workers=max_workers, hashes=hashes))
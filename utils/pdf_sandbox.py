@@ -0,0 +1,295 @@
+from __future__ import annotations
+
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional, Tuple
+
+__all__ = [
+    'ExtractionLimitError',
+    'sandbox_enabled',
+    'submit',
+    'result',
+    'cancel',
+    'run',
+]
+
+
+class ExtractionLimitError(Exception):
+    """PDF ultrapassou um limite do processo de extração (``code``: tempo, memoria, cpu, falha)."""
+
+    TEMPO = 'tempo'
+    MEMORIA = 'memoria'
+    CPU = 'cpu'
+    FALHA = 'falha'
+
+    def __init__(self, code: str, message: Optional[str] = None):
+        self.code = code
+        super().__init__(message or _MENSAGENS.get(code, 'Falha no processo de extração do PDF.'))
+
+
+_MENSAGENS = {
+    ExtractionLimitError.TEMPO: 'Extração do PDF excedeu o tempo limite.',
+    ExtractionLimitError.MEMORIA: 'Extração do PDF excedeu o limite de memória.',
+    ExtractionLimitError.CPU: 'Extração do PDF excedeu o limite de CPU.',
+    ExtractionLimitError.FALHA: 'O processo de extração foi encerrado durante a leitura do PDF '
+                                '(provável limite de memória/CPU).',
+}
+
+
+def _settings() -> Tuple[bool, float, int, int, int]:
+    try:
+        from django.conf import settings
+        return (
+            bool(getattr(settings, 'PDF_EXTRACTION_SANDBOX', True)),
+            float(getattr(settings, 'PDF_EXTRACTION_TIMEOUT', 60) or 0),
+            int(getattr(settings, 'PDF_EXTRACTION_MEMORY_MB', 1024) or 0),
+            int(getattr(settings, 'PDF_EXTRACTION_CPU_SECONDS', 60) or 0),
+            int(getattr(settings, 'PDF_EXTRACTION_MAX_TASKS_PER_CHILD', 200) or 0),
+        )
+    except Exception:
+        return True, 60.0, 1024, 60, 200
+
+
+def sandbox_enabled() -> bool:
+    return _settings()[0]
+
+
+# --- Processo filho ---------------------------------------------------------
+
+class _LimitHit(BaseException):
+    # BaseException: o pypdf captura ``Exception`` em vários pontos e não pode
+    # engolir o aviso de limite
+    def __init__(self, code: str):
+        super().__init__(code)
+        self.code = code
+
+
+def _on_signal(code: str):
+    def handler(_signum, _frame):
+        raise _LimitHit(code)
+    return handler
+
+
+def _init_child(memory_mb: int) -> None:
+    try:
+        import resource
+        import signal
+    except ImportError:  # sem suporte a rlimits (ex.: Windows): roda sem limites
+        return
+    if memory_mb:
+        limit = memory_mb * 1024 * 1024
+        _soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    signal.signal(signal.SIGXCPU, _on_signal(ExtractionLimitError.CPU))
+    signal.signal(signal.SIGALRM, _on_signal(ExtractionLimitError.TEMPO))
+
+
+def _run_limited(fn: Callable[..., Any], args: tuple, timeout: float, cpu_seconds: int) -> Tuple[str, Any]:
+    # Roda ``fn`` no filho com limite de CPU (relativo ao já consumido, pois o
+    # processo é reutilizado) e de tempo; retorna ('ok', valor) ou ('limite', código)
+    try:
+        import resource
+        import signal
+    except ImportError:
+        return 'ok', fn(*args)
+    original, hard = resource.getrlimit(resource.RLIMIT_CPU)
+
+    def desarmar() -> None:
+        # Timer e limite de CPU desfeitos ainda dentro do try: um SIGALRM/SIGXCPU
+        # que chegue no meio é descartado e a limpeza, repetida
+        while True:
+            try:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+                resource.setrlimit(resource.RLIMIT_CPU, (original, hard))
+                return
+            except _LimitHit:
+                continue
+
+    try:
+        try:
+            if cpu_seconds:
+                usage = resource.getrusage(resource.RUSAGE_SELF)
+                soft = math.ceil(usage.ru_utime + usage.ru_stime + cpu_seconds)
+                if hard != resource.RLIM_INFINITY:
+                    soft = min(soft, hard)
+                resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+            if timeout:
+                signal.setitimer(signal.ITIMER_REAL, timeout)
+            value = fn(*args)
+        finally:
+            desarmar()
+        return 'ok', value
+    except _LimitHit as exc:
+        return 'limite', exc.code
+    except MemoryError:
+        return 'limite', ExtractionLimitError.MEMORIA
+
+
+# --- Processo pai -----------------------------------------------------------
+
+class _Sandbox:
+    """Pool de processos de extração, criado sob demanda e reutilizado.
+
+    Tamanho fixo (``PDF_EXTRACTION_WORKERS``), compartilhado por todas as
+    importações do processo: o custo de iniciar os filhos (spawn + imports do
+    pypdf) é pago uma vez, e ``PDF_EXTRACTION_MAX_TASKS_PER_CHILD`` recicla os
+    filhos periodicamente.
+
+    Quando um filho morre (OOM, SIGKILL) ou trava além do limite, o pool é
+    descartado e recriado na chamada seguinte (``generation`` identifica qual
+    pool executou cada tarefa).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self.generation = 0
+
+    def executor(self) -> Tuple[ProcessPoolExecutor, int]:
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                from utils.pdf_pool import get_pool_size
+
+                _enabled, _timeout, memory_mb, _cpu, max_tasks = _settings()
+                # 'spawn' evita herdar threads/conexões do worker gunicorn via fork
+                self._executor = ProcessPoolExecutor(
+                    max_workers=get_pool_size(os.cpu_count() or 1),
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_child,
+                    initargs=(memory_mb,),
+                    max_tasks_per_child=max_tasks or None,
+                )
+                self._pid = os.getpid()
+                self.generation += 1
+            return self._executor, self.generation
+
+    def reset(self, generation: int) -> None:
+        """Descarta o pool ``generation`` (se ainda for o atual), matando os filhos."""
+        with self._lock:
+            if self._executor is None or generation != self.generation:
+                return
+            executor, self._executor = self._executor, None
+        for process in list((getattr(executor, '_processes', None) or {}).values()):
+            try:
+                process.kill()
+            except Exception:
+                pass
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+_sandbox = _Sandbox()
+
+
+class _Task:
+    """Tarefa enviada ao pool (guarda o necessário para reenviá-la uma vez)."""
+
+    def __init__(self, fn: Callable[..., Any], args: tuple):
+        self.fn = fn
+        self.args = args
+        self.retried = False
+        self.future: Any = None
+        self.generation = 0
+        self._submit()
+
+    def _submit(self) -> None:
+        _enabled, timeout, _memory, cpu_seconds, _tasks = _settings()
+        executor, self.generation = _sandbox.executor()
+        try:
+            self.future = executor.submit(_run_limited, self.fn, self.args, timeout, cpu_seconds)
+        except (BrokenProcessPool, RuntimeError):
+            # Pool quebrado/encerrado por outra requisição: tenta em um novo
+            _sandbox.reset(self.generation)
+            executor, self.generation = _sandbox.executor()
+            self.future = executor.submit(_run_limited, self.fn, self.args, timeout, cpu_seconds)
+
+    def resubmit(self) -> None:
+        self.retried = True
+        self._submit()
+
+
+def submit(fn: Callable[..., Any], *args: Any) -> Any:
+    """Agenda ``fn(*args)`` no pool de extração; o valor sai por ``result``.
+
+    ``fn`` precisa ser uma função de módulo (picklable). Com o sandbox
+    desabilitado (``PDF_EXTRACTION_SANDBOX = False``) roda na hora, no processo
+    atual, sem limites.
+    """
+    if not sandbox_enabled():
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+    return _Task(fn, args)
+
+
+def result(task: Any) -> Any:
+    """Resultado de uma tarefa de ``submit``; limites estourados viram ``ExtractionLimitError``.
+
+    Se o pool quebrar (um filho foi morto), a tarefa é reenviada uma vez a um
+    pool novo: só a que de fato estourou o limite falha de novo.
+
+    O limite de tempo é aplicado no filho (SIGALRM). O pai só tem uma
+    salvaguarda, para filhos que não atendem ao sinal, e ela é folgada: o
+    ``ProcessPoolExecutor`` marca como ``running()`` as tarefas já despachadas
+    para a fila interna dos filhos (uma por processo, mais uma), que ainda
+    podem esperar a tarefa em execução e a que está à frente, cada uma limitada
+    a ``PDF_EXTRACTION_TIMEOUT``. Um filho travado é descartado em até
+    ``3 * PDF_EXTRACTION_TIMEOUT + 10`` segundos após a tarefa ser despachada.
+    """
+    if isinstance(task, Future):
+        return task.result()
+    timeout = _settings()[1]
+    # Salvaguarda no pai para o caso de o filho não atender ao SIGALRM; conta a
+    # partir do despacho (running()): até duas tarefas à frente mais a própria
+    backstop = 3 * timeout + 10 if timeout else None
+    deadline: Optional[float] = None
+    while True:
+        if backstop is None:
+            wait = None
+        elif deadline is None:
+            wait = 1.0
+        else:
+            wait = max(0.0, deadline - time.monotonic())
+        try:
+            status, value = task.future.result(timeout=wait)
+        except FutureTimeoutError:
+            if deadline is None:
+                if task.future.running():
+                    deadline = time.monotonic() + backstop
+                continue
+            _sandbox.reset(task.generation)
+            raise ExtractionLimitError(ExtractionLimitError.TEMPO)
+        except (BrokenProcessPool, CancelledError):
+            # Filho morto, ou pool descartado por causa de outra tarefa
+            _sandbox.reset(task.generation)
+            if task.retried:
+                raise ExtractionLimitError(ExtractionLimitError.FALHA)
+            task.resubmit()
+            deadline = None
+            continue
+        if status == 'limite':
+            raise ExtractionLimitError(value)
+        return value
+
+
+def cancel(task: Any) -> None:
+    """Cancela uma tarefa de ``submit`` que ainda não começou a rodar."""
+    future = task.future if isinstance(task, _Task) else task
+    if isinstance(future, Future):
+        future.cancel()
+
+
+def run(fn: Callable[..., Any], *args: Any) -> Any:
+    """``fn(*args)`` em um processo do pool de extração, com os limites configurados."""
+    return result(submit(fn, *args))
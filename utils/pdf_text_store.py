@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import zlib
+from decimal import Decimal
+from typing import Any, Dict, Optional, Tuple
+
+__all__ = [
+    'compress_text',
+    'decompress_text',
+    'parsed_snapshot',
+    'diff_snapshots',
+    'reparse',
+    'plain_text',
+]
+
+
+def compress_text(text: str) -> bytes:
+    """Texto extraído de um PDF, comprimido para gravação no banco (zlib)."""
+    return zlib.compress(text.encode('utf-8'), 6)
+
+
+def decompress_text(blob: Optional[bytes]) -> str:
+    if not blob:
+        return ''
+    return zlib.decompress(bytes(blob)).decode('utf-8')
+
+
+def _valor(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, dict):
+        return {k: _valor(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_valor(v) for v in value]
+    return value
+
+
+def parsed_snapshot(parsed: Any) -> Dict[str, Any]:
+    """Campos de um resultado ``parse_*`` em formato JSON (inclui ``debitos``).
+
+    É o que fica gravado na importação e o que ``diff_snapshots`` compara.
+    """
+    if parsed is None:
+        return {}
+    data = dict(parsed.as_dict())
+    debitos = getattr(parsed, 'debitos', None)
+    if debitos:
+        data['debitos'] = _valor(debitos)
+    return _valor(data)
+
+
+def diff_snapshots(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Tuple[Any, Any]]:
+    """Campos com valor diferente entre dois ``parsed_snapshot`` (``campo: (antes, depois)``)."""
+    old = old or {}
+    new = new or {}
+    return {
+        key: (old.get(key), new.get(key))
+        for key in sorted(set(old) | set(new))
+        if old.get(key) != new.get(key)
+    }
+
+
+def reparse(tipo: str, blob: Optional[bytes]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Aplica o parser atual de ``tipo`` ao texto gravado: ``(parsed_snapshot, erro)``.
+
+    Função de módulo (picklable) para uso em pool de processos, sem acesso ao
+    banco. Erros voltam como texto para não interromper os demais documentos.
+    """
+    from utils.pdf_classifier import PARSERS
+
+    try:
+        return parsed_snapshot(PARSERS[tipo](decompress_text(blob))), None
+    except Exception as exc:
+        return None, str(exc)
+
+
+def plain_text(text: str) -> str:
+    """"Parser" que devolve o texto como está: extração só do texto (ex.: anexos para a busca)."""
+    return text
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+import zipfile
+import zlib
+from dataclasses import dataclass
+from typing import Iterator, NamedTuple, Optional, Union
+
+__all__ = [
+    'ZipEntrySource',
+    'PDFEntry',
+    'is_zip_upload',
+    'iter_zip_pdfs',
+]
+
+
+@dataclass(frozen=True)
+class ZipEntrySource:
+    """Referência a um PDF dentro de um .zip em disco.
+
+    Picklable: o processo do pool abre o .zip e lê só esta entrada, em memória
+    (ver ``utils.pdf_cache.open_source``); nada é extraído para o disco.
+    """
+    zip_path: str
+    name: str
+
+    def read_bytes(self) -> bytes:
+        with zipfile.ZipFile(self.zip_path) as zf:
+            return zf.read(self.name)
+
+
+class PDFEntry(NamedTuple):
+    """PDF a importar: nome, fonte para extração e SHA-256 (ou ``error``)."""
+    name: str
+    source: Union[bytes, ZipEntrySource, None]
+    sha256: Optional[str]
+    error: Optional[str] = None
+
+
+def is_zip_upload(upload) -> bool:
+    """Upload é um .zip (pela extensão ou pela assinatura ``PK``)."""
+    if os.path.splitext(upload.name or '')[1].lower() == '.zip':
+        return True
+    upload.seek(0)
+    head = upload.read(4)
+    upload.seek(0)
+    return head == b'PK\x03\x04'
+
+
+def _limits():
+    from django.conf import settings
+    return (
+        int(getattr(settings, 'PDF_ZIP_MAX_ENTRIES', 0) or 0),
+        int(getattr(settings, 'PDF_ZIP_MAX_ENTRY_BYTES', 0) or 0),
+    )
+
+
+def iter_zip_pdfs(source: Union[str, bytes]) -> Iterator[PDFEntry]:
+    """Percorre os PDFs de um .zip, uma entrada por vez.
+
+    ``source`` segue ``utils.pdf_cache.read_upload``: para um .zip em disco
+    cada entrada vira uma ``ZipEntrySource`` (o SHA-256 é calculado lendo a
+    entrada em blocos); para um .zip em memória, os bytes da entrada. Pastas,
+    arquivos que não são .pdf e metadados do macOS são ignorados. Entradas
+    acima de ``PDF_ZIP_MAX_ENTRY_BYTES`` ou além de ``PDF_ZIP_MAX_ENTRIES``
+    voltam com ``error``. Um .zip inválido gera ``zipfile.BadZipFile``.
+    """
+    max_entries, max_bytes = _limits()
+    in_memory = not isinstance(source, str)
+    with zipfile.ZipFile(io.BytesIO(source) if in_memory else source) as zf:
+        count = 0
+        for info in zf.infolist():
+            name = info.filename
+            if info.is_dir() or name.startswith('__MACOSX/') or not name.lower().endswith('.pdf'):
+                continue
+            count += 1
+            if max_entries and count > max_entries:
+                yield PDFEntry(name, None, None, f'Limite de {max_entries} PDFs por arquivo ZIP excedido.')
+                continue
+            if max_bytes and info.file_size > max_bytes:
+                yield PDFEntry(name, None, None, f'PDF excede {max_bytes // (1024 * 1024)}MB descompactado.')
+                continue
+            try:
+                if in_memory:
+                    data = zf.read(info)
+                    yield PDFEntry(name, data, hashlib.sha256(data).hexdigest())
+                    continue
+                digest = hashlib.sha256()
+                with zf.open(info) as fh:
+                    for chunk in iter(lambda: fh.read(1024 * 1024), b''):
+                        digest.update(chunk)
+                yield PDFEntry(name, ZipEntrySource(source, name), digest.hexdigest())
+            except (zipfile.BadZipFile, zlib.error, RuntimeError, OSError, NotImplementedError) as exc:
+                # Entrada corrompida, criptografada ou com compressão não suportada
+                yield PDFEntry(name, None, None, f'Não foi possível ler a entrada do ZIP: {exc}')
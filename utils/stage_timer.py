@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, Optional
+
+__all__ = ['StageTimer', 'source_size']
+
+STAGES = ('upload', 'extract', 'parse', 'db')
+
+
+class StageTimer:
+    """Tempo (ms) gasto em cada etapa de uma importação.
+
+    ``lap(etapa)`` atribui à etapa o tempo desde a marca anterior. Extração e
+    parsing podem rodar em outro processo (pool) ou vir do cache: nesse caso
+    entram pelos tempos medidos junto do ``ExtractionResult``
+    (``record_extraction``), e a marca é reposicionada. ``total_ms`` é a soma
+    das etapas.
+    """
+
+    def __init__(self):
+        self._mark = time.perf_counter()
+        self.ms: Dict[str, float] = {}
+        self.pages: Optional[int] = None
+        self.bytes: Optional[int] = None
+
+    def lap(self, stage: str) -> None:
+        now = time.perf_counter()
+        self.add(stage, (now - self._mark) * 1000)
+        self._mark = now
+
+    def add(self, stage: str, ms: Optional[float]) -> None:
+        if ms is not None:
+            self.ms[stage] = self.ms.get(stage, 0.0) + ms
+
+    def mark(self) -> None:
+        self._mark = time.perf_counter()
+
+    def record_extraction(self, result: Any) -> None:
+        """Soma os tempos de extração/parsing de um ``ExtractionResult``."""
+        self.add('extract', getattr(result, 'extract_ms', None))
+        self.add('parse', getattr(result, 'parse_ms', None))
+        pages = getattr(result, 'pages_read', None)
+        if pages is not None:
+            self.pages = pages
+        self.mark()
+
+    def as_dict(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {
+            f'{stage}_ms': round(self.ms[stage], 1) if stage in self.ms else None
+            for stage in STAGES
+        }
+        data['total_ms'] = round(sum(self.ms.values()), 1)
+        data['pages'] = self.pages
+        data['bytes'] = self.bytes
+        return data
+
+
+def source_size(source: Any) -> Optional[int]:
+    """Tamanho em bytes de uma fonte de PDF (bytes ou caminho; ver ``read_upload``)."""
+    import os
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return len(source)
+    if isinstance(source, str):
+        try:
+            return os.path.getsize(source)
+        except OSError:
+            return None
+    return None
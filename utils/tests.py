@@ -0,0 +1,239 @@
+import hashlib
+import io
+import os
+import tempfile
+import zipfile
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from .pdf_cache import PDFTextCache
+from .pdf_classifier import (
+    DOC_CREDITO_CONTA,
+    DOC_DECLARACAO_COMPENSACAO,
+    DOC_PEDIDO_CREDITO,
+    DOC_RECIBO,
+    HEADER_CHARS,
+    classify_header,
+)
+from .pdf_corpus import DOCUMENT_KINDS, generate_corpus, generate_document, render_pdf
+from .pdf_parser import parse_credito_em_conta_text, parse_recibo_pedido_credito_text
+from .pdf_pool import _extract_and_parse
+from .pdf_zip import ZipEntrySource, iter_zip_pdfs
+
+
+class PDFTextCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def _arquivos(self):
+        return sorted(
+            nome for _, _, nomes in os.walk(self.dir.name) for nome in nomes if nome.endswith('.txt')
+        )
+
+    def test_remove_as_menos_usadas_ate_abaixo_do_limite(self):
+        cache = PDFTextCache(self.dir.name, max_entries=20)
+        chaves = [f'{i:064x}' for i in range(21)]
+        for i, chave in enumerate(chaves[:20]):
+            cache.set(chave, f'texto {i}')
+            os.utime(cache._path(chave), (1000 + i, 1000 + i))
+        os.utime(cache._path(chaves[0]), (5000, 5000))  # lida há pouco: fica
+
+        cache.set(chaves[20], 'texto 20')
+
+        # Desce a 90% do limite, removendo as de mtime mais antigo
+        restantes = self._arquivos()
+        self.assertEqual(len(restantes), 18)
+        self.assertIn(f'{chaves[0]}.txt', restantes)
+        self.assertNotIn(f'{chaves[1]}.txt', restantes)
+        self.assertNotIn(f'{chaves[3]}.txt', restantes)
+        self.assertIn(f'{chaves[4]}.txt', restantes)
+        self.assertEqual(cache.get(chaves[20]), 'texto 20')
+
+    def test_diretorio_percorrido_so_quando_necessario(self):
+        cache = PDFTextCache(self.dir.name, max_entries=100)
+        with mock.patch.object(cache, '_evict', wraps=cache._evict) as evict:
+            for i in range(100):
+                cache.set(f'{i:064x}', 'x')
+        # Primeira gravação (contagem desconhecida) e a cada 10 gravações
+        self.assertEqual(evict.call_count, 1 + 99 // 10)
+        self.assertEqual(len(self._arquivos()), 100)
+
+        with mock.patch.object(cache, '_evict', wraps=cache._evict) as evict:
+            cache.set(f'{100:064x}', 'x')
+            cache.set(f'{101:064x}', 'x')
+        self.assertEqual(evict.call_count, 1)
+        self.assertEqual(len(self._arquivos()), 91)
+
+
+def _sem_campos(parser):
+    # Mesmo parser sem requires_fields: o PDF é lido inteiro
+    return lambda txt: parser(txt)
+
+
+class LeituraPorPaginaTests(SimpleTestCase):
+    """A leitura que para cedo dá o mesmo resultado que a do documento inteiro."""
+
+    def _comparar(self, pdf, parser):
+        parcial = _extract_and_parse(pdf, parser)
+        completo = _extract_and_parse(pdf, _sem_campos(parser))
+        self.assertEqual(parcial.parsed.as_dict(), completo.parsed.as_dict())
+        self.assertEqual(completo.pages_read, completo.pages_total)
+        self.assertTrue(completo.text.startswith(parcial.text))
+        return parcial
+
+    def test_corpus_em_varias_paginas(self):
+        for tipo, parser in (('credito_conta', parse_credito_em_conta_text),
+                             ('recibo', parse_recibo_pedido_credito_text)):
+            for semente in range(5):
+                doc = generate_document(tipo, semente, noise_lines=400)
+                with self.subTest(tipo=tipo, semente=semente):
+                    self.assertGreater(len(doc.pages), 2)
+                    parcial = self._comparar(render_pdf(doc.pages), parser)
+                    if tipo == 'credito_conta':
+                        # Campos no meio do documento: as últimas páginas não são lidas
+                        self.assertLess(parcial.pages_read, parcial.pages_total)
+
+    def test_rotulo_e_valor_em_paginas_diferentes(self):
+        doc = generate_document('recibo', 1, layout_noise=False, noise_lines=0)
+        numero = doc.expected['numero_documento']
+        linhas = doc.pages[0].split('\n')
+        indice = next(i for i, linha in enumerate(linhas) if linha.startswith('Número do Documento'))
+        paginas = [
+            '\n'.join(linhas[:indice] + ['Número do Documento']),
+            '\n'.join([numero] + linhas[indice + 1:]),
+            'página sem campos',
+            'página sem campos',
+        ]
+
+        parcial = self._comparar(render_pdf(paginas), parse_recibo_pedido_credito_text)
+
+        self.assertEqual(parcial.parsed.numero_documento, numero)
+        self.assertEqual(parcial.pages_read, 2)
+
+    def test_cada_pagina_analisada_uma_vez(self):
+        doc = generate_document('credito_conta', 3, noise_lines=2000)
+        chamadas = []
+
+        def parser(txt):
+            chamadas.append(len(txt))
+            return parse_credito_em_conta_text(txt)
+        parser.required_fields = parse_credito_em_conta_text.required_fields
+
+        parcial = _extract_and_parse(render_pdf(doc.pages), parser)
+
+        self.assertLess(parcial.pages_read, parcial.pages_total)
+        # Uma janela (página e anterior) por página lida e um texto acumulado
+        self.assertEqual(len(chamadas), parcial.pages_read + 1)
+        self.assertLess(sum(chamadas), 3 * len(parcial.text))
+
+
+class ClassificacaoCabecalhoTests(SimpleTestCase):
+    TIPOS = {
+        'ressarcimento': DOC_PEDIDO_CREDITO,
+        'restituicao': DOC_PEDIDO_CREDITO,
+        'declaracao': DOC_DECLARACAO_COMPENSACAO,
+        'recibo': DOC_RECIBO,
+        'credito_conta': DOC_CREDITO_CONTA,
+    }
+
+    def test_corpus_classificado_pelo_tipo_esperado(self):
+        self.assertEqual(set(self.TIPOS), set(DOCUMENT_KINDS))
+        for doc in generate_corpus(per_kind=30):
+            with self.subTest(tipo=doc.kind, semente=doc.seed):
+                self.assertEqual(classify_header(doc.text), self.TIPOS[doc.kind])
+
+    def test_pedido_reconhecido_pelo_titulo(self):
+        # Valor de "Tipo de Documento" além de HEADER_CHARS: vale o título da primeira página
+        doc = generate_document('ressarcimento', 13)
+        self.assertNotIn('Pedido de Ressarcimento', doc.text[:HEADER_CHARS])
+        self.assertEqual(classify_header(doc.text), DOC_PEDIDO_CREDITO)
+
+
+def zip_com(entradas):
+    """.zip em memória com ``{nome: bytes}``; nomes terminados em ``/`` viram pastas."""
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for nome, dados in entradas.items():
+            zf.writestr(nome, dados)
+    return buf.getvalue()
+
+
+def corromper_entrada(dados, nome):
+    # Troca bytes no meio dos dados comprimidos da entrada (o cabeçalho fica íntegro)
+    with zipfile.ZipFile(io.BytesIO(dados)) as zf:
+        info = zf.getinfo(nome)
+    inicio = info.header_offset + 30 + len(info.filename.encode()) + len(info.extra)
+    meio = inicio + info.compress_size // 2
+    return dados[:meio] + bytes(b ^ 0xFF for b in dados[meio:meio + 16]) + dados[meio + 16:]
+
+
+class ZipPDFsTests(SimpleTestCase):
+    def setUp(self):
+        self.pdfs = {
+            'a.pdf': render_pdf(['documento a']),
+            'pasta/b.PDF': render_pdf(['documento b', 'segunda página']),
+        }
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def _fontes(self, dados):
+        # O mesmo .zip em memória (upload pequeno) e em disco (TemporaryUploadedFile)
+        caminho = os.path.join(self.dir.name, 'lote.zip')
+        with open(caminho, 'wb') as fh:
+            fh.write(dados)
+        return {'memoria': dados, 'disco': caminho}
+
+    def _conteudo(self, entry):
+        return entry.source.read_bytes() if isinstance(entry.source, ZipEntrySource) else entry.source
+
+    def test_so_pdfs_sao_listados(self):
+        dados = zip_com({
+            'pasta/': b'',
+            '__MACOSX/._a.pdf': b'metadados',
+            'leia-me.txt': b'texto',
+            **self.pdfs,
+        })
+        for origem, fonte in self._fontes(dados).items():
+            with self.subTest(origem=origem):
+                entries = list(iter_zip_pdfs(fonte))
+                self.assertEqual([entry.name for entry in entries], list(self.pdfs))
+                for entry in entries:
+                    self.assertIsNone(entry.error)
+                    self.assertEqual(self._conteudo(entry), self.pdfs[entry.name])
+                    self.assertEqual(entry.sha256, hashlib.sha256(self.pdfs[entry.name]).hexdigest())
+
+    @override_settings(PDF_ZIP_MAX_ENTRIES=1)
+    def test_limite_de_entradas(self):
+        for origem, fonte in self._fontes(zip_com(self.pdfs)).items():
+            with self.subTest(origem=origem):
+                primeira, excedente = iter_zip_pdfs(fonte)
+                self.assertIsNone(primeira.error)
+                self.assertIsNone(excedente.source)
+                self.assertEqual(excedente.error, 'Limite de 1 PDFs por arquivo ZIP excedido.')
+
+    def test_limite_de_tamanho_descompactado(self):
+        limite = len(self.pdfs['a.pdf'])
+        with override_settings(PDF_ZIP_MAX_ENTRY_BYTES=limite):
+            for origem, fonte in self._fontes(zip_com(self.pdfs)).items():
+                with self.subTest(origem=origem):
+                    pequeno, grande = iter_zip_pdfs(fonte)
+                    self.assertIsNone(pequeno.error)
+                    self.assertIsNone(grande.source)
+                    self.assertIsNone(grande.sha256)
+                    self.assertIn('descompactado', grande.error)
+
+    def test_entrada_corrompida_nao_interrompe_as_demais(self):
+        dados = corromper_entrada(zip_com(self.pdfs), 'a.pdf')
+        for origem, fonte in self._fontes(dados).items():
+            with self.subTest(origem=origem):
+                corrompida, integra = iter_zip_pdfs(fonte)
+                self.assertIsNone(corrompida.source)
+                self.assertTrue(corrompida.error.startswith('Não foi possível ler a entrada do ZIP'))
+                self.assertIsNone(integra.error)
+                self.assertEqual(self._conteudo(integra), self.pdfs['pasta/b.PDF'])
+
+    def test_zip_invalido(self):
+        with self.assertRaises(zipfile.BadZipFile):
+            list(iter_zip_pdfs(b'PK\x03\x04 isto nao e um zip'))